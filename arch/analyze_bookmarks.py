@@ -3,104 +3,220 @@
 """
 书签结构分析工具
 用于准确解析pintree.json文件并输出其完整的书签层次结构
+
+书签按节点事件流（见bookmark_stream）边读取边分析，不构建整棵树，也不递归：
+结构报告逐行产出、逐行输出，各文件夹的链接数、嵌套深度和域名分布在同一遍扫描中汇总，
+内存占用只与嵌套深度、顶级分类数量和域名计数器的容量有关，与书签总数无关。
 """
+import itertools
 import json
 import os
+import sys
+
+# 共用仓库根目录中的书签读取模块
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from bookmark_html import is_bookmark_html, iter_html_bookmark_nodes
+from bookmark_stream import END, FOLDER, LINK, iter_bookmark_nodes, open_bookmark_file
+from search_index import url_hostname
+
+# 域名计数器最多保留的域名数（超出后为近似计数）
+DOMAIN_CAPACITY = 1000
+# 直接包含的链接超过这个数量时只显示数量
+MAX_LISTED_LINKS = 5
+
+
+class DomainCounter:
+    """
+    容量有限的域名计数器（Misra-Gries算法）
+
+    不同域名的数量不超过容量时计数是精确的；超出后计数器已满时所有计数减一、删除减到0的域名，
+    出现次数超过 总数/容量 的域名一定会被保留，保留的计数是实际次数的下界。
+    """
+
+    def __init__(self, capacity=DOMAIN_CAPACITY):
+        self.capacity = capacity
+        self.counts = {}
+        self.approximate = False
+
+    def add(self, domain):
+        counts = self.counts
+        if domain in counts:
+            counts[domain] += 1
+        elif len(counts) < self.capacity:
+            counts[domain] = 1
+        else:
+            self.approximate = True
+            for key in list(counts):
+                if counts[key] == 1:
+                    del counts[key]
+                else:
+                    counts[key] -= 1
 
+    def most_common(self, n):
+        return sorted(self.counts.items(), key=lambda item: (-item[1], item[0]))[:n]
 
-def parse_bookmark_structure(bookmarks_data, indent=0, show_links=False):
+
+class FolderSummary:
     """
-    递归解析书签结构
-    
+    文件夹子树的汇总信息
+
     参数:
-        bookmarks_data: 书签数据（列表或字典）
-        indent: 缩进级别，用于格式化输出
-        show_links: 是否显示链接（False表示只统计数量）
-    
+        title: 文件夹标题
+        domain_capacity: 域名计数器的容量
+    """
+
+    def __init__(self, title, domain_capacity=DOMAIN_CAPACITY):
+        self.title = title
+        self.folders = 0
+        self.links = 0
+        # 直接包含的项目数
+        self.items = 0
+        # 子树中文件夹的最大嵌套深度（只有链接时为0）
+        self.max_depth = 0
+        self.domains = DomainCounter(domain_capacity)
+
+
+class _Level:
+    """
+    结构报告中正在输出的一层：一个打开的文件夹的直接内容
+    """
+
+    __slots__ = ('indent', 'depth', 'links', 'titles', 'subtree_links', 'category')
+
+    def __init__(self, indent, depth, category):
+        self.indent = indent
+        self.depth = depth
+        # 直接包含的链接数和标题（最多保留MAX_LISTED_LINKS + 1个）
+        self.links = 0
+        self.titles = []
+        self.subtree_links = 0
+        # 所属的顶级分类（根层级为None）
+        self.category = category
+
+
+def split_root(nodes):
+    """
+    找出实际的根文件夹
+
+    第一个顶层节点是文件夹时（pintree导出总是只有一个“其他书签”根文件夹），把它作为根，
+    只产出它的内容；根文件夹之后如果还有顶层节点，作为同一层级的内容继续产出。
+
     返回:
-        structure: 格式化的书签结构字符串
-        stats: 统计信息字典
+        (根文件夹标题, 根文件夹内容的节点事件流)
     """
-    structure = []
-    stats = {
-        'folders': 0,
-        'links': 0,
-        'total_depth': indent
-    }
-    
-    # 确保数据是列表格式
-    if isinstance(bookmarks_data, dict):
-        bookmarks_data = [bookmarks_data]
-    
-    links_in_this_level = []
-    folders_in_this_level = []
-    
-    for item in bookmarks_data:
-        if isinstance(item, dict):
-            # 处理文件夹
-            if item.get('type') == 'folder':
-                stats['folders'] += 1
-                folder_title = item.get('title', '未命名文件夹')
-                folders_in_this_level.append({
-                    'title': folder_title,
-                    'children': item.get('children', [])
-                })
-            # 处理链接
-            elif item.get('type') == 'link':
-                stats['links'] += 1
-                if show_links:
-                    link_title = item.get('title', '未命名链接')
-                    links_in_this_level.append(link_title)
-    
-    # 先输出文件夹
-    for folder in folders_in_this_level:
-        structure.append(' ' * indent + f"📁 {folder['title']}")
-        # 递归处理子项
-        if folder['children']:
-            child_structure, child_stats = parse_bookmark_structure(
-                folder['children'], indent + 2, show_links
-            )
-            structure.extend(child_structure)
-            stats['folders'] += child_stats['folders']
-            stats['links'] += child_stats['links']
-            stats['total_depth'] = max(stats['total_depth'], child_stats['total_depth'])
-    
-    # 然后输出链接（如果需要）
-    if show_links and links_in_this_level:
-        # 如果链接太多，只显示数量
-        if len(links_in_this_level) > 5:
-            structure.append(' ' * indent + f"🔗 包含 {len(links_in_this_level)} 个链接")
+    nodes = iter(nodes)
+    first = next(nodes, None)
+    if first is None:
+        return '根文件夹', iter(())
+    event, item = first
+    if event != FOLDER:
+        return '根文件夹', itertools.chain([first], nodes)
+
+    def inner():
+        depth = 0
+        for event, item in nodes:
+            if event == END:
+                if depth == 0:
+                    break
+                depth -= 1
+            elif event == FOLDER:
+                depth += 1
+            yield event, item
+        yield from nodes
+
+    title = item.get('title')
+    return ('根文件夹' if title is None else title), inner()
+
+
+def _level_lines(level, show_links):
+    """
+    一层内容结束时输出的链接信息（位于该层所有文件夹之后）
+    """
+    prefix = ' ' * level.indent
+    if show_links and level.links:
+        if level.links > MAX_LISTED_LINKS:
+            yield prefix + f"🔗 包含 {level.links} 个链接"
         else:
-            for link_title in links_in_this_level:
-                structure.append(' ' * indent + f"🔗 {link_title}")
-    elif not show_links and stats['links'] > 0 and indent > 0:
-        # 不显示链接时，只在非顶层显示数量信息
-        structure.append(' ' * indent + f"🔗 包含链接")
-    
-    return structure, stats
+            for title in level.titles:
+                yield prefix + f"🔗 {title}"
+    elif not show_links and level.subtree_links > 0 and level.indent > 0:
+        # 不显示链接时，只在非顶层显示子树中有链接
+        yield prefix + "🔗 包含链接"
 
 
-def get_root_folder(bookmarks_data):
+def iter_structure(nodes, show_links=False, summary=None):
     """
-    获取根文件夹信息
-    分析数据结构，找出实际的根文件夹
+    逐行产出书签的层次结构
+
+    参数:
+        nodes: 节点事件流（通常是split_root返回的根文件夹内容）
+        show_links: 是否显示链接（False表示只标出包含链接的文件夹）
+        summary: FolderSummary，用于接收整体的汇总；其categories属性为各顶级分类的FolderSummary列表
+
+    返回:
+        报告行的生成器（汇总信息在生成器耗尽后才完整）
     """
-    # 检查数据是否为列表且非空
-    if isinstance(bookmarks_data, list) and bookmarks_data:
-        # 检查第一个元素是否包含children
-        if len(bookmarks_data) == 1 and isinstance(bookmarks_data[0], dict):
-            # 情况1: 根节点是单个对象，可能直接包含children
-            if 'children' in bookmarks_data[0]:
-                return bookmarks_data[0].get('title', '根文件夹'), bookmarks_data[0]['children']
-        
-        # 情况2: 列表中的元素可能是顶级文件夹
-        # 检查是否所有元素都是folder类型
-        all_folders = all(item.get('type') == 'folder' for item in bookmarks_data if isinstance(item, dict))
-        if all_folders:
-            return '根文件夹', bookmarks_data
-    
-    # 默认返回
-    return '根文件夹', bookmarks_data
+    if summary is None:
+        summary = FolderSummary('')
+    summary.categories = []
+    # 打开的层级栈，栈底是根层级
+    stack = [_Level(0, 0, None)]
+    for event, item in nodes:
+        level = stack[-1]
+        if event == FOLDER:
+            title = item.get('title')
+            if title is None:
+                title = '未命名文件夹'
+            yield ' ' * level.indent + f"📁 {title}"
+
+            depth = level.depth + 1
+            summary.folders += 1
+            summary.max_depth = max(summary.max_depth, depth)
+            if len(stack) == 1:
+                # 根层级的文件夹是顶级分类
+                summary.items += 1
+                category = FolderSummary(title)
+                summary.categories.append(category)
+            else:
+                category = level.category
+                category.folders += 1
+                category.max_depth = max(category.max_depth, depth - 1)
+                if len(stack) == 2:
+                    category.items += 1
+            stack.append(_Level(level.indent + 2, depth, category))
+
+        elif event == LINK:
+            level.links += 1
+            level.subtree_links += 1
+            if show_links and len(level.titles) <= MAX_LISTED_LINKS:
+                title = item.get('title')
+                level.titles.append('未命名链接' if title is None else title)
+            summary.links += 1
+            domain = url_hostname(item.get('url'))
+            if domain:
+                summary.domains.add(domain)
+            category = level.category
+            if category is None:
+                summary.items += 1
+            else:
+                category.links += 1
+                if domain:
+                    category.domains.add(domain)
+                if len(stack) == 2:
+                    category.items += 1
+
+        elif event == END:
+            if len(stack) == 1:
+                continue
+            finished = stack.pop()
+            yield from _level_lines(finished, show_links)
+            stack[-1].subtree_links += finished.subtree_links
+
+    yield from _level_lines(stack[0], show_links)
+
+
+def _format_domains(domains, n):
+    return ', '.join(f"{domain}({count})" for domain, count in domains.most_common(n))
 
 
 def analyze_json_file(file_path):
@@ -108,47 +224,48 @@ def analyze_json_file(file_path):
     分析JSON文件并输出书签结构
     """
     try:
-        # 读取文件
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
         print(f"\n📋 开始分析文件: {os.path.basename(file_path)}")
         print(f"📊 文件大小: {os.path.getsize(file_path)} 字节")
-        
-        # 获取根文件夹信息
-        root_title, root_children = get_root_folder(data)
-        
-        print(f"\n🏗️  书签结构 ({root_title}):")
-        # 设置show_links=False以避免输出被截断
-        structure, stats = parse_bookmark_structure(root_children, show_links=False)
-        
-        # 输出结构
-        for line in structure:
-            print(line)
-        
+
+        iter_nodes = iter_html_bookmark_nodes if is_bookmark_html(file_path) else iter_bookmark_nodes
+        summary = FolderSummary('')
+        with open_bookmark_file(file_path) as f:
+            # 获取根文件夹信息
+            root_title, root_nodes = split_root(iter_nodes(f))
+
+            print(f"\n🏗️  书签结构 ({root_title}):")
+            # 设置show_links=False以避免输出被截断；报告逐行输出，不在内存中保存
+            for line in iter_structure(root_nodes, show_links=False, summary=summary):
+                print(line)
+
         # 输出每个顶级文件夹的详细信息
         print(f"\n📊 详细分类统计:")
-        for item in root_children:
-            if isinstance(item, dict) and item.get('type') == 'folder':
-                title = item.get('title', '未命名文件夹')
-                _, child_stats = parse_bookmark_structure(item.get('children', []), 0, False)
-                print(f"  - {title}: {child_stats['folders']}个子文件夹, {child_stats['links']}个链接")
-        
+        for category in summary.categories:
+            line = f"  - {category.title}: {category.folders}个子文件夹, {category.links}个链接"
+            if category.max_depth:
+                line += f", 嵌套 {category.max_depth} 层"
+            if category.domains.counts:
+                line += f", 常见域名: {_format_domains(category.domains, 3)}"
+            print(line)
+
         print(f"\n📈 统计信息:")
-        print(f"  文件夹总数: {stats['folders']}")
-        print(f"  链接总数: {stats['links']}")
-        print(f"  最大嵌套深度: {stats['total_depth']}")
-        
+        print(f"  文件夹总数: {summary.folders}")
+        print(f"  链接总数: {summary.links}")
+        print(f"  最大嵌套深度: {summary.max_depth}")
+
         # 输出详细的顶级分类信息
         print(f"\n🔍 顶级分类详情:")
-        for item in root_children:
-            if isinstance(item, dict) and item.get('type') == 'folder':
-                title = item.get('title', '未命名文件夹')
-                children_count = len(item.get('children', []))
-                print(f"  - {title}: {children_count} 个项目")
-        
+        for category in summary.categories:
+            print(f"  - {category.title}: {category.items} 个项目")
+
+        if summary.domains.counts:
+            note = "（近似计数）" if summary.domains.approximate else ""
+            print(f"\n🌐 常见域名{note}:")
+            for domain, count in summary.domains.most_common(10):
+                print(f"  - {domain}: {count}")
+
         return True
-        
+
     except json.JSONDecodeError as e:
         print(f"❌ JSON解析错误: {e}")
         return False
@@ -160,7 +277,7 @@ def analyze_json_file(file_path):
 if __name__ == "__main__":
     # 主程序
     json_file_path = "pintree.json"
-    
+
     if os.path.exists(json_file_path):
         analyze_json_file(json_file_path)
     else:
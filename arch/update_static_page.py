@@ -4,9 +4,17 @@
 静态导航页面更新工具
 根据正确的书签结构从pintree.json提取数据并更新static_navigation.html
 """
-import json
 import os
-import re
+import sys
+
+# 共用仓库根目录中的书签树和页面模板模块
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from bookmark_tree import BookmarkTree
+from html_splice import SpliceError
+from icon_resolver import IconResolver
+import json_codec
+from page_template import render_page
+from update_static_data import _escape_script_json
 
 def extract_navigation_data(json_file):
     """
@@ -20,26 +28,25 @@ def extract_navigation_data(json_file):
     """
     try:
         # 读取JSON文件
-        with open(json_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        tree = BookmarkTree.load(json_file)
         
         # 初始化导航数据
         navigation_data = {}
         
         # 查找根文件夹（通常是第一个元素）
-        if isinstance(data, list) and data:
-            root_folder = data[0] if len(data) == 1 else None
-            
-            # 如果根文件夹有children属性，使用它
-            if root_folder and 'children' in root_folder:
-                # 遍历顶级文件夹（资源、云服务、效率工具、JustFun）
-                for top_folder in root_folder['children']:
-                    if top_folder.get('type') == 'folder':
-                        folder_title = top_folder.get('title', '未命名文件夹')
-                        navigation_data[folder_title] = {}
-                        
-                        # 处理每个顶级文件夹下的内容
-                        process_folder_content(top_folder, navigation_data[folder_title])
+        top_level = list(tree.children())
+        root_folder = top_level[0] if len(top_level) == 1 else None
+        
+        # 如果根文件夹是文件夹，遍历其子项
+        if root_folder is not None and tree.is_folder(root_folder):
+            # 遍历顶级文件夹（资源、云服务、效率工具、JustFun）
+            for top_folder in tree.children(root_folder):
+                if tree.is_folder(top_folder):
+                    folder_title = tree.title(top_folder, '未命名文件夹')
+                    navigation_data[folder_title] = {}
+                    
+                    # 处理每个顶级文件夹下的内容
+                    process_folder_content(tree, top_folder, navigation_data[folder_title])
         
         return navigation_data
         
@@ -47,47 +54,54 @@ def extract_navigation_data(json_file):
         print(f"提取数据出错: {e}")
         return {}
 
-def process_folder_content(folder, target_dict):
+def make_link_data(tree, item):
     """
-    递归处理文件夹内容
+    构建链接数据
     
     参数:
-        folder: 文件夹对象
-        target_dict: 目标字典，用于存储处理后的内容
+        tree: 书签树
+        item: 链接节点id
     """
-    if 'children' not in folder:
-        return
+    return {
+        'type': 'link',
+        'title': tree.title(item, '未命名链接'),
+        'url': tree.url(item, '#'),
+        'icon': get_emoji_for_url(tree.url(item, ''))
+    }
+
+def process_folder_content(tree, folder, target_dict):
+    """
+    处理文件夹内容
     
+    参数:
+        tree: 书签树
+        folder: 文件夹节点id
+        target_dict: 目标字典，用于存储处理后的内容
+    """
     # 确保每个子分类都是数组格式
     # 先收集所有子文件夹
     subfolders = []
     links = []
     
-    for item in folder['children']:
-        if item.get('type') == 'link':
+    for item in tree.children(folder):
+        if tree.is_link(item):
             # 收集链接
-            link_data = {
-                'type': 'link',
-                'title': item.get('title', '未命名链接'),
-                'url': item.get('url', '#'),
-                'icon': get_emoji_for_url(item.get('url', ''))
-            }
-            links.append(link_data)
-        elif item.get('type') == 'folder':
+            links.append(make_link_data(tree, item))
+        else:
             # 收集子文件夹
             subfolders.append(item)
     
     # 处理子文件夹
     for subfolder in subfolders:
-        subfolder_title = subfolder.get('title', '未命名文件夹')
+        subfolder_title = tree.title(subfolder, '未命名文件夹')
         # 为子文件夹创建专门的子分类
         target_dict[subfolder_title] = []
-        process_folder_recursive(subfolder, target_dict[subfolder_title])
+        process_folder_recursive(tree, subfolder, target_dict[subfolder_title])
     
     # 处理当前文件夹的链接
     if links:
         # 如果是顶级文件夹或只有链接没有子文件夹
-        folder_title = folder.get('title', '未命名文件夹')
+        folder_title = tree.title(folder, '未命名文件夹')
         
         # 对于顶级文件夹（除了资源），使用"主要链接"作为子分类名
         if folder_title in ['云服务', '效率工具', 'JustFun']:
@@ -104,30 +118,75 @@ def process_folder_content(folder, target_dict):
                     target_dict['其他链接'] = []
                 target_dict['其他链接'].extend(links)
 
-def process_folder_recursive(folder, target_array):
+def process_folder_recursive(tree, folder, target_array):
     """
-    递归处理文件夹并将所有链接添加到目标数组
+    将文件夹子树中的所有链接按顺序添加到目标数组
     
     参数:
-        folder: 文件夹对象
+        tree: 书签树
+        folder: 文件夹节点id
         target_array: 目标数组，用于存储链接
     """
-    if 'children' not in folder:
-        return
-    
-    for item in folder['children']:
-        if item.get('type') == 'link':
-            # 直接添加链接到目标数组
-            link_data = {
-                'type': 'link',
-                'title': item.get('title', '未命名链接'),
-                'url': item.get('url', '#'),
-                'icon': get_emoji_for_url(item.get('url', ''))
-            }
-            target_array.append(link_data)
-        elif item.get('type') == 'folder':
-            # 递归处理子文件夹
-            process_folder_recursive(item, target_array)
+    # 子树在书签树中是连续的一段，按先序直接遍历即可
+    for item in tree.descendants(folder):
+        if tree.is_link(item):
+            target_array.append(make_link_data(tree, item))
+
+# 常见网站类型的emoji映射：网站名称在主机名中匹配
+SITE_EMOJIS = {
+    # 通用类型
+    'github': '💻',
+    'youtube': '🎬',
+    'bilibili': '📺',
+    'baidu': '🔍',
+    'google': '🔍',
+    'microsoft': '🪟',
+    'apple': '🍎',
+    'amazon': '🛒',
+    
+    # 学术类型
+    'scholar': '🎓',
+    'arxiv': '📄',
+    'cnki': '📚',
+    'ieee': '📝',
+}
+
+# 其余关键字在整个URL中匹配，靠前的优先
+KEYWORD_EMOJIS = {
+    # 工具类型
+    'pdf': '📄',
+    'image': '🖼️',
+    'photo': '📸',
+    'music': '🎵',
+    'video': '🎬',
+    
+    # 编程相关
+    'python': '🐍',
+    'java': '☕',
+    'javascript': '⚡',
+    'html': '🌐',
+    
+    # 办公相关
+    'word': '📝',
+    'excel': '📊',
+    'ppt': '📑',
+    'office': '🖋️',
+}
+
+# 根据URL类型返回通用图标
+for keywords, emoji in ((('mail', 'email', '@'), '📧'),
+                        (('news', 'article', 'blog'), '📰'),
+                        (('book', 'read', 'novel'), '📚'),
+                        (('map', 'location', 'place'), '🗺️'),
+                        (('weather', 'forecast'), '🌤️'),
+                        (('game', 'play', 'fun'), '🎮'),
+                        (('ai', 'chat', 'bot', '智能'), '🤖'),
+                        (('cloud', 'drive', 'storage'), '☁️')):
+    for keyword in keywords:
+        KEYWORD_EMOJIS.setdefault(keyword, emoji)
+
+# 规则只编译一次，同一主机名的解析结果会被缓存
+emoji_resolver = IconResolver(host_keywords=SITE_EMOJIS, keywords=KEYWORD_EMOJIS, default='🔗')
 
 def get_emoji_for_url(url):
     """
@@ -139,74 +198,7 @@ def get_emoji_for_url(url):
     返回:
         emoji: 对应的emoji图标
     """
-    # 常见网站类型的emoji映射
-    emoji_mapping = {
-        # 通用类型
-        'github': '💻',
-        'youtube': '🎬',
-        'bilibili': '📺',
-        'baidu': '🔍',
-        'google': '🔍',
-        'microsoft': '🪟',
-        'apple': '🍎',
-        'amazon': '🛒',
-        
-        # 学术类型
-        'scholar': '🎓',
-        'arxiv': '📄',
-        'cnki': '📚',
-        'ieee': '📝',
-        
-        # 工具类型
-        'pdf': '📄',
-        'image': '🖼️',
-        'photo': '📸',
-        'music': '🎵',
-        'video': '🎬',
-        
-        # 编程相关
-        'python': '🐍',
-        'java': '☕',
-        'javascript': '⚡',
-        'html': '🌐',
-        
-        # 办公相关
-        'word': '📝',
-        'excel': '📊',
-        'ppt': '📑',
-        'office': '🖋️',
-    }
-    
-    # 默认图标
-    default_emoji = '🔗'
-    
-    # 转换为小写进行匹配
-    url_lower = url.lower()
-    
-    # 查找匹配的emoji
-    for keyword, emoji in emoji_mapping.items():
-        if keyword in url_lower:
-            return emoji
-    
-    # 根据URL类型返回通用图标
-    if any(x in url_lower for x in ['mail', 'email', '@']):
-        return '📧'
-    elif any(x in url_lower for x in ['news', 'article', 'blog']):
-        return '📰'
-    elif any(x in url_lower for x in ['book', 'read', 'novel']):
-        return '📚'
-    elif any(x in url_lower for x in ['map', 'location', 'place']):
-        return '🗺️'
-    elif any(x in url_lower for x in ['weather', 'forecast']):
-        return '🌤️'
-    elif any(x in url_lower for x in ['game', 'play', 'fun']):
-        return '🎮'
-    elif any(x in url_lower for x in ['ai', 'chat', 'bot', '智能']):
-        return '🤖'
-    elif any(x in url_lower for x in ['cloud', 'drive', 'storage']):
-        return '☁️'
-    
-    return default_emoji
+    return emoji_resolver.resolve(url)
 
 def generate_js_data(navigation_data):
     """
@@ -218,24 +210,8 @@ def generate_js_data(navigation_data):
     返回:
         js_data: JavaScript代码字符串
     """
-    # 将Python字典转换为JavaScript对象字符串
-    js_data = "const navigationData = "
-    
-    # 使用json.dumps转换，然后进行一些调整使其更符合JavaScript风格
-    json_str = json.dumps(navigation_data, ensure_ascii=False, indent=4)
-    
-    # 修复缩进（4个空格改为2个空格）
-    lines = json_str.split('\n')
-    adjusted_lines = []
-    for line in lines:
-        indent_level = len(line) - len(line.lstrip())
-        new_indent = '  ' * (indent_level // 4)
-        adjusted_lines.append(new_indent + line.lstrip())
-    
-    js_data += '\n'.join(adjusted_lines)
-    js_data += ';'  # 添加分号
-    
-    return js_data
+    # 将Python字典转换为JavaScript对象字符串（紧凑格式，减小页面体积）
+    return "const navigationData = " + json_codec.dumps(navigation_data) + ';'
 
 def update_html_file(html_file, new_js_data):
     """
@@ -249,19 +225,16 @@ def update_html_file(html_file, new_js_data):
         success: 是否成功更新
     """
     try:
-        # 读取HTML文件
-        with open(html_file, 'r', encoding='utf-8') as f:
-            html_content = f.read()
-        
-        # 使用正则表达式替换navigationData部分
-        # 查找const navigationData = {...};
-        pattern = r'const navigationData = \{[\s\S]*?\};'
-        
-        # 替换为新的数据
-        new_html_content = re.sub(pattern, new_js_data, html_content, flags=re.MULTILINE)
-        
-        # 如果没有找到匹配的模式，添加到适当位置
-        if new_html_content == html_content:
+        prefix = 'const navigationData = '
+        try:
+            # 页面编译为模板，数据按navigationData插槽填入（旧版页面自动补上插槽标记）
+            values = {'navigationData': _escape_script_json(new_js_data[len(prefix):].rstrip(';'))}
+            render_page(html_file, values, legacy_slots=True)
+        except SpliceError:
+            # 页面中没有navigationData，添加到适当位置
+            with open(html_file, 'r', encoding='utf-8') as f:
+                html_content = f.read()
+            new_html_content = html_content
             # 找到script标签并在其内部添加数据
             script_pos = html_content.find('<script>')
             if script_pos != -1:
@@ -272,10 +245,10 @@ def update_html_file(html_file, new_js_data):
                 body_end_pos = html_content.find('</body>')
                 if body_end_pos != -1:
                     new_html_content = html_content[:body_end_pos] + '\n<script>\n' + new_js_data + '\n</script>\n' + html_content[body_end_pos:]
-        
-        # 写回HTML文件
-        with open(html_file, 'w', encoding='utf-8') as f:
-            f.write(new_html_content)
+            
+            # 写回HTML文件
+            with open(html_file, 'w', encoding='utf-8') as f:
+                f.write(new_html_content)
         
         print(f"✅ HTML文件已成功更新: {html_file}")
         return True
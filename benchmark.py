@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+转换流程性能基准模块
+
+功能：用合成书签（见synthetic_tree）按不同规模依次运行转换流程的各个阶段，
+记录每个阶段的耗时、峰值内存和输出大小，结果保存为JSON，可以与其他提交的结果对比。
+
+阶段（后面的阶段使用前面阶段的结果）：
+    generate      生成合成书签文件
+    load          流式读取为BookmarkTree
+    convert       convert_json_format 转换为导航数据
+    dedupe        合并重复链接
+    serialize     序列化为嵌入页面的数据
+    update_html   update_html_file 写入页面（内嵌模式）
+    shards        写出分类分片
+    search_index  生成搜索索引
+    analyze       arch/analyze_bookmarks.py 的 iter_structure（逐行产出结构报告并汇总）
+    stats         bookmark_stats 建立列式链接表并生成统计报告
+
+测量方式：
+    耗时      重复运行取最短时间（每次在新的临时目录中运行，写文件的阶段不会因文件已存在而跳过）
+    峰值内存  另外运行一次，用tracemalloc记录阶段内新分配内存的峰值（不影响耗时的测量）
+    输出大小  阶段写出的文件或生成的文本的字节数，不产生输出的阶段为null
+
+JSON的读写使用json_codec当前的后端，结果中记录后端名称；两种后端的输出相同，
+可以分别运行后用--compare对比load、serialize等阶段的耗时。
+
+使用方法：python navigation.py bench --links 10000 100000 -o bench.json [--compare old.json] [--json-backend json]
+"""
+
+import contextlib
+import gc
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+from bookmark_tree import BookmarkTree
+from data_shards import write_shards
+import json_codec
+from search_index import write_search_index
+from synthetic_tree import (DEFAULT_CJK_RATIO, DEFAULT_DEPTH, DEFAULT_DUPLICATE_RATE, DEFAULT_WIDTH,
+                            write_synthetic_tree)
+from update_static_data import convert_json_format, serialize_navigation_data, update_html_file
+from url_canon import collapse_duplicates
+
+RESULTS_VERSION = 1
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_SIZES = (10000, 100000)
+
+
+def _dir_size(path):
+    return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+
+
+# 每个阶段的准备函数：在给定的临时目录中完成准备工作（不计时），返回实际运行阶段的函数；
+# 运行函数返回 (结果, 输出字节数)，结果以阶段名称保存，供后面的阶段使用
+
+def _stage_generate(ctx, out_dir):
+    path = os.path.join(out_dir, 'pintree.json')
+
+    def run():
+        write_synthetic_tree(path, **ctx['tree_params'])
+        # 保存到工作目录，后面的阶段都读取这个文件
+        shutil.copyfile(path, ctx['tree_path'])
+        return ctx['tree_path'], os.path.getsize(path)
+    return run
+
+
+def _stage_load(ctx, out_dir):
+    return lambda: (BookmarkTree.load(ctx['generate']), None)
+
+
+def _stage_convert(ctx, out_dir):
+    return lambda: (convert_json_format(ctx['load']), None)
+
+
+def _stage_dedupe(ctx, out_dir):
+    # 合并会修改导航数据，每次运行都在一份副本上进行
+    data = json_codec.loads(json_codec.dumps(ctx['convert']))
+
+    def run():
+        collapse_duplicates(data)
+        return data, None
+    return run
+
+
+def _stage_serialize(ctx, out_dir):
+    def run():
+        js_data = serialize_navigation_data(ctx['dedupe'])
+        return js_data, len(js_data.encode('utf-8'))
+    return run
+
+
+def _stage_update_html(ctx, out_dir):
+    html_path = os.path.join(out_dir, 'index.html')
+    shutil.copyfile(ctx['template'], html_path)
+
+    def run():
+        if not update_html_file(html_path, None, ctx['serialize']):
+            raise RuntimeError('update_html_file 失败')
+        return None, os.path.getsize(html_path)
+    return run
+
+
+def _stage_shards(ctx, out_dir):
+    def run():
+        write_shards(ctx['dedupe'], out_dir)
+        return None, _dir_size(out_dir)
+    return run
+
+
+def _stage_search_index(ctx, out_dir):
+    def run():
+        path, _ = write_search_index(ctx['dedupe'], out_dir)
+        return None, os.path.getsize(path)
+    return run
+
+
+def _stage_analyze(ctx, out_dir):
+    from navigation import _load_arch_module
+    analyze_bookmarks = _load_arch_module('analyze_bookmarks')
+    tree = ctx['load']
+
+    def run():
+        _, nodes = analyze_bookmarks.split_root(tree.iter_nodes())
+        output_bytes = sum(len(line.encode('utf-8')) + 1 for line in analyze_bookmarks.iter_structure(nodes))
+        return None, output_bytes
+    return run
+
+
+def _stage_stats(ctx, out_dir):
+    from bookmark_stats import LinkTable, build_report
+    tree = ctx['load']
+
+    def run():
+        report = build_report(LinkTable(tree))
+        return None, len(json_codec.dumps(report).encode('utf-8'))
+    return run
+
+
+STAGES = (
+    ('generate', _stage_generate),
+    ('load', _stage_load),
+    ('convert', _stage_convert),
+    ('dedupe', _stage_dedupe),
+    ('serialize', _stage_serialize),
+    ('update_html', _stage_update_html),
+    ('shards', _stage_shards),
+    ('search_index', _stage_search_index),
+    ('analyze', _stage_analyze),
+    ('stats', _stage_stats),
+)
+
+
+def _run_once(prepare, ctx, work_dir, traced):
+    """
+    在新的临时目录中运行一次阶段
+
+    返回:
+        (结果, 输出字节数, 耗时秒数, 峰值内存字节数或None)
+    """
+    out_dir = tempfile.mkdtemp(dir=work_dir)
+    try:
+        run = prepare(ctx, out_dir)
+        gc.collect()
+        if traced:
+            tracemalloc.start()
+            baseline = tracemalloc.get_traced_memory()[0]
+        started = time.perf_counter()
+        result, output_bytes = run()
+        elapsed = time.perf_counter() - started
+        peak = None
+        if traced:
+            peak = tracemalloc.get_traced_memory()[1] - baseline
+            tracemalloc.stop()
+        return result, output_bytes, elapsed, peak
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
+
+
+def run_benchmark(sizes=DEFAULT_SIZES, width=DEFAULT_WIDTH, depth=DEFAULT_DEPTH,
+                  cjk_ratio=DEFAULT_CJK_RATIO, duplicate_rate=DEFAULT_DUPLICATE_RATE,
+                  seed=0, repeat=1, memory=True, template=None, verbose=True):
+    """
+    按各个规模运行全部阶段
+
+    参数:
+        sizes: 链接数量列表
+        width, depth, cjk_ratio, duplicate_rate, seed: 合成书签的参数（见synthetic_tree）
+        repeat: 每个阶段计时运行的次数（取最短时间）
+        memory: 是否额外运行一次测量峰值内存
+        template: update_html阶段使用的页面模板（默认使用仓库中的index.html）
+        verbose: 是否逐个输出阶段结果
+
+    返回:
+        dict: 基准结果（格式见write_results）
+    """
+    params = {"width": width, "depth": depth, "cjk_ratio": cjk_ratio,
+              "duplicate_rate": duplicate_rate, "seed": seed, "repeat": repeat}
+    results = []
+    with tempfile.TemporaryDirectory(prefix='navigation-bench-') as work_dir:
+        for links in sizes:
+            ctx = {
+                'tree_params': dict(params, links=links),
+                'tree_path': os.path.join(work_dir, f'pintree-{links}.json'),
+                'template': template or os.path.join(ROOT_DIR, 'index.html'),
+            }
+            del ctx['tree_params']['repeat']
+            for name, prepare in STAGES:
+                timings = []
+                # 各阶段的调试输出不计入结果，也不显示
+                with open(os.devnull, 'w', encoding='utf-8') as devnull, contextlib.redirect_stdout(devnull):
+                    for _ in range(max(repeat, 1)):
+                        result, output_bytes, elapsed, _ = _run_once(prepare, ctx, work_dir, False)
+                        timings.append(elapsed)
+                    peak = _run_once(prepare, ctx, work_dir, True)[3] if memory else None
+                ctx[name] = result
+                entry = {"links": links, "stage": name, "seconds": round(min(timings), 6),
+                         "peak_bytes": peak, "output_bytes": output_bytes}
+                results.append(entry)
+                if verbose:
+                    print(_format_entry(entry))
+            # 释放本规模的中间结果
+            ctx.clear()
+            gc.collect()
+
+    return {
+        "version": RESULTS_VERSION,
+        "created": datetime.now().isoformat(timespec='seconds'),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "json_backend": json_codec.backend(),
+        "params": params,
+        "results": results,
+    }
+
+
+def _git_commit():
+    """
+    当前仓库的提交（不是git仓库或没有git时返回None）
+    """
+    try:
+        output = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR,
+                                capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return output.stdout.strip() or None
+
+
+def _format_bytes(value):
+    if value is None:
+        return '-'
+    for unit in ('B', 'KB', 'MB'):
+        if value < 1024:
+            return f'{value:.0f} {unit}' if unit == 'B' else f'{value:.1f} {unit}'
+        value /= 1024
+    return f'{value:.1f} GB'
+
+
+def _format_entry(entry):
+    return (f"{entry['links']:>9} {entry['stage']:<13} {entry['seconds'] * 1000:>10.1f} ms"
+            f"  峰值内存 {_format_bytes(entry['peak_bytes']):>9}  输出 {_format_bytes(entry['output_bytes']):>9}")
+
+
+def write_results(results, path):
+    """
+    保存基准结果
+
+    结果格式：
+        {"version", "created", "commit", "python", "platform", "json_backend",
+         "params": {合成书签参数和重复次数},
+         "results": [{"links", "stage", "seconds", "peak_bytes", "output_bytes"}, ...]}
+    """
+    with open(path, 'w', encoding='utf-8') as f:
+        json_codec.dump(results, f, pretty=True)
+        f.write('\n')
+
+
+def compare_results(previous, current):
+    """
+    对比两次基准结果，按 (规模, 阶段) 输出耗时和峰值内存的变化
+
+    返回:
+        list: [{"links", "stage", "seconds_ratio", "peak_ratio"}]，比值为 当前/之前
+    """
+    before = {(entry['links'], entry['stage']): entry for entry in previous.get('results', [])}
+    if previous.get('params') != current.get('params'):
+        print("注意: 两次基准的合成书签参数不同，结果不能直接比较")
+    if previous.get('json_backend') != current.get('json_backend'):
+        print(f"注意: JSON后端 {previous.get('json_backend') or '未记录'} -> {current.get('json_backend')}")
+    print(f"对比 {previous.get('commit') or '之前'} -> {current.get('commit') or '当前'}")
+    comparison = []
+    for entry in current['results']:
+        old = before.get((entry['links'], entry['stage']))
+        if old is None:
+            continue
+        seconds_ratio = entry['seconds'] / old['seconds'] if old['seconds'] else None
+        peak_ratio = (entry['peak_bytes'] / old['peak_bytes']
+                      if entry['peak_bytes'] is not None and old.get('peak_bytes') else None)
+        comparison.append({"links": entry['links'], "stage": entry['stage'],
+                           "seconds_ratio": seconds_ratio, "peak_ratio": peak_ratio})
+        time_text = f'{seconds_ratio:.2f}x' if seconds_ratio is not None else '-'
+        peak_text = f'{peak_ratio:.2f}x' if peak_ratio is not None else '-'
+        print(f"{entry['links']:>9} {entry['stage']:<13} 耗时 {time_text:>7}  峰值内存 {peak_text:>7}")
+    return comparison
+
+
+def main(sizes=DEFAULT_SIZES, output=None, compare=None, json_backend=None, **options):
+    """
+    运行基准，保存结果并与之前的结果对比
+
+    参数:
+        json_backend: 使用的JSON后端（见json_codec），None表示保持当前后端
+
+    返回:
+        int: 退出码（0 成功，1 失败）
+    """
+    if json_backend:
+        try:
+            json_codec.use_backend(json_backend)
+        except ValueError as e:
+            print(f"❌ {e}", file=sys.stderr)
+            return 1
+
+    previous = None
+    if compare:
+        try:
+            with open(compare, 'r', encoding='utf-8') as f:
+                previous = json_codec.load(f)
+        except (OSError, ValueError) as e:
+            print(f"❌ 读取对比结果失败: {e}", file=sys.stderr)
+            return 1
+
+    try:
+        results = run_benchmark(sizes, **options)
+    except (OSError, RuntimeError) as e:
+        print(f"❌ 基准运行失败: {e}", file=sys.stderr)
+        return 1
+
+    if output:
+        write_results(results, output)
+        print(f"✅ 基准结果已保存: {output}")
+    if previous is not None:
+        compare_results(previous, results)
+    return 0
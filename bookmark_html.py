@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+浏览器书签HTML导入模块
+
+功能：流式读取浏览器导出的Netscape格式书签文件（bookmarks.html），
+产出与bookmark_stream相同的文件夹/链接节点事件流，可直接交给convert_json_format和BookmarkTree。
+
+文件结构：
+    <DT><H3 ADD_DATE="...">文件夹</H3>
+    <DL><p>
+        <DT><A HREF="..." ADD_DATE="..." ICON="data:image/png;base64,...">链接</A>
+    </DL><p>
+
+解析使用只识别本格式所需标签的增量分词器，每次只在内存中保留一个读取块；
+ICON属性中的base64图标数据在读取过程中直接跳过，不会被拼接成字符串。
+"""
+
+import html
+
+from bookmark_stream import CHUNK_SIZE, END, FOLDER, LINK, open_bookmark_file
+
+# 不需要保存值的属性（内嵌图标数据可能有几十KB）
+SKIPPED_ATTRIBUTES = frozenset({'icon'})
+
+_SPACE = ' \t\r\n\f'
+
+
+class _HtmlScanner:
+    """
+    按块读取文本的扫描器，缓冲区中只保留尚未处理的内容
+    """
+
+    def __init__(self, fp, chunk_size=CHUNK_SIZE):
+        self.fp = fp
+        self.chunk_size = chunk_size
+        self.buf = ''
+        self.pos = 0
+
+    def _fill(self):
+        """
+        读入下一块，丢弃当前位置之前已处理的内容
+
+        返回:
+            bool: 是否读到了新内容
+        """
+        data = self.fp.read(self.chunk_size)
+        if not data:
+            return False
+        self.buf = self.buf[self.pos:] + data
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """
+        返回当前位置的字符（不前进），文件结束时返回空字符串
+        """
+        if self.pos >= len(self.buf) and not self._fill():
+            return ''
+        return self.buf[self.pos]
+
+    def next(self):
+        char = self.peek()
+        self.pos += len(char)
+        return char
+
+    def skip_to(self, marker):
+        """
+        跳到marker所在位置，跳过的内容直接丢弃
+
+        返回:
+            bool: 是否找到marker
+        """
+        while True:
+            index = self.buf.find(marker, self.pos)
+            if index >= 0:
+                self.pos = index
+                return True
+            # marker可能跨越两个读取块，保留末尾不完整的部分
+            self.pos = max(self.pos, len(self.buf) - len(marker) + 1)
+            if not self._fill():
+                self.pos = len(self.buf)
+                return False
+
+    def read_to(self, stop_chars):
+        """
+        读取到stop_chars中任一字符之前的文本（不包含该字符）
+        """
+        parts = []
+        while True:
+            start = self.pos
+            while self.pos < len(self.buf) and self.buf[self.pos] not in stop_chars:
+                self.pos += 1
+            parts.append(self.buf[start:self.pos])
+            if self.pos < len(self.buf) or not self._fill():
+                return ''.join(parts)
+
+    def skip_while(self, chars):
+        while self.peek() and self.buf[self.pos] in chars:
+            self.pos += 1
+
+    def read_tag(self):
+        """
+        读取一个标签（当前位置为'<'）
+
+        返回:
+            (name, attrs): 小写的标签名（结束标签以'/'开头）和属性字典；
+                           注释、文档类型声明等返回 (None, None)
+        """
+        self.next()
+        if self.peek() == '!':
+            self.next()
+            if self.peek() == '-':
+                found = self.skip_to('-->')
+                self.pos += 3 if found else 0
+            else:
+                found = self.skip_to('>')
+                self.pos += 1 if found else 0
+            return None, None
+
+        name = self.read_to(_SPACE + '>').lower()
+        attrs = {}
+        while True:
+            self.skip_while(_SPACE + '/')
+            char = self.peek()
+            if char in ('>', ''):
+                self.next()
+                return name, attrs
+            key = self.read_to(_SPACE + '=>').lower()
+            self.skip_while(_SPACE)
+            if self.peek() != '=':
+                attrs[key] = ''
+                continue
+            self.next()
+            self.skip_while(_SPACE)
+            quote = self.peek()
+            if quote in ('"', "'"):
+                self.next()
+                if key in SKIPPED_ATTRIBUTES:
+                    self.skip_to(quote)
+                    value = None
+                else:
+                    value = self.read_to(quote)
+                self.next()
+            else:
+                value = self.read_to(_SPACE + '>')
+            if value is not None:
+                attrs[key] = html.unescape(value)
+
+    def read_text(self):
+        """
+        读取到下一个标签之前的文本，并解码HTML实体
+        """
+        return html.unescape(self.read_to('<')).strip()
+
+
+def _add_date(attrs):
+    """
+    把ADD_DATE（秒，部分浏览器为微秒）换算成pintree使用的毫秒时间戳
+    """
+    try:
+        value = int(attrs.get('add_date', ''))
+    except ValueError:
+        return None
+    if value > 10 ** 14:
+        return value // 1000
+    return value * 1000
+
+
+def iter_html_bookmark_nodes(fp, chunk_size=CHUNK_SIZE):
+    """
+    从Netscape格式的书签HTML流式读取书签，逐个产出文件夹/链接节点
+
+    参数:
+        fp: 文本文件对象
+        chunk_size: 每次读取的字符数
+
+    返回:
+        节点事件生成器（与bookmark_stream.iter_bookmark_nodes相同）
+    """
+    scanner = _HtmlScanner(fp, chunk_size)
+    # 每个打开的<DL>是否属于某个文件夹（最外层的<DL>不属于任何文件夹）
+    lists = []
+    # 刚读到<H3>、还未遇到其<DL>的文件夹
+    pending_folder = False
+
+    while scanner.skip_to('<'):
+        name, attrs = scanner.read_tag()
+        if name is None:
+            continue
+
+        if pending_folder and name in ('h3', 'a', '/dl'):
+            # 没有<DL>的空文件夹
+            yield END, None
+            pending_folder = False
+
+        if name == 'dl':
+            lists.append(pending_folder)
+            pending_folder = False
+        elif name == '/dl':
+            if lists and lists.pop():
+                yield END, None
+        elif name == 'h3':
+            folder = {"type": "folder", "title": scanner.read_text()}
+            add_date = _add_date(attrs)
+            if add_date is not None:
+                folder["addDate"] = add_date
+            yield FOLDER, folder
+            pending_folder = True
+        elif name == 'a':
+            link = {"type": "link", "title": scanner.read_text(), "url": attrs.get('href', '')}
+            add_date = _add_date(attrs)
+            if add_date is not None:
+                link["addDate"] = add_date
+            if attrs.get('icon_uri'):
+                link["icon"] = attrs['icon_uri']
+            yield LINK, link
+
+    # 文件不完整时补齐仍未结束的文件夹
+    if pending_folder:
+        yield END, None
+    for is_folder in lists:
+        if is_folder:
+            yield END, None
+
+
+def is_bookmark_html(path):
+    """
+    判断书签文件是否为HTML格式（按扩展名和文件开头的内容判断）
+    """
+    lower = str(path).lower()
+    if lower.endswith(('.html', '.htm', '.html.gz', '.htm.gz')):
+        return True
+    with open_bookmark_file(path) as f:
+        head = f.read(512).lstrip()
+    return head.startswith('<')
@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+书签增量合并模块
+
+功能：把多台电脑的书签导出合并到一个主书签文件（pintree格式）中，合并结果可直接用于生成页面。
+
+每个来源（导出文件名或指定的名称）记录一个水位线，即上次合并时见过的最大addDate，
+再次合并时只处理比水位线更新的链接；“链接是否已在主书签中”先用布隆过滤器判断，
+只有过滤器认为可能存在时才建立主书签的精确URL集合确认。因此合并的计算量与新增链接数量成正比，
+主书签只在确实有新增链接时读取和写回一次。
+
+链接按规范URL（见url_canon）判断是否重复，新链接放入主书签中同一路径的文件夹，
+文件夹不存在时自动创建，不同浏览器的“其他书签”根目录视为同一个文件夹。
+合并只增加链接，不会删除主书签中已有的内容。
+
+合并状态（水位线和布隆过滤器）保存在主书签旁边的 .merge_state.<主书签文件名（不含扩展名）>.json 中，
+同时记录主书签的大小和修改时间；该文件丢失，或主书签在合并之外被修改（重新导出、手动编辑）时，
+布隆过滤器会根据主书签重新建立。主书签以.gz结尾时按gzip压缩读写。
+"""
+
+import base64
+import gzip
+import math
+import os
+import time
+
+from bookmark_html import is_bookmark_html, iter_html_bookmark_nodes
+from bookmark_stream import END, FOLDER, LINK, iter_bookmark_nodes, open_bookmark_file
+from bookmark_tree import OTHER_BOOKMARKS_TITLES
+from html_splice import atomic_write
+import json_codec
+from url_canon import url_key
+
+STATE_NAME = '.merge_state.{}.json'
+STATE_VERSION = 2
+
+# 布隆过滤器的默认容量和误判率
+DEFAULT_CAPACITY = 4096
+DEFAULT_ERROR_RATE = 0.001
+
+
+class BloomFilter:
+    """
+    以64位URL键为元素的布隆过滤器
+
+    参数:
+        capacity: 预计元素数量
+        error_rate: 期望的误判率
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, error_rate=DEFAULT_ERROR_RATE):
+        self.capacity = max(capacity, 1)
+        self.error_rate = error_rate
+        self.size = max(64, int(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        # 由一个64位哈希派生多个位置（双重哈希）
+        h1 = key & 0xffffffff
+        h2 = (key >> 32) | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    def is_full(self):
+        return self.count >= self.capacity
+
+    def to_dict(self):
+        return {
+            "capacity": self.capacity,
+            "error_rate": self.error_rate,
+            "count": self.count,
+            "bits": base64.b64encode(bytes(self.bits)).decode('ascii'),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        bloom = cls(data['capacity'], data['error_rate'])
+        bits = base64.b64decode(data['bits'])
+        if len(bits) != len(bloom.bits):
+            raise ValueError('布隆过滤器数据长度不一致')
+        bloom.bits = bytearray(bits)
+        bloom.count = data['count']
+        return bloom
+
+
+def iter_export_nodes(path):
+    """
+    读取导出文件（pintree JSON或浏览器书签HTML），产出节点事件流
+    """
+    iter_nodes = iter_html_bookmark_nodes if is_bookmark_html(path) else iter_bookmark_nodes
+    with open_bookmark_file(path) as f:
+        yield from iter_nodes(f)
+
+
+def iter_new_links(nodes, watermark):
+    """
+    从节点事件流中挑出比水位线更新的链接
+
+    参数:
+        nodes: 节点事件流
+        watermark: 水位线（毫秒时间戳），None表示该来源第一次合并，全部链接都是新的
+
+    返回:
+        生成器，产出 (文件夹路径, 各级文件夹属性, 链接属性)
+    """
+    folders = []
+    for event, item in nodes:
+        if event == FOLDER:
+            folders.append(item)
+        elif event == END:
+            folders.pop()
+        elif event == LINK and item.get('url'):
+            if watermark is None or (item.get('addDate') or 0) > watermark:
+                yield tuple(folder.get('title', '') for folder in folders), list(folders), item
+
+
+def _iter_master_urls(items):
+    """
+    遍历主书签中全部链接的URL
+    """
+    stack = [items]
+    while stack:
+        for item in stack.pop():
+            if not isinstance(item, dict):
+                continue
+            if item.get('type') == 'link':
+                if item.get('url'):
+                    yield item['url']
+            elif isinstance(item.get('children'), list):
+                stack.append(item['children'])
+
+
+def master_stamp(path):
+    """
+    主书签文件的 [大小, 修改时间]，文件不存在时返回None
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+class MergeState:
+    """
+    主书签的合并状态：各来源的水位线、已有链接的布隆过滤器，以及建立过滤器时主书签的文件状态
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.sources = {}
+        self.bloom = None
+        self.master = None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json_codec.load(f)
+            if data.get('version') == STATE_VERSION:
+                self.sources = data.get('sources', {})
+                self.bloom = BloomFilter.from_dict(data['bloom'])
+                self.master = data.get('master')
+        except (OSError, ValueError, KeyError, TypeError):
+            self.sources = {}
+            self.bloom = None
+            self.master = None
+
+    def is_current(self, master_path):
+        """
+        布隆过滤器是否与主书签一致（主书签在上次合并之后没有被其他程序修改）
+        """
+        return self.bloom is not None and self.master == master_stamp(master_path)
+
+    def rebuild_bloom(self, master):
+        """
+        根据主书签中的全部链接重新建立布隆过滤器（首次合并、状态丢失、主书签被修改或过滤器已满时）
+        """
+        keys = {url_key(url) for url in _iter_master_urls(master)}
+        self.bloom = BloomFilter(max(DEFAULT_CAPACITY, len(keys) * 2))
+        for key in keys:
+            self.bloom.add(key)
+        return keys
+
+    def save(self):
+        data = {
+            "version": STATE_VERSION,
+            "sources": self.sources,
+            "master": self.master,
+            "bloom": self.bloom.to_dict(),
+        }
+        atomic_write(self.path, json_codec.dumps(data, pretty=True))
+
+
+class _MasterTree:
+    """
+    延迟载入的主书签，只在需要插入链接或确认重复时读取文件
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._items = None
+        self._folders = {}
+        self.keys = None
+
+    @property
+    def items(self):
+        if self._items is None:
+            try:
+                with open_bookmark_file(self.path) as f:
+                    self._items = json_codec.load(f)
+            except FileNotFoundError:
+                self._items = []
+            if isinstance(self._items, dict):
+                self._items = [self._items]
+        return self._items
+
+    def contains(self, key):
+        """
+        精确判断主书签中是否已有该链接（第一次调用时建立URL键集合）
+        """
+        if self.keys is None:
+            self.keys = {url_key(url) for url in _iter_master_urls(self.items)}
+        return key in self.keys
+
+    def folder_children(self, path, folders):
+        """
+        返回路径对应文件夹的children列表，不存在的文件夹按导出中的属性创建
+
+        参数:
+            path: 文件夹标题路径
+            folders: 导出中各级文件夹的属性
+        """
+        if path in self._folders:
+            return self._folders[path]
+        if not path:
+            return self.items
+        parent = self.folder_children(path[:-1], folders[:-1])
+        title = path[-1]
+        for item in parent:
+            if isinstance(item, dict) and item.get('type') == 'folder' and item.get('title') == title:
+                break
+        else:
+            item = {key: value for key, value in folders[-1].items() if key != 'children'}
+            parent.append(item)
+        if not isinstance(item.get('children'), list):
+            item['children'] = []
+        self._folders[path] = item['children']
+        return item['children']
+
+    def other_bookmarks_title(self):
+        """
+        主书签中“其他书签”根目录的实际名称
+        """
+        for item in self.items:
+            if isinstance(item, dict) and item.get('title') in OTHER_BOOKMARKS_TITLES:
+                return item['title']
+        return None
+
+    def save(self):
+        text = json_codec.dumps(self.items, pretty=True)
+        if not self.path.endswith('.gz'):
+            atomic_write(self.path, text)
+            return
+        # 与读取时一致，.gz文件按gzip压缩写回
+        tmp_path = f'{self.path}.tmp'
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp_path, self.path)
+
+
+def merge_export(master_path, export_path, source=None):
+    """
+    把一个导出文件增量合并到主书签
+
+    参数:
+        master_path: 主书签文件（pintree格式的JSON，不存在时新建）
+        export_path: 导出文件（pintree JSON或浏览器书签HTML）
+        source: 来源名称（默认使用导出文件名），每个来源单独记录水位线
+
+    返回:
+        dict: 合并结果 {"source", "scanned", "added", "duplicates", "watermark"}
+    """
+    source = source or os.path.basename(export_path)
+    state = MergeState(os.path.join(os.path.dirname(os.path.abspath(master_path)),
+                                    STATE_NAME.format(os.path.splitext(os.path.basename(master_path))[0])))
+    master = _MasterTree(master_path)
+
+    if not state.is_current(master_path):
+        master.keys = state.rebuild_bloom(master.items)
+
+    watermark = state.sources.get(source)
+    new_watermark = watermark or 0
+    other_title = None
+    result = {"source": source, "scanned": 0, "added": 0, "duplicates": 0}
+
+    for path, folders, link in iter_new_links(iter_export_nodes(export_path), watermark):
+        result["scanned"] += 1
+        new_watermark = max(new_watermark, link.get('addDate') or 0)
+        key = url_key(link['url'])
+        if key in state.bloom and master.contains(key):
+            result["duplicates"] += 1
+            continue
+
+        # 不同浏览器的“其他书签”根目录名称不同，统一放到主书签已有的根目录中
+        if path and path[0] in OTHER_BOOKMARKS_TITLES:
+            if other_title is None:
+                other_title = master.other_bookmarks_title() or path[0]
+            path = (other_title,) + path[1:]
+
+        master.folder_children(path, folders).append(dict(link))
+        if master.keys is not None:
+            master.keys.add(key)
+        if state.bloom.is_full():
+            # 按当前链接数的两倍重新分配，新链接已在主书签中，会一并加入
+            master.keys = state.rebuild_bloom(master.items)
+        else:
+            state.bloom.add(key)
+        result["added"] += 1
+
+    if result["added"]:
+        master.save()
+    state.sources[source] = new_watermark
+    state.master = master_stamp(master_path)
+    state.save()
+    result["watermark"] = new_watermark
+    return result
+
+
+def main(master_path, export_paths, source=None):
+    """
+    依次合并多个导出文件
+
+    返回:
+        int: 退出码（0 成功，1 读取失败）
+    """
+    for export_path in export_paths:
+        started = time.perf_counter()
+        try:
+            result = merge_export(master_path, export_path, source)
+        except (OSError, ValueError) as e:
+            print(f"❌ 合并 {export_path} 失败: {e}")
+            return 1
+        elapsed = (time.perf_counter() - started) * 1000
+        print(f"✅ {result['source']}: 检查 {result['scanned']} 个新链接，"
+              f"新增 {result['added']} 个，重复 {result['duplicates']} 个（用时 {elapsed:.0f} ms）")
+    return 0
@@ -0,0 +1,482 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+书签统计模块
+
+功能：统计整个书签集合：每月新增的链接数（按addDate）、常见域名、各文件夹的链接数和过期链接，
+结果输出为JSON或CSV报告。
+
+列式链接表：
+    书签树（见bookmark_tree）本身以平行数组保存，统计时直接从中取出链接对应的几列：
+        add_date  添加时间（毫秒，0表示缺失）
+        domain    域名编码，domains[编码]为域名（字典编码，相同的域名只保存一份）
+        folder    所在文件夹的节点id（以书签树的文件夹作为字典），顶层链接为-1
+        url       URL在书签树字符串表中的序号
+    各项统计都是对整列的直方图和分组计数：安装了numpy时使用numpy的数组运算，
+    否则使用标准库的array、itertools和Counter，计数在C中完成，不逐个链接执行Python代码。
+
+域名提取：
+    不重复的URL拼接后用一个正则表达式一次提取全部主机名，只有不是普通http(s)地址的URL
+    （带端口、用户名或非ASCII字符等）才逐个调用search_index.url_hostname，结果与逐个提取相同。
+
+月份按UTC计算；添加时间缺失或超出范围的链接计入“无日期”。
+"""
+
+import csv
+import operator
+import os
+import re
+import sys
+import time
+from array import array
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone
+from itertools import accumulate, compress
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from bookmark_tree import KIND_FOLDER, KIND_LINK, NO_STRING, OTHER_BOOKMARKS_TITLES, BookmarkTree
+import json_codec
+from link_checker import DEFAULT_CACHE_NAME as LINK_CACHE_NAME, STATE_DEAD, load_link_statuses
+from search_index import url_hostname
+
+REPORT_VERSION = 1
+DEFAULT_TOP = 20
+# 添加时间早于这么多天的链接算作过期
+DEFAULT_STALE_DAYS = 3 * 365
+
+ENGINE_NUMPY = 'numpy'
+ENGINE_ARRAY = 'array'
+
+DAY_MS = 24 * 3600 * 1000
+# 有效添加时间的上限（10000-01-01，毫秒）
+MAX_DATE = 2932897 * DAY_MS
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+PATH_SEPARATOR = ' / '
+
+# 普通http(s)地址的主机名；每行一个URL，不匹配的行得到空字符串
+_HOSTNAME = re.compile(r'^(?:https?://([a-z0-9.-]+)(?=[/?#\n]|\Z))?.*$', re.M)
+
+
+def extract_hostnames(urls):
+    """
+    批量提取URL的主机名
+
+    参数:
+        urls: URL列表
+
+    返回:
+        list: 与urls一一对应的主机名（与逐个调用url_hostname的结果相同）
+    """
+    if not urls:
+        return []
+    text = '\n'.join(urls)
+    hosts = None
+    # URL中含有换行时无法按行对应
+    if text.count('\n') == len(urls) - 1:
+        hosts = _HOSTNAME.findall(text.lower())
+    if hosts is None or len(hosts) != len(urls):
+        return [url_hostname(url) for url in urls]
+    for i, host in enumerate(hosts):
+        if not host and urls[i]:
+            hosts[i] = url_hostname(urls[i])
+    return hosts
+
+
+def _encode(values):
+    """
+    字典编码
+
+    返回:
+        (字典列表, 与values一一对应的编码列表)
+    """
+    dictionary = list(dict.fromkeys(values))
+    codes = dict(zip(dictionary, range(len(dictionary))))
+    return dictionary, list(map(codes.__getitem__, values))
+
+
+def _top_items(counts, n):
+    """
+    按数量从多到少取前n项，数量相同时按键排序
+
+    参数:
+        counts: 键 -> 数量
+    """
+    if n <= 0 or not counts:
+        return []
+    if len(counts) > n:
+        # 先找出第n大的数量，只对不少于它的项排序
+        threshold = sorted(counts.values(), reverse=True)[n - 1]
+        counts = {key: value for key, value in counts.items() if value >= threshold}
+    return sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:n]
+
+
+def _day_month(day):
+    month = date.fromordinal(_EPOCH_ORDINAL + day)
+    return f'{month.year:04d}-{month.month:02d}'
+
+
+def _format_day(date_ms):
+    return datetime.fromtimestamp(date_ms / 1000, timezone.utc).strftime('%Y-%m-%d')
+
+
+class LinkTable:
+    """
+    书签中全部链接的列式表（列的含义见模块说明）
+
+    参数:
+        tree: BookmarkTree
+        engine: 'numpy'或'array'，None表示安装了numpy时使用numpy
+    """
+
+    def __init__(self, tree, engine=None):
+        if engine is None:
+            engine = ENGINE_NUMPY if numpy is not None else ENGINE_ARRAY
+        if engine == ENGINE_NUMPY and numpy is None:
+            raise ValueError("未安装numpy")
+        self.tree = tree
+        self.engine = engine
+        if engine == ENGINE_NUMPY:
+            self._load_numpy(tree)
+        else:
+            self._load_array(tree)
+
+    def _load_numpy(self, tree):
+        kinds = numpy.frombuffer(tree.kinds, dtype=numpy.uint8)
+        links = kinds == KIND_LINK
+        self.add_date = numpy.frombuffer(tree.add_dates, dtype=numpy.int64)[links]
+        self.folder = numpy.frombuffer(tree.parents, dtype=numpy.int32)[links]
+        self.url = numpy.frombuffer(tree.urls, dtype=numpy.int32)[links]
+
+        unique, inverse = numpy.unique(self.url, return_inverse=True)
+        self.domains, codes = _encode(extract_hostnames(self._url_texts(unique.tolist())))
+        self.domain = numpy.asarray(codes, dtype=numpy.int32)[inverse]
+
+    def _load_array(self, tree):
+        # 文件夹的类型为0，链接为1，类型数组本身就是链接的选择器
+        self.add_date = array('q', compress(tree.add_dates, tree.kinds))
+        self.folder = array('i', compress(tree.parents, tree.kinds))
+        self.url = array('i', compress(tree.urls, tree.kinds))
+
+        # 重复的URL很少，不先去重，直接提取每个链接的主机名
+        self.domains, codes = _encode(extract_hostnames(self._url_texts(self.url)))
+        self.domain = array('i', codes)
+
+    def _url_texts(self, url_ids):
+        texts = list(map(self.tree.strings.__getitem__, url_ids))
+        # 缺少URL的链接（序号为-1）取到的是字符串表的最后一项，改为空字符串
+        if NO_STRING in url_ids:
+            for i in compress(range(len(texts)), map(NO_STRING.__eq__, url_ids)):
+                texts[i] = ''
+        return texts
+
+    def __len__(self):
+        return len(self.url)
+
+    def folder_path(self, folder_id):
+        """
+        文件夹的路径（省略“其他书签”一级目录），例如 “资源 / 通用搜索工具”
+        """
+        if folder_id < 0:
+            return ''
+        path = self.tree.path(folder_id)
+        if path and path[0] in OTHER_BOOKMARKS_TITLES:
+            path = path[1:]
+        return PATH_SEPARATOR.join(path)
+
+    def monthly(self):
+        """
+        每月新增的链接数
+
+        返回:
+            (按月份排序的[(月份'YYYY-MM', 数量)], 无日期的链接数)
+        """
+        if self.engine == ENGINE_NUMPY:
+            valid = (self.add_date > 0) & (self.add_date < MAX_DATE)
+            months = self.add_date[valid].astype('datetime64[ms]').astype('datetime64[M]')
+            unique, counts = numpy.unique(months, return_counts=True)
+            return ([(str(month), int(count)) for month, count in zip(unique, counts.tolist())],
+                    len(self) - int(valid.sum()))
+
+        # 先按天计数（不同的天数远少于链接数），再合并为月
+        days = Counter(map(DAY_MS.__rfloordiv__, self.add_date))
+        # 第0天中包含添加时间为0（缺失）的链接
+        days[0] -= self.add_date.count(0)
+        months = Counter()
+        undated = 0
+        for day, count in days.items():
+            if 0 <= day < MAX_DATE // DAY_MS:
+                months[_day_month(day)] += count
+            else:
+                undated += count
+        undated += self.add_date.count(0)
+        return sorted((month, count) for month, count in months.items() if count), undated
+
+    def date_range(self):
+        """
+        有效添加时间的最早和最晚值（毫秒），没有时为(None, None)
+        """
+        if self.engine == ENGINE_NUMPY:
+            dates = self.add_date[(self.add_date > 0) & (self.add_date < MAX_DATE)]
+            return (int(dates.min()), int(dates.max())) if len(dates) else (None, None)
+        dates = [date for date in (min(self.add_date, default=0), max(self.add_date, default=0))
+                 if 0 < date < MAX_DATE]
+        if len(dates) == 2:
+            return tuple(dates)
+        # 有缺失或无效的时间，需要逐个筛选
+        dates = [date for date in self.add_date if 0 < date < MAX_DATE]
+        return (min(dates), max(dates)) if dates else (None, None)
+
+    def domain_counts(self):
+        """
+        各域名的链接数（不含没有域名的链接）
+
+        返回:
+            dict: 域名 -> 数量
+        """
+        if self.engine == ENGINE_NUMPY:
+            counts = numpy.bincount(self.domain, minlength=len(self.domains))
+            codes = numpy.flatnonzero(counts).tolist()
+            counts = counts[codes].tolist()
+        else:
+            counts = Counter(self.domain)
+            codes = counts.keys()
+            counts = counts.values()
+        domains = dict(zip(map(self.domains.__getitem__, codes), counts))
+        domains.pop('', None)
+        return domains
+
+    def folder_sizes(self):
+        """
+        各文件夹的链接数
+
+        返回:
+            list: [(文件夹id, 子树中的链接数, 直接包含的链接数)]，按文件夹id排序
+        """
+        tree = self.tree
+        if self.engine == ENGINE_NUMPY:
+            kinds = numpy.frombuffer(tree.kinds, dtype=numpy.uint8)
+            # prefix[i]为前i个节点中的链接数，文件夹的子树是连续的一段[id + 1, end)
+            prefix = numpy.concatenate(([0], numpy.cumsum(kinds == KIND_LINK)))
+            folders = numpy.flatnonzero(kinds == KIND_FOLDER)
+            ends = numpy.frombuffer(tree.ends, dtype=numpy.int32)[folders]
+            subtree = prefix[ends] - prefix[folders + 1]
+            direct = numpy.bincount(self.folder[self.folder >= 0], minlength=len(tree))[folders]
+            return list(zip(folders.tolist(), subtree.tolist(), direct.tolist()))
+
+        prefix = list(accumulate(tree.kinds, initial=0))
+        folders = list(compress(range(len(tree)), map(operator.not_, tree.kinds)))
+        direct = Counter(self.folder)
+        ends = tree.ends
+        return [(folder, prefix[ends[folder]] - prefix[folder + 1], direct.get(folder, 0))
+                for folder in folders]
+
+    def stale_flags(self, before, dead_urls=()):
+        """
+        标记过期的链接：添加时间早于before，或链接检查结果为失效
+
+        参数:
+            before: 时间界限（毫秒）
+            dead_urls: 失效链接的URL集合
+
+        返回:
+            (每个链接是否过期的列, 过期的链接数, 失效的链接数)
+        """
+        dead_ids = {url_id for url_id in map(self._url_id, dead_urls) if url_id is not None}
+        if self.engine == ENGINE_NUMPY:
+            stale = (self.add_date > 0) & (self.add_date < before)
+            old = int(stale.sum())
+            dead = numpy.isin(self.url, numpy.fromiter(dead_ids, dtype=numpy.int32, count=len(dead_ids)))
+            return stale | dead, old, int(dead.sum())
+
+        stale = bytearray(map(before.__gt__, self.add_date))
+        # 添加时间缺失（或无效）的链接不算过期，这样的链接很少，逐个清除
+        for i in compress(range(len(stale)), map((0).__ge__, self.add_date)):
+            stale[i] = 0
+        old = stale.count(1)
+        dead = 0
+        if dead_ids:
+            dead_flags = bytearray(map(dead_ids.__contains__, self.url))
+            dead = dead_flags.count(1)
+            stale = bytearray(map(operator.or_, stale, dead_flags))
+        return stale, old, dead
+
+    def count_by_folder(self, flags):
+        """
+        按文件夹统计被标记的链接数
+
+        返回:
+            dict: 文件夹id -> 数量
+        """
+        if self.engine == ENGINE_NUMPY:
+            # 顶层链接的文件夹为-1，整体加1后计数
+            counts = numpy.bincount(self.folder[flags] + 1, minlength=len(self.tree) + 1)
+            nonzero = numpy.flatnonzero(counts)
+            return dict(zip((nonzero - 1).tolist(), counts[nonzero].tolist()))
+        return Counter(compress(self.folder, flags))
+
+    def _url_id(self, url):
+        node_id = self.tree.find_url(url)
+        return None if node_id is None else self.tree.urls[node_id]
+
+
+def build_report(table, top=DEFAULT_TOP, stale_days=DEFAULT_STALE_DAYS, statuses=None, now=None):
+    """
+    生成统计报告
+
+    参数:
+        table: LinkTable
+        top: 常见域名、最大文件夹等列表的长度
+        stale_days: 添加时间早于这么多天的链接算作过期
+        statuses: 链接检查结果（见link_checker），失效的链接也算作过期
+        now: 计算过期时间的当前时间（datetime，默认为现在）
+
+    返回:
+        dict: 报告数据
+    """
+    now = now or datetime.now(timezone.utc)
+    before = int((now - timedelta(days=stale_days)).timestamp() * 1000)
+
+    months, undated = table.monthly()
+    first, last = table.date_range()
+    domains = table.domain_counts()
+    folders = [(table.folder_path(folder), links, direct)
+               for folder, links, direct in table.folder_sizes()]
+    # 根文件夹（“其他书签”）包含全部链接，不列出
+    largest = sorted((item for item in folders if item[0]), key=lambda item: (-item[1], item[0]))[:top]
+
+    dead_urls = [url for url, result in (statuses or {}).items() if result.get('state') == STATE_DEAD]
+    stale, old, dead = table.stale_flags(before, dead_urls)
+    stale_counts = table.count_by_folder(stale)
+    # 不同的文件夹可能同名，按路径合并
+    stale_folders = Counter()
+    for folder, count in stale_counts.items():
+        stale_folders[table.folder_path(folder)] += count
+
+    return {
+        "version": REPORT_VERSION,
+        "engine": table.engine,
+        "links": len(table),
+        "folders": len(folders),
+        "domains": len(domains),
+        "first_added": _format_day(first) if first is not None else None,
+        "last_added": _format_day(last) if last is not None else None,
+        "undated": undated,
+        "months": [{"month": month, "links": count} for month, count in months],
+        "top_domains": [{"domain": domain, "links": count} for domain, count in _top_items(domains, top)],
+        "top_folders": [{"folder": path, "links": links, "direct": direct} for path, links, direct in largest],
+        "stale": {
+            "before": _format_day(before),
+            "old": old,
+            "dead": dead,
+            "links": sum(stale_counts.values()),
+            "folders": [{"folder": path or '-', "links": count}
+                        for path, count in _top_items(stale_folders, top) if count],
+        },
+    }
+
+
+def iter_csv_rows(report):
+    """
+    把报告展开为CSV行：分组, 名称, 数量
+    """
+    yield 'section', 'key', 'value'
+    for key in ('links', 'folders', 'domains', 'undated', 'first_added', 'last_added'):
+        yield 'summary', key, report[key]
+    for item in report['months']:
+        yield 'month', item['month'], item['links']
+    for item in report['top_domains']:
+        yield 'domain', item['domain'], item['links']
+    for item in report['top_folders']:
+        yield 'folder', item['folder'], item['links']
+    stale = report['stale']
+    for key in ('before', 'old', 'dead', 'links'):
+        yield 'stale', key, stale[key]
+    for item in stale['folders']:
+        yield 'stale_folder', item['folder'], item['links']
+
+
+def write_report(report, path):
+    """
+    保存报告：以.csv结尾时写CSV（带BOM，便于表格软件识别编码），否则写JSON
+    """
+    if path.lower().endswith('.csv'):
+        with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+            csv.writer(f).writerows(iter_csv_rows(report))
+        return
+    with open(path, 'w', encoding='utf-8') as f:
+        json_codec.dump(report, f, pretty=True)
+        f.write('\n')
+
+
+def print_report(report, months=12):
+    """
+    在终端输出报告摘要
+    """
+    print(f"📊 {report['links']} 个链接，{report['folders']} 个文件夹，{report['domains']} 个域名"
+          f"（{report['first_added'] or '-'} ~ {report['last_added'] or '-'}）")
+    if report['months']:
+        print(f"\n📅 每月新增（最近 {months} 个有新增的月份）:")
+        for item in report['months'][-months:]:
+            print(f"  {item['month']}: {item['links']}")
+    if report['undated']:
+        print(f"  无日期: {report['undated']}")
+    if report['top_domains']:
+        print("\n🌐 常见域名:")
+        for item in report['top_domains']:
+            print(f"  {item['domain']}: {item['links']}")
+    if report['top_folders']:
+        print("\n📁 最大的文件夹:")
+        for item in report['top_folders']:
+            print(f"  {item['folder']}: {item['links']}（直接包含 {item['direct']}）")
+    stale = report['stale']
+    print(f"\n⏳ 过期链接: {stale['links']}（{stale['before']}之前添加 {stale['old']}，失效 {stale['dead']}）")
+    for item in stale['folders']:
+        print(f"  {item['folder']}: {item['links']}")
+
+
+def main(pintree_json_path, output=None, top=DEFAULT_TOP, stale_days=DEFAULT_STALE_DAYS, cache_dir=None):
+    """
+    统计书签并输出报告
+
+    参数:
+        pintree_json_path: 书签文件
+        output: 报告文件（.json或.csv），None时在终端输出摘要，'-'时向标准输出写JSON
+        top: 各列表的长度
+        stale_days: 过期的天数
+        cache_dir: 链接检查结果所在的目录（有检查结果时失效的链接也算作过期）
+
+    返回:
+        int: 退出码（0 成功，1 失败）
+    """
+    started = time.perf_counter()
+    try:
+        tree = BookmarkTree.load(pintree_json_path)
+    except (OSError, ValueError) as e:
+        print(f"❌ 读取书签失败: {e}", file=sys.stderr)
+        return 1
+    loaded = time.perf_counter()
+    statuses = load_link_statuses(os.path.join(cache_dir, LINK_CACHE_NAME)) if cache_dir else None
+
+    table = LinkTable(tree)
+    report = build_report(table, top, stale_days, statuses)
+    finished = time.perf_counter()
+
+    if output == '-':
+        sys.stdout.write(json_codec.dumps(report, pretty=True) + '\n')
+        return 0
+    if output:
+        try:
+            write_report(report, output)
+        except OSError as e:
+            print(f"❌ 保存报告失败: {e}", file=sys.stderr)
+            return 1
+    else:
+        print_report(report)
+    print(f"✅ 统计完成（{table.engine}，读取 {(loaded - started) * 1000:.0f} ms，"
+          f"统计 {(finished - loaded) * 1000:.0f} ms）" + (f"，报告已保存: {output}" if output else ''))
+    return 0
@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+书签数据库模块
+
+功能：把书签同步到本地SQLite数据库，在终端中按关键词查找链接收藏在哪个文件夹，
+查询时直接读取数据库，不需要重新解析书签文件。
+
+数据库结构：
+    bookmarks       每个链接一行：URL、标题、文件夹路径、域名、添加时间、在书签中的顺序
+                    （域名和添加时间建有索引，按域名、按时间筛选时不需要扫描全表）
+    bookmark_terms  FTS5全文索引（标题、URL、文件夹路径），rowid与bookmarks的id相同
+    meta            同步状态：书签文件路径和内容哈希、上次同步时间
+
+分词与页面搜索相同（见search_index.tokenize）：中日韩文字切成二元组，写入FTS5的是空格分隔的检索词，
+因此中文关键词也能按词命中；查询时每个词按前缀匹配，结果按bm25排序（标题的权重最高）。
+
+同步是增量的：链接以 文件夹路径 + URL 作为标识，与数据库中已有的行比较后，
+只插入新增的链接、更新标题等发生变化的链接、删除书签中已不存在的链接；书签文件未变化时直接跳过。
+"""
+
+import hashlib
+import os
+import sqlite3
+import time
+from datetime import datetime
+
+from bookmark_tree import OTHER_BOOKMARKS_TITLES, BookmarkTree
+import json_codec
+from search_index import tokenize, url_hostname
+
+DEFAULT_DB_NAME = 'bookmarks.db'
+SCHEMA_VERSION = 1
+DEFAULT_LIMIT = 20
+
+PATH_SEPARATOR = ' / '
+
+# bm25权重：标题、URL、文件夹路径
+RANK_WEIGHTS = (10.0, 2.0, 5.0)
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS bookmarks (
+    id INTEGER PRIMARY KEY,
+    key TEXT NOT NULL UNIQUE,
+    url TEXT NOT NULL,
+    title TEXT NOT NULL,
+    folder TEXT NOT NULL,
+    domain TEXT NOT NULL,
+    add_date INTEGER NOT NULL,
+    position INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS bookmarks_domain ON bookmarks (domain);
+CREATE INDEX IF NOT EXISTS bookmarks_add_date ON bookmarks (add_date);
+CREATE VIRTUAL TABLE IF NOT EXISTS bookmark_terms USING fts5 (title, url, folder);
+'''
+
+
+class StoreError(Exception):
+    """
+    数据库不可用（文件损坏、SQLite不支持FTS5等）
+    """
+
+
+def connect(db_path):
+    """
+    打开书签数据库（不存在时创建）
+
+    返回:
+        sqlite3.Connection
+    """
+    try:
+        connection = sqlite3.connect(db_path)
+        connection.executescript(_SCHEMA)
+    except sqlite3.Error as e:
+        raise StoreError(f"打开数据库失败: {e}")
+    version = _get_meta(connection, 'schema_version')
+    if version is None:
+        _set_meta(connection, 'schema_version', SCHEMA_VERSION)
+        connection.commit()
+    elif int(version) != SCHEMA_VERSION:
+        raise StoreError(f"数据库版本为 {version}，需要删除后重新同步: {db_path}")
+    return connection
+
+
+def _get_meta(connection, name):
+    row = connection.execute('SELECT value FROM meta WHERE name = ?', (name,)).fetchone()
+    return row[0] if row else None
+
+
+def _set_meta(connection, name, value):
+    connection.execute('INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)', (name, str(value)))
+
+
+def _file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 16), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def folder_path(tree, node_id):
+    """
+    链接所在文件夹的路径（省略“其他书签”一级目录），例如 “资源 / 通用搜索工具”
+    """
+    path = tree.path(node_id)
+    if path and path[0] in OTHER_BOOKMARKS_TITLES:
+        path = path[1:]
+    return PATH_SEPARATOR.join(path)
+
+
+def iter_bookmark_rows(tree):
+    """
+    产出书签树中每个链接的数据库行
+
+    返回:
+        生成器，每项为 (key, url, title, folder, domain, add_date, position)
+    """
+    # 同一文件夹中重复收藏的同一URL按出现次数区分
+    occurrences = {}
+    # 文件夹id -> 路径，同一文件夹中的链接只计算一次
+    folders = {}
+    position = 0
+    for node_id in tree.descendants():
+        if not tree.is_link(node_id):
+            continue
+        url = tree.url(node_id, '')
+        parent = tree.parent(node_id)
+        folder = folders.get(parent)
+        if folder is None:
+            folder = folders[parent] = folder_path(tree, node_id)
+        key = f'{folder}\n{url}'
+        seen = occurrences.get(key, 0)
+        occurrences[key] = seen + 1
+        if seen:
+            key += f'\n{seen}'
+        yield (key, url, tree.title(node_id, ''), folder, url_hostname(url),
+               tree.add_date(node_id), position)
+        position += 1
+
+
+def _terms(text):
+    return ' '.join(tokenize(text, index_mode=True))
+
+
+def sync(connection, tree):
+    """
+    把书签树增量同步到数据库
+
+    参数:
+        connection: connect返回的连接
+        tree: BookmarkTree
+
+    返回:
+        dict: {"inserted", "updated", "deleted", "unchanged"} 各类链接的数量
+    """
+    existing = {key: (row_id, row) for row_id, key, *row in connection.execute(
+        'SELECT id, key, url, title, folder, domain, add_date, position FROM bookmarks')}
+    inserts = []
+    updates = []
+    # 标题、URL或文件夹变化时才需要更新全文索引（只是顺序变化时不需要）
+    term_updates = []
+    unchanged = 0
+    for row in iter_bookmark_rows(tree):
+        key, values = row[0], row[1:]
+        old = existing.pop(key, None)
+        if old is None:
+            inserts.append(row)
+            continue
+        row_id, old_values = old
+        if tuple(old_values) == values:
+            unchanged += 1
+            continue
+        updates.append((row_id,) + values)
+        if tuple(old_values[:3]) != values[:3]:
+            term_updates.append((row_id,) + values[:3])
+    deleted = [(row_id,) for row_id, _ in existing.values()]
+
+    with connection:
+        connection.executemany('DELETE FROM bookmarks WHERE id = ?', deleted)
+        connection.executemany('DELETE FROM bookmark_terms WHERE rowid = ?', deleted)
+
+        connection.executemany(
+            'UPDATE bookmarks SET url = ?, title = ?, folder = ?, domain = ?, add_date = ?, position = ? '
+            'WHERE id = ?', [values[1:] + values[:1] for values in updates])
+        connection.executemany(
+            'UPDATE bookmark_terms SET title = ?, url = ?, folder = ? WHERE rowid = ?',
+            [(_terms(title), _terms(url), _terms(folder), row_id)
+             for row_id, url, title, folder in term_updates])
+
+        for key, url, title, folder, domain, add_date, position in inserts:
+            cursor = connection.execute(
+                'INSERT INTO bookmarks (key, url, title, folder, domain, add_date, position) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)', (key, url, title, folder, domain, add_date, position))
+            connection.execute('INSERT INTO bookmark_terms (rowid, title, url, folder) VALUES (?, ?, ?, ?)',
+                               (cursor.lastrowid, _terms(title), _terms(url), _terms(folder)))
+    return {"inserted": len(inserts), "updated": len(updates),
+            "deleted": len(deleted), "unchanged": unchanged}
+
+
+def sync_file(db_path, pintree_json_path, force=False):
+    """
+    读取书签文件并同步到数据库；书签文件内容与上次同步时相同则跳过
+
+    返回:
+        dict: 同步结果（见sync），跳过时返回None
+    """
+    source_hash = _file_hash(pintree_json_path)
+    connection = connect(db_path)
+    try:
+        if not force and _get_meta(connection, 'source_hash') == source_hash:
+            return None
+        tree = BookmarkTree.load(pintree_json_path)
+        counts = sync(connection, tree)
+        with connection:
+            _set_meta(connection, 'source', os.path.abspath(pintree_json_path))
+            _set_meta(connection, 'source_hash', source_hash)
+            _set_meta(connection, 'synced', datetime.now().isoformat(timespec='seconds'))
+        return counts
+    finally:
+        connection.close()
+
+
+def _match_expression(text):
+    """
+    把查询文本转换为FTS5查询：每个检索词按前缀匹配，多个词需要同时命中
+    """
+    return ' '.join(f'"{token}"*' for token in tokenize(text))
+
+
+def query(connection, text='', limit=DEFAULT_LIMIT, domain=None, since=None):
+    """
+    按关键词查找链接
+
+    参数:
+        connection: connect返回的连接
+        text: 关键词（为空时只按域名和时间筛选，按添加时间倒序）
+        limit: 最多返回的结果数
+        domain: 只返回该域名的链接（与URL中的主机名完全相同）
+        since: 只返回该时间之后添加的链接（datetime）
+
+    返回:
+        list: [{"title", "url", "folder", "domain", "add_date"}]，按相关度排序
+    """
+    conditions = []
+    params = []
+    if domain:
+        conditions.append('b.domain = ?')
+        params.append(domain.lower())
+    if since is not None:
+        conditions.append('b.add_date >= ?')
+        params.append(int(since.timestamp() * 1000))
+
+    expression = _match_expression(text)
+    if expression:
+        sql = (f'SELECT b.title, b.url, b.folder, b.domain, b.add_date FROM bookmark_terms '
+               f'JOIN bookmarks AS b ON b.id = bookmark_terms.rowid '
+               f'WHERE bookmark_terms MATCH ? {"".join(" AND " + c for c in conditions)} '
+               f'ORDER BY bm25(bookmark_terms, {", ".join(map(str, RANK_WEIGHTS))}), b.position LIMIT ?')
+        params.insert(0, expression)
+    elif text.strip():
+        # 关键词中没有可检索的字符（只有标点等）
+        return []
+    else:
+        where = f'WHERE {" AND ".join(conditions)} ' if conditions else ''
+        sql = (f'SELECT b.title, b.url, b.folder, b.domain, b.add_date FROM bookmarks AS b '
+               f'{where}ORDER BY b.add_date DESC LIMIT ?')
+    params.append(limit)
+    return [{"title": title, "url": url, "folder": folder, "domain": host, "add_date": add_date}
+            for title, url, folder, host, add_date in connection.execute(sql, params)]
+
+
+def _format_date(add_date):
+    if not add_date:
+        return '-'
+    return datetime.fromtimestamp(add_date / 1000).strftime('%Y-%m-%d')
+
+
+def main_sync(db_path, pintree_json_path, force=False):
+    """
+    同步书签并输出结果
+
+    返回:
+        int: 退出码（0 成功，1 失败）
+    """
+    started = time.perf_counter()
+    try:
+        counts = sync_file(db_path, pintree_json_path, force)
+    except (OSError, ValueError, StoreError, sqlite3.Error) as e:
+        print(f"❌ 同步失败: {e}")
+        return 1
+    if counts is None:
+        print(f"✅ 书签未变化，{db_path} 无需同步")
+        return 0
+    print(f"✅ 已同步到 {db_path}：新增 {counts['inserted']}，更新 {counts['updated']}，"
+          f"删除 {counts['deleted']}，未变化 {counts['unchanged']}"
+          f"（{(time.perf_counter() - started) * 1000:.0f} ms）")
+    return 0
+
+
+def main_query(db_path, text, limit=DEFAULT_LIMIT, domain=None, since=None, as_json=False):
+    """
+    查询书签并输出结果
+
+    返回:
+        int: 退出码（0 有结果，1 失败或没有结果）
+    """
+    if not os.path.exists(db_path):
+        print(f"❌ 数据库不存在: {db_path}（请先运行 sync）")
+        return 1
+    started = time.perf_counter()
+    try:
+        connection = connect(db_path)
+        try:
+            results = query(connection, text, limit, domain, since)
+        finally:
+            connection.close()
+    except (StoreError, sqlite3.Error) as e:
+        print(f"❌ 查询失败: {e}")
+        return 1
+    elapsed = (time.perf_counter() - started) * 1000
+
+    if as_json:
+        print(json_codec.dumps(results, pretty=True))
+    else:
+        for item in results:
+            print(f"{item['title']}\n    {item['url']}\n    {item['folder'] or '-'}  {_format_date(item['add_date'])}")
+        print(f"共 {len(results)} 条结果（{elapsed:.1f} ms）")
+    return 0 if results else 1
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+书签文件流式读取模块
+
+功能：以增量、事件驱动的方式解析pintree.json（支持.json.gz压缩文件），
+逐个产出文件夹/链接节点，避免一次性把整个导出文件载入内存。
+
+节点流由以下事件组成（按文档顺序）：
+    (FOLDER, 属性字典)  文件夹开始，属性中不包含children
+    (LINK, 属性字典)    链接节点
+    (END, None)         与最近一个FOLDER配对的文件夹结束
+"""
+
+import gzip
+import re
+from json import JSONDecodeError
+from json.decoder import scanstring
+
+# 节点事件类型
+FOLDER = 'folder'
+LINK = 'link'
+END = 'end'
+
+# JSON底层事件类型
+START_MAP = 'start_map'
+END_MAP = 'end_map'
+START_ARRAY = 'start_array'
+END_ARRAY = 'end_array'
+MAP_KEY = 'map_key'
+VALUE = 'value'
+
+# 每次从文件读取的字符数
+CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_NUMBER = re.compile(r'-?(?:0|[1-9]\d*)(\.\d+)?([eE][-+]?\d+)?')
+_LITERALS = (('true', True), ('false', False), ('null', None))
+_EXHAUSTED = object()
+
+
+def open_bookmark_file(path):
+    """
+    以文本方式打开书签文件，自动识别gzip压缩
+
+    参数:
+        path: 文件路径（.json或.json.gz）
+
+    返回:
+        可迭代读取的文本文件对象
+    """
+    with open(path, 'rb') as f:
+        magic = f.read(2)
+    if str(path).endswith('.gz') or magic == b'\x1f\x8b':
+        return gzip.open(path, 'rt', encoding='utf-8-sig')
+    return open(path, 'r', encoding='utf-8-sig')
+
+
+def iter_json_events(fp, chunk_size=CHUNK_SIZE):
+    """
+    增量解析JSON文本，逐个产出底层事件
+
+    参数:
+        fp: 文本文件对象
+        chunk_size: 每次读取的字符数
+
+    返回:
+        (事件类型, 值) 元组的生成器
+    """
+    buf = ''
+    pos = 0
+    eof = False
+    # 记录当前所在的容器，True表示对象，False表示数组
+    containers = []
+    expect_key = False
+
+    while True:
+        pos = _WHITESPACE.match(buf, pos).end()
+        if pos >= len(buf) or (not eof and len(buf) - pos < 8):
+            # 缓冲区即将耗尽，丢弃已消费的部分并补充数据
+            if not eof:
+                chunk = fp.read(max(chunk_size, len(buf) - pos))
+                buf = buf[pos:] + chunk
+                pos = 0
+                eof = not chunk
+                continue
+            if pos >= len(buf):
+                break
+
+        ch = buf[pos]
+        if ch == '{':
+            containers.append(True)
+            expect_key = True
+            pos += 1
+            yield START_MAP, None
+        elif ch == '}':
+            containers.pop()
+            expect_key = False
+            pos += 1
+            yield END_MAP, None
+        elif ch == '[':
+            containers.append(False)
+            pos += 1
+            yield START_ARRAY, None
+        elif ch == ']':
+            containers.pop()
+            pos += 1
+            yield END_ARRAY, None
+        elif ch == ',':
+            expect_key = bool(containers) and containers[-1]
+            pos += 1
+        elif ch == ':':
+            pos += 1
+        elif ch == '"':
+            try:
+                value, end = scanstring(buf, pos + 1)
+            except JSONDecodeError as e:
+                # 字符串跨越了缓冲区边界，读入更多数据后重试
+                if eof or e.pos < len(buf) - 6 and 'Unterminated' not in e.msg:
+                    raise
+                # 按未完成部分的长度读取：字符串很长时每次加倍，缓冲区不会随读取次数累积增长
+                chunk = fp.read(max(chunk_size, len(buf) - pos))
+                buf = buf[pos:] + chunk
+                pos = 0
+                eof = not chunk
+                continue
+            pos = end
+            if expect_key:
+                expect_key = False
+                yield MAP_KEY, value
+            else:
+                yield VALUE, value
+        else:
+            match = _NUMBER.match(buf, pos)
+            if match:
+                if not eof and match.end() >= len(buf) - 2:
+                    chunk = fp.read(chunk_size)
+                    buf = buf[pos:] + chunk
+                    pos = 0
+                    eof = not chunk
+                    continue
+                text = match.group()
+                pos = match.end()
+                if match.group(1) or match.group(2):
+                    yield VALUE, float(text)
+                else:
+                    yield VALUE, int(text)
+                continue
+            for literal, value in _LITERALS:
+                if buf.startswith(literal, pos):
+                    pos += len(literal)
+                    yield VALUE, value
+                    break
+            else:
+                raise JSONDecodeError('无法识别的JSON内容', buf, pos)
+
+    if containers:
+        raise JSONDecodeError('JSON内容不完整', buf, pos)
+
+
+def _build_value(event, value, events):
+    """
+    从底层事件中完整构建一个JSON值（用于非节点数据）
+
+    参数:
+        event, value: 该值的第一个事件
+        events: 底层事件迭代器
+
+    返回:
+        构建好的Python对象
+    """
+    if event == VALUE:
+        return value
+    root = {} if event == START_MAP else []
+    stack = [root]
+    key = None
+    for event, value in events:
+        current = stack[-1]
+        if event == MAP_KEY:
+            key = value
+            continue
+        if event in (END_MAP, END_ARRAY):
+            stack.pop()
+            if not stack:
+                return root
+            continue
+        if event == START_MAP:
+            child = {}
+        elif event == START_ARRAY:
+            child = []
+        else:
+            child = value
+        if isinstance(current, dict):
+            current[key] = child
+        else:
+            current.append(child)
+        if event in (START_MAP, START_ARRAY):
+            stack.append(child)
+    raise JSONDecodeError('JSON内容不完整', '', 0)
+
+
+def iter_tree_nodes(items):
+    """
+    遍历已载入内存的书签树，产出与流式读取相同的节点事件
+
+    参数:
+        items: 书签项目列表（pintree.json的顶层数据）
+
+    返回:
+        节点事件生成器
+    """
+    if isinstance(items, dict):
+        items = [items]
+    stack = [iter(items)]
+    while stack:
+        item = next(stack[-1], _EXHAUSTED)
+        if item is _EXHAUSTED:
+            stack.pop()
+            if stack:
+                yield END, None
+            continue
+        if not isinstance(item, dict):
+            continue
+        node_type = item.get('type')
+        if node_type == 'link':
+            yield LINK, item
+        elif node_type == 'folder':
+            yield FOLDER, {k: v for k, v in item.items() if k != 'children'}
+            children = item.get('children')
+            stack.append(iter(children if isinstance(children, list) else []))
+
+
+def iter_bookmark_nodes(fp):
+    """
+    从文件对象流式读取书签，逐个产出文件夹/链接节点
+
+    文件夹的children只有在type和title之后出现时才会被流式处理，
+    否则该文件夹的子树会先完整构建再遍历（pintree导出的字段顺序总是前者）。
+
+    参数:
+        fp: 文本文件对象（见open_bookmark_file）
+
+    返回:
+        节点事件生成器
+    """
+    events = iter_json_events(fp)
+    first = next(events, None)
+    if first is None:
+        return
+    if first[0] == START_MAP:
+        # 顶层是单个对象时，按只有一个元素的列表处理
+        frames = [None, [{}, False]]
+    elif first[0] == START_ARRAY:
+        frames = [None]
+    else:
+        return
+
+    # frames中None表示数组，[属性字典, 是否已流式产出]表示书签对象
+    for event, value in events:
+        frame = frames[-1]
+        if frame is None:
+            if event == END_ARRAY:
+                frames.pop()
+            elif event == START_MAP:
+                frames.append([{}, False])
+            else:
+                # 数组中的非对象元素不是书签节点，跳过
+                _build_value(event, value, events)
+            continue
+
+        attrs = frame[0]
+        if event == MAP_KEY:
+            key = value
+            event, value = next(events)
+            if (key == 'children' and event == START_ARRAY
+                    and attrs.get('type') == 'folder' and 'title' in attrs):
+                frame[1] = True
+                frames.append(None)
+                yield FOLDER, dict(attrs)
+            else:
+                attrs[key] = _build_value(event, value, events)
+        elif event == END_MAP:
+            frames.pop()
+            if frame[1]:
+                yield END, None
+            elif attrs.get('type') == 'link':
+                yield LINK, attrs
+            elif attrs.get('type') == 'folder':
+                yield from iter_tree_nodes([attrs])
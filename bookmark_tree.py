@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+紧凑书签树模块
+
+功能：把书签文件解析一次，保存为以数组为基础的扁平树，供各个转换和分析脚本共用，
+不再各自遍历原始的嵌套字典，也不再为每个节点保存一个字典。
+
+存储方式：
+    - 节点按文档顺序（先序）编号，编号即节点id
+    - 每个节点在若干平行数组中各占一项：类型、父节点、子树结束位置、添加时间，
+      以及标题/URL/图标在字符串表中的序号
+    - 字符串表对相同的字符串只保存一份（同名文件夹、重复链接等）
+    - 文件夹的子树在数组中是连续的一段 [id, end)，遍历子节点时按end跳过整棵子树
+
+查找：
+    按id、URL和文件夹路径查找均为O(1)。
+"""
+
+import os
+from array import array
+
+from bookmark_html import is_bookmark_html, iter_html_bookmark_nodes
+from bookmark_stream import END, FOLDER, LINK, iter_bookmark_nodes, iter_tree_nodes, open_bookmark_file
+import json_codec
+
+# 节点类型在数组中的取值
+KIND_FOLDER = 0
+KIND_LINK = 1
+
+# 字符串字段缺失时的序号
+NO_STRING = -1
+
+# 浏览器的“其他书签”根目录名称（转换、合并和统计时不作为一级分类）
+OTHER_BOOKMARKS_TITLES = ('Other bookmarks', '其他书签')
+
+# 使用快速JSON后端时，不超过这个大小的未压缩JSON文件一次载入后再遍历（比流式解析快，
+# 但内存占用与文件大小成正比）；更大的文件和压缩文件仍然流式读取
+FAST_LOAD_MAX_BYTES = 16 * 1024 * 1024
+
+
+def iter_bookmark_file(path):
+    """
+    流式读取书签文件，逐个产出节点事件（见bookmark_stream），读完后关闭文件
+
+    支持pintree导出的JSON和浏览器导出的书签HTML（均可为gzip压缩），
+    内存中只保留当前读取块和正在产出的节点，不会载入整个文件。
+    """
+    iter_nodes = iter_html_bookmark_nodes if is_bookmark_html(path) else iter_bookmark_nodes
+    with open_bookmark_file(path) as f:
+        yield from iter_nodes(f)
+
+
+class BookmarkTree:
+    """
+    以平行数组保存的书签树
+
+    参数:
+        nodes: 节点事件流（见bookmark_stream），为None时创建空树
+    """
+
+    __slots__ = ('kinds', 'parents', 'ends', 'add_dates', 'titles', 'urls', 'icons',
+                 'strings', '_string_ids', '_by_url', '_by_path')
+
+    def __init__(self, nodes=None):
+        self.kinds = bytearray()
+        self.parents = array('i')
+        self.ends = array('i')
+        self.add_dates = array('q')
+        self.titles = array('i')
+        self.urls = array('i')
+        self.icons = array('i')
+        self.strings = []
+        self._string_ids = {}
+        self._by_url = {}
+        self._by_path = {}
+        if nodes is not None:
+            self.extend(nodes)
+
+    @classmethod
+    def from_data(cls, data):
+        """
+        从已载入内存的pintree数据（列表或字典）构建书签树
+        """
+        return cls(iter_tree_nodes(data))
+
+    @classmethod
+    def load(cls, path):
+        """
+        流式读取书签文件并构建书签树
+
+        支持pintree导出的JSON和浏览器导出的书签HTML（均可为gzip压缩）
+        """
+        if (json_codec.is_fast() and not is_bookmark_html(path) and not str(path).endswith('.gz')
+                and os.path.getsize(path) <= FAST_LOAD_MAX_BYTES):
+            with open_bookmark_file(path) as f:
+                return cls.from_data(json_codec.load(f))
+        return cls(iter_bookmark_file(path))
+
+    def _intern(self, value):
+        """
+        返回字符串在字符串表中的序号，非字符串或缺失时返回NO_STRING
+        """
+        if not isinstance(value, str):
+            return NO_STRING
+        string_id = self._string_ids.get(value)
+        if string_id is None:
+            string_id = len(self.strings)
+            self.strings.append(value)
+            self._string_ids[value] = string_id
+        return string_id
+
+    def extend(self, nodes):
+        """
+        把节点事件流追加到树的顶层
+
+        参数:
+            nodes: 节点事件流（FOLDER/LINK/END）
+        """
+        # 当前打开的文件夹：id栈和路径栈
+        open_folders = []
+        path = []
+        for event, item in nodes:
+            if event == END:
+                folder = open_folders.pop()
+                path.pop()
+                self.ends[folder] = len(self.kinds)
+                continue
+
+            node_id = len(self.kinds)
+            add_date = item.get('addDate')
+            self.parents.append(open_folders[-1] if open_folders else -1)
+            self.add_dates.append(add_date if isinstance(add_date, int) else 0)
+            self.titles.append(self._intern(item.get('title')))
+            if event == FOLDER:
+                self.kinds.append(KIND_FOLDER)
+                self.urls.append(NO_STRING)
+                self.icons.append(NO_STRING)
+                # 子树结束位置在对应的END事件中回填
+                self.ends.append(node_id + 1)
+                open_folders.append(node_id)
+                path.append(item.get('title', ''))
+                self._by_path.setdefault(tuple(path), node_id)
+            elif event == LINK:
+                url = self._intern(item.get('url'))
+                self.kinds.append(KIND_LINK)
+                self.urls.append(url)
+                self.icons.append(self._intern(item.get('icon')))
+                self.ends.append(node_id + 1)
+                if url != NO_STRING:
+                    self._by_url.setdefault(url, node_id)
+
+        # 事件流不完整时，把仍未结束的文件夹延伸到末尾
+        for folder in open_folders:
+            self.ends[folder] = len(self.kinds)
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def _string(self, string_id):
+        return self.strings[string_id] if string_id != NO_STRING else None
+
+    def is_folder(self, node_id):
+        return self.kinds[node_id] == KIND_FOLDER
+
+    def is_link(self, node_id):
+        return self.kinds[node_id] == KIND_LINK
+
+    def title(self, node_id, default=None):
+        title = self._string(self.titles[node_id])
+        return default if title is None else title
+
+    def url(self, node_id, default=None):
+        url = self._string(self.urls[node_id])
+        return default if url is None else url
+
+    def icon(self, node_id, default=None):
+        icon = self._string(self.icons[node_id])
+        return default if icon is None else icon
+
+    def add_date(self, node_id):
+        return self.add_dates[node_id]
+
+    def parent(self, node_id):
+        """
+        返回父文件夹的id，顶层节点返回-1
+        """
+        return self.parents[node_id]
+
+    def children(self, node_id=-1):
+        """
+        按顺序产出文件夹的直接子节点id
+
+        参数:
+            node_id: 文件夹id，-1表示顶层
+        """
+        if node_id < 0:
+            child, end = 0, len(self.kinds)
+        else:
+            child, end = node_id + 1, self.ends[node_id]
+        ends = self.ends
+        while child < end:
+            yield child
+            child = ends[child]
+
+    def descendants(self, node_id=-1):
+        """
+        返回子树中全部后代节点的id范围（先序，不含node_id本身）
+        """
+        if node_id < 0:
+            return range(len(self.kinds))
+        return range(node_id + 1, self.ends[node_id])
+
+    def depth(self, node_id):
+        """
+        返回节点的嵌套深度，顶层节点为0
+        """
+        depth = 0
+        parent = self.parents[node_id]
+        while parent >= 0:
+            depth += 1
+            parent = self.parents[parent]
+        return depth
+
+    def path(self, node_id):
+        """
+        返回从顶层到该节点所在文件夹的标题路径（节点是文件夹时包含自身）
+        """
+        if not self.is_folder(node_id):
+            node_id = self.parents[node_id]
+        titles = []
+        while node_id >= 0:
+            titles.append(self.title(node_id, ''))
+            node_id = self.parents[node_id]
+        return tuple(reversed(titles))
+
+    def find_url(self, url):
+        """
+        按URL查找第一个链接的id，找不到时返回None
+        """
+        string_id = self._string_ids.get(url)
+        return None if string_id is None else self._by_url.get(string_id)
+
+    def find_path(self, path):
+        """
+        按标题路径查找文件夹的id，找不到时返回None
+
+        参数:
+            path: 文件夹标题序列，例如 ('其他书签', '资源')
+        """
+        return self._by_path.get(tuple(path))
+
+    def attrs(self, node_id):
+        """
+        返回节点的属性字典（与pintree.json中的字段一致，不含children）
+        """
+        item = {'type': 'folder' if self.is_folder(node_id) else 'link'}
+        if self.add_dates[node_id]:
+            item['addDate'] = self.add_dates[node_id]
+        for key, ids in (('title', self.titles), ('icon', self.icons), ('url', self.urls)):
+            if ids[node_id] != NO_STRING:
+                item[key] = self.strings[ids[node_id]]
+        return item
+
+    def iter_nodes(self, node_id=-1):
+        """
+        重新产出节点事件流，可直接交给读取事件流的转换函数
+
+        参数:
+            node_id: 只产出该文件夹的子树，-1表示整棵树
+        """
+        if node_id < 0:
+            nodes = range(len(self.kinds))
+        else:
+            nodes = range(node_id, self.ends[node_id])
+        open_ends = []
+        for current in nodes:
+            while open_ends and open_ends[-1] <= current:
+                open_ends.pop()
+                yield END, None
+            if self.kinds[current] == KIND_FOLDER:
+                yield FOLDER, self.attrs(current)
+                open_ends.append(self.ends[current])
+            else:
+                yield LINK, self.attrs(current)
+        for _ in open_ends:
+            yield END, None
+
+    def count(self, node_id=-1):
+        """
+        统计子树中的文件夹和链接数量
+
+        返回:
+            (folders, links)
+        """
+        nodes = self.descendants(node_id)
+        links = self.kinds.count(KIND_LINK, nodes.start, nodes.stop)
+        return len(nodes) - links, links
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+构建缓存模块
+
+功能：为数据更新流程的各个阶段（解析 → 转换 → 序列化 → 写入HTML）记录输入内容的哈希，
+输入未变化时直接复用上次的结果，使无变化的构建无需重新解析，也不会改写index.html。
+
+缓存目录结构：
+    state.json      文件指纹和各阶段的缓存记录
+    <哈希>.json     阶段产物（序列化后的导航数据），按内容的哈希命名
+"""
+
+import contextlib
+import hashlib
+import os
+
+from html_splice import atomic_write
+import json_codec
+
+# 缓存格式版本，修改缓存结构时递增
+CACHE_VERSION = 1
+
+# 计算文件哈希时每次读取的字节数
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_bytes(*parts):
+    """
+    计算若干字符串/字节串拼接后的SHA-256哈希（None按空内容处理）
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        if part is None:
+            part = b''
+        elif isinstance(part, str):
+            part = part.encode('utf-8')
+        digest.update(part)
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+class BuildCache:
+    """
+    基于内容哈希的阶段级构建缓存
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        self.state_path = os.path.join(cache_dir, 'state.json')
+        self.state = {'version': CACHE_VERSION, 'files': {}, 'stages': {}}
+        self.dirty = False
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                state = json_codec.load(f)
+            if state.get('version') == CACHE_VERSION:
+                self.state = state
+        except (OSError, ValueError):
+            pass
+
+    def file_hash(self, path):
+        """
+        获取文件内容的哈希
+
+        大小和修改时间未变时直接使用记录的哈希，避免重复读取大文件。
+
+        参数:
+            path: 文件路径
+
+        返回:
+            str: 文件内容的SHA-256哈希，文件不存在时返回None
+        """
+        path = os.path.abspath(path)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        record = self.state['files'].get(path)
+        if record and record[0] == stat.st_size and record[1] == stat.st_mtime_ns:
+            return record[2]
+
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+                digest.update(chunk)
+        self.state['files'][path] = [stat.st_size, stat.st_mtime_ns, digest.hexdigest()]
+        self.dirty = True
+        return digest.hexdigest()
+
+    def lookup(self, stage, key):
+        """
+        查找阶段缓存记录
+
+        参数:
+            stage: 阶段名称
+            key: 该阶段输入的哈希
+
+        返回:
+            dict: 缓存记录，未命中时返回None
+        """
+        entry = self.state['stages'].get(stage)
+        if entry and entry.get('key') == key:
+            return entry
+        return None
+
+    def store(self, stage, key, **values):
+        """
+        记录阶段的缓存结果（每个阶段只保留最近一次）
+        """
+        self.state['stages'][stage] = dict(values, key=key)
+        self.dirty = True
+
+    def blob_path(self, name):
+        return os.path.join(self.cache_dir, f'{name}.json')
+
+    def has_blob(self, name):
+        return os.path.exists(self.blob_path(name))
+
+    def load_blob(self, name):
+        """
+        读取并解析阶段产物，不存在或内容损坏时返回None
+        """
+        try:
+            with open(self.blob_path(name), 'r', encoding='utf-8') as f:
+                return json_codec.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def write_blob(self, chunks):
+        """
+        逐段写入阶段产物，以内容的哈希命名（不需要先在内存中拼出完整的字符串）
+
+        参数:
+            chunks: 产物内容的字符串片段
+
+        返回:
+            str: 产物名称（内容的SHA-256哈希）
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        digest = hashlib.sha256()
+        tmp_path = self.blob_path('writing') + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+                for chunk in chunks:
+                    digest.update(chunk.encode('utf-8'))
+                    f.write(chunk)
+        except BaseException:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(tmp_path)
+            raise
+        name = digest.hexdigest()
+        os.replace(tmp_path, self.blob_path(name))
+        return name
+
+    def save(self):
+        """
+        写回缓存状态，并清理不再被引用的阶段产物
+        """
+        if not self.dirty:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # 只保留仍存在的文件指纹
+        self.state['files'] = {
+            path: record for path, record in self.state['files'].items()
+            if os.path.exists(path)
+        }
+        atomic_write(self.state_path, json_codec.dumps(self.state, pretty=True))
+        self.dirty = False
+
+        referenced = {
+            f"{entry['blob']}.json" for entry in self.state['stages'].values()
+            if entry.get('blob')
+        }
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.json') and name != 'state.json' and name not in referenced:
+                try:
+                    os.remove(os.path.join(self.cache_dir, name))
+                except OSError:
+                    pass
+
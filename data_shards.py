@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+导航数据分片模块
+
+功能：把转换后的导航数据按顶级分类拆成独立的JSON分片，并生成一个小的清单（manifest），
+页面只内嵌清单，打开某个分类的标签时才加载对应的分片。
+
+输出目录结构：
+    manifest.json                  分类清单
+    category-<名称哈希>.json       每个顶级分类的数据
+"""
+
+import hashlib
+import os
+
+from html_splice import atomic_write
+import json_codec
+
+# 分片数据目录（相对于页面）
+DEFAULT_DATA_DIR = 'data'
+MANIFEST_NAME = 'manifest.json'
+
+
+def shard_name(category):
+    """
+    根据分类名称生成稳定的分片文件名，分类顺序变化时文件名不变
+    """
+    digest = hashlib.sha1(category.encode('utf-8')).hexdigest()[:10]
+    return f'category-{digest}.json'
+
+
+def dump_shard(data):
+    """
+    序列化分片数据（紧凑格式）
+    """
+    return json_codec.dumps(data)
+
+
+def write_if_changed(path, text):
+    """
+    内容未变化时不改写文件，保持文件的修改时间以便浏览器和CDN缓存继续有效
+
+    返回:
+        bool: 是否写入了文件
+    """
+    try:
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            if f.read() == text:
+                return False
+    except OSError:
+        pass
+    atomic_write(path, text)
+    return True
+
+
+def build_manifest(navigation_data, url_prefix=DEFAULT_DATA_DIR):
+    """
+    生成分类清单
+
+    参数:
+        navigation_data: 转换后的导航数据
+        url_prefix: 页面访问分片时使用的路径前缀
+
+    返回:
+        list: 每个顶级分类一项，包含名称、分片路径和链接数量
+    """
+    manifest = []
+    for category, subcategories in navigation_data.items():
+        manifest.append({
+            "name": category,
+            "file": f"{url_prefix}/{shard_name(category)}",
+            "links": sum(len(links) for links in subcategories.values()),
+        })
+    return manifest
+
+
+def write_shards(navigation_data, data_dir, url_prefix=DEFAULT_DATA_DIR, categories=None):
+    """
+    把导航数据写成分片文件和清单
+
+    参数:
+        navigation_data: 转换后的导航数据
+        data_dir: 分片输出目录
+        url_prefix: 页面访问分片时使用的路径前缀
+        categories: 只重新写入这些分类的分片（None表示全部）
+
+    返回:
+        (manifest, written): 分类清单，以及实际改写的文件路径列表
+    """
+    os.makedirs(data_dir, exist_ok=True)
+    manifest = build_manifest(navigation_data, url_prefix)
+    written = []
+
+    for category, subcategories in navigation_data.items():
+        if categories is not None and category not in categories:
+            continue
+        path = os.path.join(data_dir, shard_name(category))
+        if write_if_changed(path, dump_shard(subcategories)):
+            written.append(path)
+
+    manifest_path = os.path.join(data_dir, MANIFEST_NAME)
+    if write_if_changed(manifest_path, json_codec.dumps(manifest, pretty=True)):
+        written.append(manifest_path)
+
+    # 删除已不存在的分类留下的分片
+    current = {shard_name(category) for category in navigation_data}
+    for name in os.listdir(data_dir):
+        if name.startswith('category-') and name.endswith('.json') and name not in current:
+            os.remove(os.path.join(data_dir, name))
+
+    return manifest, written
+
@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+发布构建模块
+
+功能：把生成好的页面和它引用的数据打包成可直接部署的dist目录，仓库中的其他文件（arch、脚本等）不会发布。
+
+输出目录结构：
+    index.html                      压缩后的页面（入口文件名不变）
+    assets/style.<哈希>.css         从页面中提取并压缩的样式
+    assets/app.<哈希>.js            从页面中提取并压缩的脚本
+    assets/<数据文件名>.<哈希>.json  页面引用的数据（分类分片、图标表、搜索索引），紧凑格式
+    *.gz                            以上文件的gzip预压缩版本（压缩后更小时才生成）
+    sw.js                           service worker：预缓存上述带哈希的资源，再次打开时从缓存加载（见service_worker）
+    asset-manifest.json             原始名称 -> 发布文件名、大小和压缩后大小
+
+资源文件名包含内容哈希，内容不变时文件名不变，可以长期缓存而无需向服务器确认；
+内容变化时文件名随之变化，页面引用的也是新文件名。
+
+压缩只做不改变语义的处理：去掉注释、缩进和多余的空白，字符串、模板字符串和正则表达式原样保留，
+脚本中的换行也保留（避免自动分号插入规则改变代码含义）。
+"""
+
+import gzip
+import hashlib
+import os
+import re
+import shutil
+
+from data_shards import dump_shard
+from html_splice import find_slots, splice_slots
+import json_codec
+from service_worker import REGISTRATION_SCRIPT, SERVICE_WORKER_NAME, render_service_worker, service_worker_version
+from update_static_data import _escape_script_json
+
+DEFAULT_DIST_DIR = 'dist'
+ASSETS_DIR = 'assets'
+ASSET_MANIFEST_NAME = 'asset-manifest.json'
+
+# 页面中对数据文件的引用（脚本中的字符串常量和分类清单中的路径）
+DATA_REFERENCE = re.compile(r'''(["'])(data/[\w./-]+\.json)\1''')
+
+# 样式中的字符串，以及字符串或注释（用于切分）
+_CSS_STRING = r'"(?:\\.|[^"\\])*"' + r"|'(?:\\.|[^'\\])*'"
+_CSS_STRING_SPLIT = re.compile(f'({_CSS_STRING})')
+_CSS_COMMENT_SPLIT = re.compile(rf'({_CSS_STRING}|/\*.*?\*/)', re.S)
+
+_STYLE_BLOCK = re.compile(r'<style>(.*?)</style>', re.S)
+_SCRIPT_BLOCK = re.compile(r'<script>(.*?)</script>', re.S)
+
+# 这些字符或关键字之后的“/”是正则表达式的开始，而不是除号
+_REGEX_PRECEDERS = set('(,=:[!&|?{};+-*%<>~^')
+_REGEX_KEYWORDS = frozenset({'return', 'typeof', 'instanceof', 'in', 'of', 'new', 'delete',
+                             'void', 'throw', 'case', 'do', 'else', 'yield', 'await'})
+
+
+def minify_css(css):
+    """
+    压缩样式：去掉注释，合并空白，去掉花括号、分号、逗号等符号两侧的空格
+
+    参数:
+        css: 样式文本
+
+    返回:
+        str: 压缩后的样式
+    """
+    # 先去掉注释（字符串中的“/*”不算），再整理字符串以外的部分
+    css = ''.join(token for token in _CSS_COMMENT_SPLIT.split(css) if not token.startswith('/*'))
+    parts = []
+    for token in _CSS_STRING_SPLIT.split(css):
+        if token.startswith(('"', "'")):
+            parts.append(token)
+            continue
+        token = re.sub(r'\s+', ' ', token)
+        # 冒号前的空格可能是后代选择器（如 "a :hover"），只去掉冒号后面的
+        token = re.sub(r'\s*([{};,>])\s*', r'\1', token)
+        token = re.sub(r':\s+', ':', token)
+        parts.append(token)
+    return ''.join(parts).replace(';}', '}').strip()
+
+
+def _strip_code(code):
+    """
+    整理一段代码（不含字符串和注释）：去掉行首行尾的空白和空行，合并行内的连续空白
+    """
+    return re.sub(r'[ \t]+', ' ', re.sub(r'[ \t]*\n\s*', '\n', code))
+
+
+def minify_js(js):
+    """
+    压缩脚本：去掉注释、缩进、空行和行内多余的空白，保留换行
+
+    字符串、模板字符串（包括其中嵌套的 ${...} 表达式）和正则表达式原样保留。
+
+    参数:
+        js: 脚本文本
+
+    返回:
+        str: 压缩后的脚本
+    """
+    out = []
+    # 尚未整理的代码片段（注释已去掉），遇到字符串等字面量时一起整理
+    code = []
+    code_start = 0
+    i = 0
+    length = len(js)
+    # 模板字符串中 ${ 表达式的花括号深度栈，非空时表示当前位于模板表达式中
+    template_depths = []
+    depth = 0
+    # 最近一个有效的代码字符/单词，用于区分正则表达式和除号
+    last = ''
+
+    def flush(end, literal=''):
+        code.append(js[code_start:end])
+        if literal:
+            out.append(_strip_code(''.join(code)))
+            out.append(literal)
+            code.clear()
+
+    while i < length:
+        char = js[i]
+        if char in '"\'':
+            end = i + 1
+            while end < length and js[end] != char:
+                end += 2 if js[end] == '\\' else 1
+            flush(i, js[i:end + 1])
+            i = code_start = end + 1
+            last = char
+        elif char == '`' or (char == '}' and template_depths and depth == template_depths[-1]):
+            # 模板字符串开始，或 ${...} 表达式结束后回到模板字符串
+            if char == '}':
+                template_depths.pop()
+                depth -= 1
+            end = i + 1
+            while end < length and js[end] != '`' and not js.startswith('${', end):
+                end += 2 if js[end] == '\\' else 1
+            if js.startswith('${', end):
+                depth += 1
+                template_depths.append(depth)
+                end += 2
+            else:
+                end += 1
+            flush(i, js[i:end])
+            i = code_start = end
+            last = '{' if js[end - 1] == '{' else '`'
+        elif js.startswith('//', i):
+            end = js.find('\n', i)
+            end = length if end < 0 else end
+            flush(i)
+            i = code_start = end
+        elif js.startswith('/*', i):
+            end = js.find('*/', i + 2)
+            end = length if end < 0 else end + 2
+            flush(i)
+            # 注释两侧的代码不能粘在一起，跨行的注释保留一个换行
+            code.append('\n' if '\n' in js[i:end] else ' ')
+            i = code_start = end
+        elif char == '/' and (not last or last in _REGEX_PRECEDERS or last in _REGEX_KEYWORDS):
+            end = i + 1
+            in_class = False
+            while end < length and (in_class or js[end] != '/') and js[end] != '\n':
+                if js[end] == '\\':
+                    end += 1
+                elif js[end] == '[':
+                    in_class = True
+                elif js[end] == ']':
+                    in_class = False
+                end += 1
+            end += 1
+            while end < length and (js[end].isalnum() or js[end] in '_$'):
+                end += 1
+            flush(i, js[i:end])
+            i = code_start = end
+            last = 'a'
+        else:
+            if char == '{':
+                depth += 1
+            elif char == '}':
+                depth -= 1
+            if char.isalnum() or char in '_$':
+                end = i + 1
+                while end < length and (js[end].isalnum() or js[end] in '_$'):
+                    end += 1
+                last = js[i:end]
+                i = end
+                continue
+            if not char.isspace():
+                last = char
+            i += 1
+    flush(length)
+    out.append(_strip_code(''.join(code)))
+    return ''.join(out).strip()
+
+
+def minify_html(html_text):
+    """
+    压缩页面标记：去掉HTML注释，删除标签之间用于排版的换行和缩进，其余空白合并为一个空格
+
+    页面中的样式和脚本应已提取为外部文件。
+    """
+    html_text = re.sub(r'<!--.*?-->', '', html_text, flags=re.S)
+    html_text = re.sub(r'>\s*\n\s*<', '><', html_text)
+    return re.sub(r'\s+', ' ', html_text).strip()
+
+
+def hashed_name(name, data):
+    """
+    在文件名（扩展名之前）加上内容哈希
+
+    参数:
+        name: 原始文件名，例如 icons.json
+        data: 文件内容（bytes）
+    """
+    stem, ext = os.path.splitext(os.path.basename(name))
+    return f'{stem}.{hashlib.sha256(data).hexdigest()[:10]}{ext}'
+
+
+def _compact_json(text):
+    """
+    把JSON数据重新序列化为紧凑格式
+    """
+    return dump_shard(json_codec.loads(text))
+
+
+class _DistWriter:
+    """
+    向输出目录写入文件，并记录资源清单
+    """
+
+    def __init__(self, out_dir):
+        self.out_dir = out_dir
+        self.files = {}
+        os.makedirs(os.path.join(out_dir, ASSETS_DIR))
+
+    def write(self, logical_name, text, hashed=True):
+        """
+        写入一个文件及其gzip预压缩版本
+
+        参数:
+            logical_name: 原始名称（清单中的键）
+            text: 文件内容
+            hashed: 是否使用带内容哈希的文件名（放在assets目录中）
+
+        返回:
+            str: 相对于输出目录的发布路径
+        """
+        data = text.encode('utf-8')
+        if hashed:
+            rel_path = f'{ASSETS_DIR}/{hashed_name(logical_name, data)}'
+        else:
+            rel_path = logical_name
+        path = os.path.join(self.out_dir, rel_path)
+        with open(path, 'wb') as f:
+            f.write(data)
+
+        entry = {"file": rel_path, "bytes": len(data)}
+        # mtime固定为0，相同内容每次生成完全相同的压缩文件
+        compressed = gzip.compress(data, compresslevel=9, mtime=0)
+        if len(compressed) < len(data):
+            with open(path + '.gz', 'wb') as f:
+                f.write(compressed)
+            entry["gzip"] = len(compressed)
+        self.files[logical_name] = entry
+        return rel_path
+
+    def write_manifest(self):
+        with open(os.path.join(self.out_dir, ASSET_MANIFEST_NAME), 'w', encoding='utf-8') as f:
+            json_codec.dump({"entry": "index.html", "files": self.files}, f, pretty=True)
+            f.write('\n')
+
+
+def _prepare_output_dir(out_dir):
+    """
+    准备临时输出目录；目标目录已存在时，必须是之前由本模块生成的（含资源清单）或者为空
+    """
+    if os.path.isdir(out_dir) and os.listdir(out_dir) \
+            and not os.path.exists(os.path.join(out_dir, ASSET_MANIFEST_NAME)):
+        raise ValueError(f"{out_dir} 不是发布构建生成的目录，为避免误删请指定其他输出目录")
+    tmp_dir = out_dir.rstrip(os.sep) + '.tmp'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    return tmp_dir
+
+
+def build_dist(html_file_path, out_dir=None):
+    """
+    生成发布目录
+
+    参数:
+        html_file_path: 已生成数据的页面，引用的数据文件相对于页面所在目录读取
+        out_dir: 输出目录（默认页面旁边的dist），整个目录会被重新生成
+
+    返回:
+        dict: 资源清单中的文件表 {原始名称: {"file", "bytes", "gzip"}}
+    """
+    html_dir = os.path.dirname(os.path.abspath(html_file_path))
+    out_dir = out_dir or os.path.join(html_dir, DEFAULT_DIST_DIR)
+    with open(html_file_path, 'r', encoding='utf-8') as f:
+        content = f.read().replace('\r\n', '\n')
+
+    # 内嵌的数据和清单改为紧凑格式
+    slots = find_slots(content)
+    values = {}
+    for name in ('navigationData', 'navigationManifest'):
+        if name in slots:
+            start, end = slots[name]
+            values[name] = _escape_script_json(_compact_json(content[start:end]))
+    content = splice_slots(content, values)
+
+    tmp_dir = _prepare_output_dir(out_dir)
+    writer = _DistWriter(tmp_dir)
+
+    # 页面引用的数据文件：写成带哈希的资源，并把引用改为新路径
+    data_files = {}
+    for match in DATA_REFERENCE.finditer(content):
+        name = match.group(2)
+        if name not in data_files:
+            with open(os.path.join(html_dir, name), 'r', encoding='utf-8') as f:
+                data_files[name] = writer.write(name, _compact_json(f.read()))
+    content = DATA_REFERENCE.sub(lambda m: m.group(1) + data_files[m.group(2)] + m.group(1), content)
+
+    # 样式和脚本提取为带哈希的外部文件
+    def replace_style(match):
+        path = writer.write('style.css', minify_css(match.group(1)))
+        return f'<link rel="stylesheet" href="{path}">'
+
+    def replace_script(match):
+        path = writer.write('app.js', minify_js(match.group(1) + REGISTRATION_SCRIPT))
+        return f'<script src="{path}"></script>'
+
+    content = _STYLE_BLOCK.sub(replace_style, content, count=1)
+    content = _SCRIPT_BLOCK.sub(replace_script, content, count=1)
+    entry = minify_html(content)
+    writer.write('index.html', entry, hashed=False)
+
+    # service worker预缓存全部带哈希的资源
+    precache = [item["file"] for item in writer.files.values() if item["file"].startswith(ASSETS_DIR + '/')]
+    version = service_worker_version(precache, entry.encode('utf-8'))
+    writer.write(SERVICE_WORKER_NAME, minify_js(render_service_worker(precache, version)), hashed=False)
+    writer.write_manifest()
+
+    shutil.rmtree(out_dir, ignore_errors=True)
+    os.replace(tmp_dir, out_dir)
+    return writer.files
+
+
+def main(html_file_path, out_dir=None):
+    """
+    生成发布目录并输出各文件的大小
+
+    返回:
+        int: 退出码（0 成功，1 失败）
+    """
+    try:
+        files = build_dist(html_file_path, out_dir)
+    except (OSError, ValueError) as e:
+        print(f"❌ 生成发布目录失败: {e}")
+        return 1
+
+    total = sum(entry["bytes"] for entry in files.values())
+    total_gzip = sum(entry.get("gzip", entry["bytes"]) for entry in files.values())
+    for name, entry in files.items():
+        print(f"  {name} -> {entry['file']}  {entry['bytes']} 字节（gzip {entry.get('gzip', '-')}）")
+    print(f"✅ 发布目录已生成: {out_dir or DEFAULT_DIST_DIR}（共 {total} 字节，gzip后 {total_gzip} 字节）")
+    return 0
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+网站图标打包模块
+
+功能：在构建时为每个主机名解析网站图标，图标保存在本地磁盘缓存中，
+再按内容去重打包成一个 data URI 表（data/icons.json），页面渲染卡片时直接使用，
+不再为每张卡片单独请求第三方图标服务；表中没有的网站显示转换时解析的emoji图标。
+
+获取图标的方式是可替换的：默认只使用本地缓存；传入fetcher后才会联网获取缺失的图标，
+fetcher可以指向任意地址（例如测试时用本地临时服务器代替真实的图标服务）。
+
+缓存目录结构：
+    index.json      主机名 -> 图标文件名（null表示确认没有可用图标）
+    <哈希>.<扩展名> 按内容哈希命名的图标文件，相同图标只保存一份
+"""
+
+import base64
+import hashlib
+import os
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from data_shards import write_if_changed
+from html_splice import atomic_write
+import json_codec
+from search_index import link_hostname
+
+ICONS_NAME = 'icons.json'
+
+# 默认的图标地址：直接向网站本身获取，不经过第三方图标服务
+DEFAULT_ICON_URL = 'https://{host}/favicon.ico'
+
+# 超过该大小的图标不打包，避免图标表过大
+MAX_ICON_BYTES = 16 * 1024
+
+# 确认没有图标的主机名多久后重新尝试（秒）
+MISSING_TTL = 7 * 24 * 3600
+
+# 根据文件头判断图片类型
+_IMAGE_SIGNATURES = (
+    (b'\x89PNG\r\n\x1a\n', 'image/png', 'png'),
+    (b'\x00\x00\x01\x00', 'image/x-icon', 'ico'),
+    (b'GIF87a', 'image/gif', 'gif'),
+    (b'GIF89a', 'image/gif', 'gif'),
+    (b'\xff\xd8\xff', 'image/jpeg', 'jpg'),
+)
+
+
+def sniff_image_type(data):
+    """
+    根据内容判断图片的MIME类型和扩展名，无法识别时返回(None, None)
+    """
+    for signature, mime, ext in _IMAGE_SIGNATURES:
+        if data.startswith(signature):
+            return mime, ext
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'image/webp', 'webp'
+    head = data[:256].lstrip().lower()
+    if head.startswith(b'<svg') or (head.startswith(b'<?xml') and b'<svg' in data[:1024]):
+        return 'image/svg+xml', 'svg'
+    return None, None
+
+
+class UrlFetcher:
+    """
+    通过HTTP获取图标
+
+    参数:
+        url_template: 图标地址模板，{host}会被替换为主机名
+        timeout: 单次请求的超时时间（秒）
+    """
+
+    def __init__(self, url_template=DEFAULT_ICON_URL, timeout=10):
+        self.url_template = url_template
+        self.timeout = timeout
+
+    def __call__(self, host):
+        """
+        获取主机名对应的图标内容，失败时返回None
+        """
+        url = self.url_template.format(host=host)
+        request = urllib.request.Request(url, headers={'User-Agent': 'navigation-icon-bundler'})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return response.read(MAX_ICON_BYTES + 1)
+        except (urllib.error.URLError, OSError, ValueError):
+            return None
+
+
+class IconCache:
+    """
+    按主机名索引、按内容去重存储的本地图标缓存
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        self.index_path = os.path.join(cache_dir, 'index.json')
+        self.index = {}
+        self.dirty = False
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                self.index = json_codec.load(f)
+        except (OSError, ValueError):
+            pass
+
+    def get(self, host):
+        """
+        查找主机名的图标
+
+        返回:
+            bytes: 图标内容；None表示缓存中没有记录；b''表示已确认没有可用图标
+        """
+        record = self.index.get(host)
+        if record is None:
+            return None
+        if not record.get('file'):
+            if time.time() - record.get('checked', 0) > MISSING_TTL:
+                return None
+            return b''
+        try:
+            with open(os.path.join(self.cache_dir, record['file']), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def put(self, host, data):
+        """
+        保存主机名的图标，data为空表示该主机名没有可用图标
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        mime, ext = sniff_image_type(data) if data else (None, None)
+        if not mime:
+            self.index[host] = {'file': None, 'checked': int(time.time())}
+        else:
+            name = f'{hashlib.sha256(data).hexdigest()[:16]}.{ext}'
+            path = os.path.join(self.cache_dir, name)
+            if not os.path.exists(path):
+                with open(path, 'wb') as f:
+                    f.write(data)
+            self.index[host] = {'file': name}
+        self.dirty = True
+
+    def save(self):
+        if self.dirty:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            atomic_write(self.index_path, json_codec.dumps(self.index, pretty=True, sort_keys=True))
+            self.dirty = False
+
+
+def collect_hosts(navigation_data):
+    """
+    收集导航数据中出现的全部主机名（保持首次出现的顺序）
+    """
+    hosts = {}
+    for subcategories in navigation_data.values():
+        for links in subcategories.values():
+            for link in links:
+                host = link_hostname(link)
+                if host:
+                    hosts[host] = None
+    return list(hosts)
+
+
+def bundle_icons(navigation_data, cache, fetcher=None, workers=8):
+    """
+    为导航数据中的所有主机名解析图标，并打包成去重的 data URI 表
+
+    参数:
+        navigation_data: 转换后的导航数据
+        cache: IconCache实例
+        fetcher: 获取缺失图标的函数 host -> bytes或None；为None时只使用本地缓存
+        workers: 并发获取的线程数
+
+    返回:
+        dict: {"icons": [data URI, ...], "hosts": {主机名: 图标序号}}
+    """
+    hosts = collect_hosts(navigation_data)
+    icons = {host: cache.get(host) for host in hosts}
+
+    missing = [host for host, data in icons.items() if data is None]
+    if missing and fetcher is not None:
+        print(f"正在获取 {len(missing)} 个网站图标...")
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for host, data in zip(missing, executor.map(fetcher, missing)):
+                if data and len(data) > MAX_ICON_BYTES:
+                    data = None
+                cache.put(host, data or b'')
+                icons[host] = cache.get(host)
+        cache.save()
+
+    table = {"icons": [], "hosts": {}}
+    positions = {}
+    for host in sorted(icons):
+        data = icons[host]
+        if not data:
+            continue
+        digest = hashlib.sha256(data).digest()
+        if digest not in positions:
+            mime, _ = sniff_image_type(data)
+            positions[digest] = len(table["icons"])
+            table["icons"].append(f"data:{mime};base64,{base64.b64encode(data).decode('ascii')}")
+        table["hosts"][host] = positions[digest]
+    return table
+
+
+def write_icon_bundle(navigation_data, data_dir, cache, fetcher=None):
+    """
+    生成图标表并写入data目录，内容未变化时不改写文件
+
+    返回:
+        (path, written, count): 图标表路径、是否写入了文件、已打包的主机名数量
+    """
+    os.makedirs(data_dir, exist_ok=True)
+    table = bundle_icons(navigation_data, cache, fetcher)
+    path = os.path.join(data_dir, ICONS_NAME)
+    text = json_codec.dumps(table)
+    return path, write_if_changed(path, text), len(table["hosts"])
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HTML插槽替换模块
+
+功能：在页面中用显式的开始/结束标记划出可替换区域（插槽），
+一次线性扫描找到全部插槽，替换后通过临时文件加重命名一次性写回。
+
+插槽标记格式（HTML中使用注释，脚本中使用块注释）：
+    <!-- slot:version -->...<!-- /slot:version -->
+    /* slot:navigationData */.../* /slot:navigationData */
+"""
+
+import json
+import os
+import re
+
+# 插槽标记：begin为 slot:名称，end为 /slot:名称
+SLOT_MARKER = re.compile(r'(?:<!--|/\*) (/?)slot:([\w-]+) (?:-->|\*/)')
+
+
+class SpliceError(Exception):
+    """
+    页面中的插槽标记缺失或不完整
+    """
+
+
+def find_slots(content):
+    """
+    一次扫描找出页面中的所有插槽
+
+    参数:
+        content: 页面内容
+
+    返回:
+        dict: 插槽名称 -> (内容开始位置, 内容结束位置)
+    """
+    slots = {}
+    open_name = None
+    open_end = 0
+    for match in SLOT_MARKER.finditer(content):
+        closing, name = match.group(1), match.group(2)
+        if not closing:
+            if open_name is not None:
+                raise SpliceError(f"插槽 {open_name} 未闭合就开始了插槽 {name}")
+            open_name, open_end = name, match.end()
+        else:
+            if name != open_name:
+                raise SpliceError(f"插槽结束标记 {name} 没有对应的开始标记")
+            slots[name] = (open_end, match.start())
+            open_name = None
+    if open_name is not None:
+        raise SpliceError(f"插槽 {open_name} 缺少结束标记")
+    return slots
+
+
+def splice_slots(content, values):
+    """
+    替换页面中的插槽内容
+
+    参数:
+        content: 页面内容
+        values: 插槽名称 -> 新内容，未列出的插槽保持不变
+
+    返回:
+        str: 替换后的页面内容
+    """
+    slots = find_slots(content)
+    missing = [name for name in values if name not in slots]
+    if missing:
+        raise SpliceError(f"页面中缺少插槽: {', '.join(missing)}")
+
+    # 保持页面原有的换行风格
+    newline = '\r\n' if '\r\n' in content[:4096] else '\n'
+    parts = []
+    pos = 0
+    for name, (start, end) in sorted(slots.items(), key=lambda item: item[1]):
+        if name not in values:
+            continue
+        value = values[name]
+        if newline != '\n':
+            value = value.replace('\n', newline)
+        parts.append(content[pos:start])
+        parts.append(value)
+        pos = end
+    parts.append(content[pos:])
+    return ''.join(parts)
+
+
+def add_legacy_slots(content):
+    """
+    为旧版页面补上插槽标记
+
+    旧版页面直接写着 const navigationData = {...}; 和
+    "静态导航页面 v1.0 (更新时间: ...) |" 形式的版本信息。
+
+    参数:
+        content: 页面内容
+
+    返回:
+        str: 加上navigationData和version插槽标记后的页面内容
+    """
+    match = re.search(r'\b(?:const|let|var)\s+navigationData\s*=\s*', content)
+    if not match:
+        raise SpliceError("未找到需要替换的navigationData变量")
+    start = match.end()
+    try:
+        _, end = json.JSONDecoder().raw_decode(content, start)
+    except ValueError:
+        raise SpliceError("HTML文件中存在navigationData，但格式与预期不符")
+    content = (content[:start] + '/* slot:navigationData */' + content[start:end]
+               + '/* /slot:navigationData */' + content[end:])
+
+    match = re.search(r'静态导航页面 (v[\d.]+[^|<]*?)\s*\|', content)
+    if match:
+        content = (content[:match.start(1)] + '<!-- slot:version -->' + match.group(1)
+                   + '<!-- /slot:version -->' + content[match.end(1):])
+    return content
+
+
+def atomic_write(path, text):
+    """
+    先写入同目录下的临时文件再重命名，避免中途失败留下不完整的文件
+    """
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+链接图标解析模块
+
+功能：把“网站 -> emoji图标”的规则预先编译成查找表，转换时按链接逐个解析图标，
+不再对每个链接线性扫描全部规则，也不再对整段序列化后的JSON逐条规则执行re.sub。
+
+规则分三类，按以下顺序匹配：
+    domains        域名规则：主机名本身或其任意上级域名命中即可（www.bilibili.com 命中 bilibili.com）
+    host_keywords  主机名关键字规则：主机名中包含该关键字（scholar 命中 scholar.google.com、pubscholar.cn）
+    keywords       URL关键字规则：整个URL中出现该关键字（例如 pdf、news）
+
+域名规则从最具体的域名开始逐级查找（相当于按域名后缀组织的前缀树），
+两类关键字规则各自编译成一个正则一次匹配，同时命中多条时以规则表中靠前的为准。
+前两类只取决于主机名，结果按主机名缓存，同一网站的链接只解析一次。
+"""
+
+import re
+from functools import lru_cache
+
+from search_index import url_hostname
+
+DEFAULT_ICON = '🔗'
+
+# 常用网站的图标（原extract_json.py中的对照表）
+SITE_ICONS = {
+    'www.pkulaw.com': '🔍',
+    'www.qcc.com': '💼',
+    'wenshu.court.gov.cn': '⚖️',
+    '12348.gov.cn': '📋',
+    'cont.12315.cn': '📝',
+    'ds.gov.cn': '📢',
+    'neea.edu.cn': '🎓',
+    'impta.com.cn': '📋',
+    'hhpta.org.cn': '📋',
+    'jiuyuanqu.gov.cn': '🏛️',
+    'nmgjyyun.cn': '🎓',
+    'rsj.baotou.gov.cn': '💼',
+    'ipcrs.pbccrc.org.cn': '💳',
+    'rev.gov.cn': '🏭',
+    'bilibili.com': '🎬',
+    '3dcontentcentral.com': '3️⃣',
+    'sketchfab.com': '📐',
+    'tv.cctv.com': '📺',
+    'news.cn': '🔊',
+    'ctext.org': '📚',
+    'allhistory.com': '📜',
+    'laozhaopian5.com': '🗺️',
+    'onegreen.net': '🗺️',
+    'guoxue123.com': '📚',
+    'docuchina.cn': '🎥',
+    'csdn.net': '💻',
+    'zhihu.com': '🧠',
+    'github.com': '🔧',
+    'comsol.com': '🧲',
+    'itblogcn.com': '🔧',
+    'weather.codes': '🌤️',
+    'sspai.com': '📱',
+    'intel.cn': '⚡',
+    'daoisms.org': '📜',
+    'zhangzhiyong.cn': '🎓',
+    'sohu.com': '💬',
+    'txlzp.com': '🗺️',
+    'kf.cn': '🏞️',
+    'ifeng.com': '🎭',
+    'ickoo.com.cn': '📚',
+    'sciencenet.cn': '📋',
+    'workercn.cn': '⚖️',
+    'xh.5156edu.com': '👨🏼‍⚖️',
+    '255star.com': '👸🏼',
+    'cnki.net': '📊',
+    'baike.baidu.com': '🗓️',
+    'massgrave.dev': '📥',
+    'ntcebm7.neea.edu.cn': '🎓',
+    'getsimnum.caict.ac.cn': '📱',
+    'ipc.court.gov.cn': '🏛️',
+    'openai.com': '🤖',
+    'google.com': '🔍',
+    'bing.com': '🔍',
+    'baidu.com': '🔍',
+}
+
+
+class _KeywordRules:
+    """
+    编译成单个正则的关键字规则，命中多条时取规则表中靠前的
+    """
+
+    def __init__(self, rules):
+        self.rules = {keyword.lower(): (priority, icon)
+                      for priority, (keyword, icon) in enumerate(rules.items())}
+        # 用零宽前瞻在每个位置取优先级最高的关键字，重叠的关键字（如 java 与 javascript）也不会漏掉
+        self.pattern = re.compile('(?=(%s))' % '|'.join(map(re.escape, self.rules)))
+
+    def match(self, text):
+        matches = [self.rules[match.group(1)] for match in self.pattern.finditer(text)]
+        return min(matches)[1] if matches else None
+
+
+class IconResolver:
+    """
+    预编译的链接图标解析器
+
+    参数:
+        domains: 域名规则 {域名: 图标}
+        host_keywords: 主机名关键字规则 {关键字: 图标}，靠前的优先
+        keywords: URL关键字规则 {关键字: 图标}，靠前的优先
+        default: 没有规则命中时使用的图标
+        cache_size: 按主机名缓存的解析结果数量
+    """
+
+    def __init__(self, domains=None, host_keywords=None, keywords=None, default=DEFAULT_ICON, cache_size=4096):
+        self.domains = {domain.lower().rstrip('.'): icon for domain, icon in (domains or {}).items()}
+        self.host_keywords = _KeywordRules(host_keywords) if host_keywords else None
+        self.keywords = _KeywordRules(keywords) if keywords else None
+        self.default = default
+        self.resolve_host = lru_cache(maxsize=cache_size)(self._resolve_host)
+
+    def _resolve_host(self, host):
+        """
+        按域名规则和主机名关键字规则解析主机名的图标，没有命中时返回None
+        """
+        parts = host.split('.')
+        for i in range(len(parts)):
+            icon = self.domains.get('.'.join(parts[i:]))
+            if icon is not None:
+                return icon
+        return self.host_keywords.match(host) if self.host_keywords else None
+
+    def resolve(self, url, default=None):
+        """
+        解析链接的图标
+
+        参数:
+            url: 链接地址
+            default: 没有规则命中时使用的图标（None表示使用构造时指定的默认图标）
+
+        返回:
+            str: 图标
+        """
+        host = url_hostname(url).lower().rstrip('.')
+        icon = self.resolve_host(host) if host else None
+        if icon is None and self.keywords and url:
+            icon = self.keywords.match(url.lower())
+        if icon is None:
+            icon = self.default if default is None else default
+        return icon
+
+    def cache_info(self):
+        return self.resolve_host.cache_info()
+
+
+def is_remote_icon(icon):
+    """
+    判断图标是否是远程图片地址（而不是emoji等可以直接显示的文本）
+    """
+    return isinstance(icon, str) and icon.startswith(('http://', 'https://', '//'))
+
+
+# 常用网站图标解析器，供各转换脚本共用
+site_icons = IconResolver(domains=SITE_ICONS)
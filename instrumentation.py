@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+构建过程计量模块
+
+功能：为数据更新流程提供统一的计量接口，代替散落在各处的调试输出：
+    span     计时区间，记录每个阶段的耗时（可嵌套），开启内存跟踪时同时记录阶段内的内存峰值
+    count    计数器，记录处理的文件夹、链接等数量
+    debug    调试信息，安静模式下不输出
+
+各模块通过本模块的函数记录，不需要层层传递参数；实际记录到当前激活的Instrumentation中。
+没有激活时使用默认实例：只计时和计数，调试信息照常输出。
+
+计量结果可以保存为JSON报告；需要更细的信息时可以同时用cProfile记录函数级的耗时。
+"""
+
+import contextlib
+import cProfile
+import time
+import tracemalloc
+
+import json_codec
+
+REPORT_VERSION = 1
+
+
+class Instrumentation:
+    """
+    一次构建的计量记录
+
+    参数:
+        quiet: 安静模式，不输出调试信息（逐个节点的输出也完全跳过，不产生格式化开销）
+        trace_memory: 是否用tracemalloc记录各阶段的内存峰值（会让构建变慢）
+        profile_path: cProfile结果的保存路径（None表示不使用cProfile）
+    """
+
+    def __init__(self, quiet=False, trace_memory=False, profile_path=None):
+        self.quiet = quiet
+        self.trace_memory = trace_memory
+        self.profile_path = profile_path
+        # 按开始顺序排列的区间记录
+        self.spans = []
+        self.counters = {}
+        # 当前打开的区间（记录、开始时已分配的内存、区间内的内存峰值）
+        self._stack = []
+
+    def _update_peaks(self):
+        """
+        把tracemalloc自上次重置以来的峰值计入所有打开的区间，然后重置峰值
+        """
+        peak = tracemalloc.get_traced_memory()[1]
+        for frame in self._stack:
+            frame[2] = max(frame[2], peak)
+        tracemalloc.reset_peak()
+
+    @contextlib.contextmanager
+    def span(self, name):
+        """
+        记录一个阶段的耗时（和内存峰值）
+
+        参数:
+            name: 阶段名称，嵌套区间的路径为 外层/内层
+        """
+        path = '/'.join([frame[0]["name"] for frame in self._stack] + [name])
+        record = {"name": name, "path": path, "seconds": None}
+        self.spans.append(record)
+        tracing = self.trace_memory and tracemalloc.is_tracing()
+        if tracing:
+            self._update_peaks()
+            current = tracemalloc.get_traced_memory()[0]
+            frame = [record, current, current]
+        else:
+            frame = [record, 0, 0]
+        self._stack.append(frame)
+        started = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record["seconds"] = round(time.perf_counter() - started, 6)
+            if tracing:
+                self._update_peaks()
+                record["peak_bytes"] = frame[2] - frame[1]
+            self._stack.pop()
+
+    def count(self, name, value=1):
+        """
+        计数器加上value
+        """
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def debug(self, message):
+        """
+        输出调试信息（安静模式下不输出）
+        """
+        if not self.quiet:
+            print(f"调试信息: {message}")
+
+    @contextlib.contextmanager
+    def activate(self):
+        """
+        在with块中把本实例设为当前实例，并按设置开启内存跟踪和cProfile
+        """
+        global _current
+        previous = _current
+        _current = self
+        started_tracing = self.trace_memory and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        profiler = cProfile.Profile() if self.profile_path else None
+        if profiler:
+            profiler.enable()
+        try:
+            yield self
+        finally:
+            if profiler:
+                profiler.disable()
+                profiler.dump_stats(self.profile_path)
+            if started_tracing:
+                tracemalloc.stop()
+            _current = previous
+
+    def report(self):
+        """
+        返回计量报告
+
+        返回:
+            dict: {"version", "spans": [{"name", "path", "seconds", "peak_bytes"}],
+                   "counters": {名称: 数量}, "trace_memory", "profile"}
+        """
+        return {
+            "version": REPORT_VERSION,
+            "spans": self.spans,
+            "counters": self.counters,
+            "trace_memory": self.trace_memory,
+            "profile": self.profile_path,
+        }
+
+    def write_report(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json_codec.dump(self.report(), f, pretty=True)
+            f.write('\n')
+
+    def summary(self):
+        """
+        返回各阶段耗时的文本摘要（每个区间一行，按嵌套缩进）
+        """
+        lines = []
+        for record in self.spans:
+            if record["seconds"] is None:
+                continue
+            indent = '  ' * record["path"].count('/')
+            line = f"{indent}{record['name']}: {record['seconds'] * 1000:.1f} ms"
+            if "peak_bytes" in record:
+                line += f"，内存峰值 {record['peak_bytes'] / 1024 / 1024:.1f} MB"
+            lines.append(line)
+        return '\n'.join(lines)
+
+
+_current = Instrumentation()
+
+
+def current():
+    """
+    返回当前激活的计量实例
+    """
+    return _current
+
+
+def span(name):
+    return _current.span(name)
+
+
+def count(name, value=1):
+    _current.count(name, value)
+
+
+def debug(message):
+    _current.debug(message)
+
+
+def is_quiet():
+    return _current.quiet
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+JSON编解码模块
+
+功能：各脚本读写JSON都通过本模块，安装了orjson时使用orjson，否则使用标准库json。
+两种后端输出的内容完全相同（字节级一致），切换后端只影响速度，不会改变生成的文件，
+可以用基准测试（见benchmark.py）直接比较两者的读写耗时。
+
+输出格式：
+    compact  紧凑格式，与 json.dumps(ensure_ascii=False, separators=(',', ':')) 相同
+    pretty   两空格缩进，与 json.dumps(ensure_ascii=False, indent=2) 相同
+
+一致性：
+    - orjson不支持的内容（超出64位的整数、非字符串的键等）自动改用标准库
+    - 很大和很小的浮点数两者写法不同（1e+16 / 1e16，6.9e-05 / 0.000069），orjson的输出中出现
+      指数或“0.0000”时改用标准库重新生成（字符串中恰好出现这种写法时也会改用，结果仍然一致）
+    - datetime、dataclass等标准库不支持的类型，orjson也不序列化，两者同样报错
+    - NaN和Infinity不是合法的JSON：标准库报错，orjson写成null，因此orjson的输出中出现null时
+      也改用标准库重新生成（导航数据、分片和索引中没有null，不影响这些文件的生成速度）
+
+环境变量 NAVIGATION_JSON_BACKEND=json 可以强制使用标准库。
+"""
+
+import json
+import os
+import re
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# 标准库不支持的类型交给标准库处理（报错），而不是由orjson按自己的格式输出
+_ORJSON_STRICT = (orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS) if orjson else 0
+
+BACKEND_STDLIB = 'json'
+BACKEND_ORJSON = 'orjson'
+
+_COMPACT = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'), allow_nan=False)
+_PRETTY = json.JSONEncoder(ensure_ascii=False, indent=2, allow_nan=False)
+_COMPACT_SORTED = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'), sort_keys=True, allow_nan=False)
+_PRETTY_SORTED = json.JSONEncoder(ensure_ascii=False, indent=2, sort_keys=True, allow_nan=False)
+
+# orjson输出中写法与标准库可能不同的内容：指数表示的浮点数、小于1e-4的非指数表示的浮点数，
+# 以及可能由NaN/Infinity转换来的null（也会匹配字符串中的同样写法，此时只是多一次重新生成）；
+# 固定的写法用in查找，比放在同一个正则表达式里快得多
+_EXPONENT = re.compile(rb'[0-9][eE]')
+_MISMATCH_LITERALS = (b'0.0000', b'null')
+
+_backend = None
+
+
+def use_backend(name=None):
+    """
+    选择后端
+
+    参数:
+        name: 'orjson'、'json'，None表示自动选择（有orjson时使用orjson，环境变量可强制使用标准库）
+
+    返回:
+        str: 实际使用的后端名称
+    """
+    global _backend
+    if name is None:
+        name = os.environ.get('NAVIGATION_JSON_BACKEND') or (BACKEND_ORJSON if orjson else BACKEND_STDLIB)
+    if name == BACKEND_ORJSON and orjson is None:
+        raise ValueError("未安装orjson")
+    if name not in (BACKEND_ORJSON, BACKEND_STDLIB):
+        raise ValueError(f"未知的JSON后端: {name}")
+    _backend = name
+    return name
+
+
+def backend():
+    """
+    当前使用的后端名称
+    """
+    return _backend
+
+
+def is_fast():
+    """
+    是否在使用比标准库更快的后端
+    """
+    return _backend != BACKEND_STDLIB
+
+
+def loads(data):
+    """
+    解析JSON文本（str或bytes）
+    """
+    if _backend == BACKEND_ORJSON:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # 超出64位的整数等orjson不支持的内容，以及格式错误时的错误信息，都以标准库为准
+            pass
+    return json.loads(data)
+
+
+def load(fp):
+    """
+    从文件对象读取并解析JSON
+    """
+    return loads(fp.read())
+
+
+def _may_differ(data):
+    """
+    orjson的输出是否可能与标准库不同
+    """
+    return any(literal in data for literal in _MISMATCH_LITERALS) or _EXPONENT.search(data) is not None
+
+
+def _stdlib_encoder(pretty, sort_keys):
+    if pretty:
+        return _PRETTY_SORTED if sort_keys else _PRETTY
+    return _COMPACT_SORTED if sort_keys else _COMPACT
+
+
+def dumps(obj, pretty=False, sort_keys=False):
+    """
+    序列化为JSON文本
+
+    参数:
+        obj: 要序列化的数据
+        pretty: 是否使用两空格缩进（默认紧凑格式）
+        sort_keys: 是否按键排序
+
+    返回:
+        str
+    """
+    if _backend == BACKEND_ORJSON:
+        option = _ORJSON_STRICT | (orjson.OPT_INDENT_2 if pretty else 0) | (orjson.OPT_SORT_KEYS if sort_keys else 0)
+        try:
+            data = orjson.dumps(obj, option=option)
+        except TypeError:
+            data = None
+        if data is not None and not _may_differ(data):
+            return data.decode('utf-8')
+    return _stdlib_encoder(pretty, sort_keys).encode(obj)
+
+
+# iterdumps一次编码的最多成员数
+_ITER_BATCH = 256
+
+
+_CONTAINER_TYPES = frozenset((dict, list, tuple))
+
+
+def _is_flat(obj):
+    """
+    是否为标量，或只包含标量的列表、字典（整体编码，不再拆分）
+
+    只决定怎样分段，不影响输出内容，因此只按确切的类型判断（子类的值当作标量，只是不再拆分）
+    """
+    kind = type(obj)
+    if kind is dict:
+        return _CONTAINER_TYPES.isdisjoint(map(type, obj.values()))
+    if kind is list or kind is tuple:
+        return _CONTAINER_TYPES.isdisjoint(map(type, obj))
+    return True
+
+
+def _reindent(text, pretty, level):
+    # 整体编码的内容位于第level层，缩进格式下后续各行补上外层的缩进
+    if pretty and level:
+        return text.replace('\n', '\n' + '  ' * level)
+    return text
+
+
+def _encode_items(items, pretty, level):
+    """
+    编码第level层容器中连续的若干个元素，结果不含方括号和首个元素前的缩进
+    """
+    text = dumps(items, pretty)
+    # 紧凑格式去掉"["和"]"，缩进格式去掉"[\n  "和"\n]"
+    return _reindent(text[4:-2], pretty, level) if pretty else text[1:-1]
+
+
+def _iterencode(obj, pretty, level):
+    newline = '\n' + '  ' * (level + 1) if pretty else ''
+    closing = '\n' + '  ' * level if pretty else ''
+    if isinstance(obj, dict) and not _is_flat(obj) and all(isinstance(key, str) for key in obj):
+        # 逐个成员编码；键不都是字符串时整体编码，键的转换规则以dumps为准
+        colon = ': ' if pretty else ':'
+        separator = newline
+        yield '{'
+        for key, value in obj.items():
+            yield separator + dumps(key) + colon
+            yield from _iterencode(value, pretty, level + 1)
+            separator = ',' + newline
+        yield closing + '}'
+    elif isinstance(obj, (list, tuple)) and not _is_flat(obj):
+        # 连续的标量和扁平元素成批编码，包含容器的元素递归拆分
+        separator = newline
+        batch = []
+        yield '['
+        for item in obj:
+            if _is_flat(item):
+                batch.append(item)
+                if len(batch) < _ITER_BATCH:
+                    continue
+                yield separator + _encode_items(batch, pretty, level)
+                batch = []
+            else:
+                if batch:
+                    yield separator + _encode_items(batch, pretty, level)
+                    batch = []
+                    separator = ',' + newline
+                yield separator
+                yield from _iterencode(item, pretty, level + 1)
+            separator = ',' + newline
+        if batch:
+            yield separator + _encode_items(batch, pretty, level)
+        yield closing + ']'
+    else:
+        yield _reindent(dumps(obj, pretty), pretty, level)
+
+
+def iterdumps(obj, pretty=False):
+    """
+    逐段产出与dumps相同的JSON文本，写文件时不需要先生成完整的字符串
+
+    包含容器的字典逐个成员拆分，列表中的扁平元素（例如链接）每批最多_ITER_BATCH个，
+    每段都用dumps编码（orjson或标准库的C编码器），比标准库iterencode的纯Python逐段生成快得多，
+    每段的大小也不随数据总量增长。
+    """
+    yield from _iterencode(obj, pretty, 0)
+
+
+def dump(obj, fp, pretty=False, sort_keys=False):
+    """
+    序列化并写入文本文件对象
+    """
+    fp.write(dumps(obj, pretty, sort_keys))
+
+
+use_backend()
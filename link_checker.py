@@ -0,0 +1,453 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+链接有效性检查工具
+
+功能：遍历与convert_json_format相同的书签树，使用asyncio并发探测每个链接
+（先HEAD，失败或不支持时再GET），同一主机的连接保持复用并限制并发数。
+检查结果保存在持久化缓存中，未过期的结果直接复用，过期后通过ETag/Last-Modified条件请求重新验证。
+update_static_data.py生成数据时会根据缓存把失效和已永久跳转的链接标注出来。
+
+使用方法：python link_checker.py 或 python navigation.py check
+"""
+
+import asyncio
+import os
+import socket
+import ssl
+import sys
+import time
+from collections import defaultdict
+from urllib.parse import quote, urljoin, urlsplit
+
+from html_splice import atomic_write
+import json_codec
+
+DEFAULT_CACHE_NAME = '.link_cache.json'
+
+# 检查结果的有效期（秒），过期后重新验证
+DEFAULT_TTL = 24 * 3600
+# 全部主机合计的最大并发连接数
+DEFAULT_CONCURRENCY = 32
+# 单个主机的最大并发连接数
+DEFAULT_PER_HOST = 2
+# 单次请求的超时时间（秒）
+DEFAULT_TIMEOUT = 15
+
+MAX_REDIRECTS = 5
+# 为了复用连接而读完响应体的上限，超过时直接关闭连接
+MAX_DRAIN_BYTES = 256 * 1024
+USER_AGENT = 'Mozilla/5.0 (compatible; navigation-link-checker)'
+
+# 链接状态
+STATE_OK = 'ok'
+STATE_DEAD = 'dead'
+STATE_REDIRECT = 'redirect'
+STATE_ERROR = 'error'
+
+_REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+_PERMANENT_REDIRECTS = (301, 308)
+_DEAD_STATUSES = (404, 410)
+_URL_SAFE_CHARS = "!#$%&'()*+,/:;=?@[]~"
+
+
+class HttpResponse:
+    """
+    HTTP响应的状态码和响应头（响应头名称统一为小写）
+    """
+
+    def __init__(self, status, headers):
+        self.status = status
+        self.headers = headers
+
+
+class ConnectionPool:
+    """
+    按 (协议, 主机, 端口) 复用keep-alive连接的最小HTTP/1.1客户端
+
+    参数:
+        concurrency: 全部主机合计的最大并发请求数
+        per_host: 单个主机的最大并发请求数
+        timeout: 单次请求的超时时间（秒）
+        ssl_context: HTTPS使用的SSL上下文
+    """
+
+    def __init__(self, concurrency=DEFAULT_CONCURRENCY, per_host=DEFAULT_PER_HOST,
+                 timeout=DEFAULT_TIMEOUT, ssl_context=None):
+        self.per_host = per_host
+        self.timeout = timeout
+        self.ssl_context = ssl_context or ssl.create_default_context()
+        self._total = asyncio.Semaphore(concurrency)
+        self._host_limits = {}
+        self._idle = defaultdict(list)
+        # 统计信息
+        self.opened = 0
+        self.reused = 0
+
+    async def request(self, method, url, headers=None):
+        """
+        发送请求并返回响应（不读取响应体内容）
+
+        复用的空闲连接可能已被服务器关闭，此时会换一个新连接重试一次。
+        """
+        parts = urlsplit(url)
+        scheme = parts.scheme.lower()
+        if scheme not in ('http', 'https') or not parts.hostname:
+            raise ValueError(f'不支持的URL: {url}')
+        host = parts.hostname
+        port = parts.port or (443 if scheme == 'https' else 80)
+        host_header = host if parts.port is None else f'{host}:{parts.port}'
+        path = quote(parts.path or '/', safe=_URL_SAFE_CHARS)
+        if parts.query:
+            path += '?' + quote(parts.query, safe=_URL_SAFE_CHARS)
+
+        key = (scheme, host, port)
+        host_limit = self._host_limits.setdefault(key, asyncio.Semaphore(self.per_host))
+        async with host_limit, self._total:
+            for attempt in range(2):
+                idle = self._idle[key]
+                conn = idle.pop() if idle else None
+                reused = conn is not None
+                try:
+                    if conn is None:
+                        conn = await asyncio.wait_for(asyncio.open_connection(
+                            host, port,
+                            ssl=self.ssl_context if scheme == 'https' else None,
+                            server_hostname=host if scheme == 'https' else None,
+                        ), self.timeout)
+                        self.opened += 1
+                    else:
+                        self.reused += 1
+                    response, keep_alive = await asyncio.wait_for(
+                        self._exchange(conn, method, host_header, path, headers or {}),
+                        self.timeout)
+                except asyncio.TimeoutError:
+                    if conn is not None:
+                        conn[1].close()
+                    raise
+                except (OSError, ValueError, asyncio.IncompleteReadError):
+                    if conn is not None:
+                        conn[1].close()
+                    if reused and attempt == 0:
+                        continue
+                    raise
+                if keep_alive:
+                    self._idle[key].append(conn)
+                else:
+                    conn[1].close()
+                return response
+
+    async def _exchange(self, conn, method, host_header, path, headers):
+        """
+        在一个连接上完成一次请求/响应
+
+        返回:
+            (HttpResponse, 连接是否可以继续复用)
+        """
+        reader, writer = conn
+        lines = [
+            f'{method} {path} HTTP/1.1',
+            f'Host: {host_header}',
+            f'User-Agent: {USER_AGENT}',
+            'Accept: */*',
+            'Connection: keep-alive',
+        ]
+        lines.extend(f'{name}: {value}' for name, value in headers.items())
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+        await writer.drain()
+
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionError('连接已被服务器关闭')
+        version, status = status_line.decode('latin-1').split(None, 2)[:2]
+        status = int(status)
+        response_headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            response_headers[name.strip().lower()] = value.strip()
+
+        keep_alive = (version == 'HTTP/1.1'
+                      and response_headers.get('connection', '').lower() != 'close')
+        if method != 'HEAD' and status not in (204, 304) and status >= 200:
+            keep_alive = await self._drain_body(reader, response_headers) and keep_alive
+        return HttpResponse(status, response_headers), keep_alive
+
+    async def _drain_body(self, reader, headers):
+        """
+        读完并丢弃响应体，返回连接是否还能复用
+        """
+        if 'chunked' in headers.get('transfer-encoding', '').lower():
+            total = 0
+            while True:
+                size = int((await reader.readline()).split(b';')[0].strip() or b'0', 16)
+                if size == 0:
+                    # 跳过trailer
+                    while await reader.readline() not in (b'\r\n', b'\n', b''):
+                        pass
+                    return True
+                total += size
+                if total > MAX_DRAIN_BYTES:
+                    return False
+                await reader.readexactly(size + 2)
+        length = headers.get('content-length', '')
+        if length.isdigit() and int(length) <= MAX_DRAIN_BYTES:
+            await reader.readexactly(int(length))
+            return True
+        # 没有长度信息或响应体太大，只能关闭连接
+        return False
+
+    def close(self):
+        """
+        关闭所有空闲连接
+        """
+        for connections in self._idle.values():
+            for _, writer in connections:
+                writer.close()
+        self._idle.clear()
+
+
+def _validators(response):
+    return {
+        'etag': response.headers.get('etag'),
+        'last_modified': response.headers.get('last-modified'),
+    }
+
+
+async def probe_link(pool, url, cached=None):
+    """
+    探测单个链接的状态
+
+    先发送HEAD请求，出错或返回4xx/5xx时再用GET确认；跟随最多MAX_REDIRECTS次跳转。
+    缓存中有ETag/Last-Modified时先对最终地址发送条件请求，返回304则沿用缓存结果。
+
+    参数:
+        pool: ConnectionPool实例
+        url: 链接地址
+        cached: 该链接上次的检查结果
+
+    返回:
+        dict: 检查结果，包含state、status、final_url、etag、last_modified、checked
+    """
+    now = int(time.time())
+    if cached and cached.get('state') in (STATE_OK, STATE_REDIRECT):
+        conditional = {}
+        if cached.get('etag'):
+            conditional['If-None-Match'] = cached['etag']
+        if cached.get('last_modified'):
+            conditional['If-Modified-Since'] = cached['last_modified']
+        if conditional:
+            try:
+                response = await pool.request('HEAD', cached['final_url'], conditional)
+                if response.status == 304:
+                    return dict(cached, checked=now)
+            except (OSError, ValueError, asyncio.TimeoutError):
+                pass
+
+    current = url
+    permanent = False
+    hops = 0
+    method = 'HEAD'
+    while True:
+        try:
+            response = await pool.request(method, current)
+        except (OSError, ValueError, asyncio.TimeoutError) as e:
+            # 只有域名不存在才直接视为失效；连接被拒绝、超时、临时解析失败等可能只是暂时的
+            # （服务器重启、防火墙限流），GET再试一次后仍失败也只记为无法确认
+            if isinstance(e, socket.gaierror) and e.errno == socket.EAI_NONAME:
+                return {'state': STATE_DEAD, 'status': None, 'final_url': current,
+                        'error': str(e) or type(e).__name__, 'checked': now}
+            if method == 'HEAD':
+                method = 'GET'
+                continue
+            return {'state': STATE_ERROR, 'status': None, 'final_url': current,
+                    'error': str(e) or type(e).__name__, 'checked': now}
+
+        location = response.headers.get('location')
+        if response.status in _REDIRECT_STATUSES and location and hops < MAX_REDIRECTS:
+            current = urljoin(current, location)
+            permanent = permanent or response.status in _PERMANENT_REDIRECTS
+            hops += 1
+            method = 'HEAD'
+            continue
+        if method == 'HEAD' and response.status >= 400:
+            # 部分网站不支持HEAD，用GET再确认一次
+            method = 'GET'
+            continue
+        break
+
+    if response.status in _DEAD_STATUSES:
+        state = STATE_DEAD
+    elif response.status >= 400:
+        state = STATE_ERROR
+    elif permanent and current != url:
+        state = STATE_REDIRECT
+    else:
+        state = STATE_OK
+    result = {'state': state, 'status': response.status, 'final_url': current, 'checked': now}
+    result.update(_validators(response))
+    return result
+
+
+class LinkStatusCache:
+    """
+    链接检查结果的持久化缓存（URL -> 检查结果）
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.results = {}
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                self.results = json_codec.load(f)
+        except (OSError, ValueError):
+            pass
+
+    def is_fresh(self, url, ttl):
+        result = self.results.get(url)
+        return bool(result) and time.time() - result.get('checked', 0) < ttl
+
+    def save(self):
+        atomic_write(self.path, json_codec.dumps(self.results, pretty=True, sort_keys=True))
+
+
+async def check_links_async(urls, cache, ttl=DEFAULT_TTL, pool=None, progress=None):
+    """
+    并发检查一组链接，结果写入cache
+
+    参数:
+        urls: 链接地址列表
+        cache: LinkStatusCache实例
+        ttl: 检查结果的有效期（秒），未过期的链接不再请求
+        pool: ConnectionPool实例（为None时使用默认参数创建）
+        progress: 每完成一个链接时调用的函数 (url, result)
+
+    返回:
+        int: 实际发出请求检查的链接数量
+    """
+    todo = [url for url in dict.fromkeys(urls) if not cache.is_fresh(url, ttl)]
+    own_pool = pool is None
+    if own_pool:
+        pool = ConnectionPool()
+
+    async def check(url):
+        try:
+            result = await probe_link(pool, url, cache.results.get(url))
+        except Exception as e:
+            result = {'state': STATE_ERROR, 'status': None, 'final_url': url,
+                      'error': str(e) or type(e).__name__, 'checked': int(time.time())}
+        cache.results[url] = result
+        if progress:
+            progress(url, result)
+
+    try:
+        await asyncio.gather(*(check(url) for url in todo))
+    finally:
+        if own_pool:
+            pool.close()
+    return len(todo)
+
+
+def iter_navigation_links(navigation_data):
+    """
+    遍历转换后的导航数据中的全部链接
+    """
+    for subcategories in navigation_data.values():
+        for links in subcategories.values():
+            yield from links
+
+
+def load_link_statuses(cache_path):
+    """
+    读取检查结果缓存，文件不存在时返回空字典
+    """
+    return LinkStatusCache(cache_path).results if os.path.exists(cache_path) else {}
+
+
+def annotate_links(navigation_data, statuses):
+    """
+    根据检查结果标注导航数据中的链接
+
+    失效的链接增加 "status": "dead"，永久跳转的链接增加 "redirect": 跳转后的地址。
+
+    返回:
+        (dead, redirected): 标注的失效链接数和跳转链接数
+    """
+    dead = redirected = 0
+    for link in iter_navigation_links(navigation_data):
+        result = statuses.get(link.get('url'))
+        if not result:
+            continue
+        if result['state'] == STATE_DEAD:
+            link['status'] = STATE_DEAD
+            dead += 1
+        elif result['state'] == STATE_REDIRECT:
+            link['redirect'] = result['final_url']
+            redirected += 1
+    return dead, redirected
+
+
+def main(pintree_path=None, cache_path=None, concurrency=DEFAULT_CONCURRENCY,
+         timeout=DEFAULT_TIMEOUT, ttl=DEFAULT_TTL, fail_on_dead=False):
+    """
+    主函数
+
+    参数:
+        pintree_path: 书签文件路径（默认使用脚本所在目录的pintree.json）
+        cache_path: 检查结果缓存路径（默认放在脚本所在目录，与update_static_data.py读取的位置一致）
+        concurrency: 全部主机合计的最大并发连接数
+        timeout: 单次请求的超时时间（秒）
+        ttl: 检查结果的有效期（秒）
+        fail_on_dead: 发现失效链接时是否返回非零退出码
+
+    返回:
+        int: 退出码（0 成功，1 读取失败，2 发现失效链接且fail_on_dead为真）
+    """
+    from update_static_data import convert_json_format
+    from bookmark_tree import BookmarkTree
+
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    if pintree_path is None:
+        pintree_path = os.path.join(current_dir, 'pintree.json')
+    if cache_path is None:
+        cache_path = os.path.join(current_dir, DEFAULT_CACHE_NAME)
+    cache = LinkStatusCache(cache_path)
+
+    try:
+        navigation_data = convert_json_format(BookmarkTree.load(pintree_path))
+    except (OSError, ValueError) as e:
+        print(f"读取书签文件失败: {e}")
+        return 1
+    urls = [link['url'] for link in iter_navigation_links(navigation_data) if link.get('url')]
+
+    print(f"正在检查 {len(set(urls))} 个链接...")
+    started = time.time()
+
+    async def run():
+        pool = ConnectionPool(concurrency=concurrency, timeout=timeout)
+        try:
+            return await check_links_async(urls, cache, ttl, pool)
+        finally:
+            pool.close()
+
+    checked = asyncio.run(run())
+    cache.save()
+    print(f"完成: 请求了 {checked} 个链接，用时 {time.time() - started:.1f} 秒")
+
+    dead = 0
+    for url in dict.fromkeys(urls):
+        result = cache.results.get(url, {})
+        if result.get('state') == STATE_DEAD:
+            dead += 1
+            print(f"❌ 失效: {url} ({result.get('status') or result.get('error')})")
+        elif result.get('state') == STATE_REDIRECT:
+            print(f"↪️ 跳转: {url} -> {result['final_url']}")
+        elif result.get('state') == STATE_ERROR:
+            print(f"⚠️ 无法确认: {url} ({result.get('status') or result.get('error')})")
+    return 2 if dead and fail_on_dead else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
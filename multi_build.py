@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多目标构建模块
+
+功能：一次构建更新多个页面。书签只读取和转换一次，每种数据格式也只生成和序列化一次，
+然后通过进程池并行写出各个页面。
+
+目标清单（默认为build_targets.json）：
+    {"targets": [
+        {"html": "index.html", "shape": "flat"},
+        {"html": "static_navigation.v1.html", "shape": "three-level"}
+    ]}
+
+    html    页面路径（相对于清单所在的目录）
+    shape   数据格式：flat 为convert_json_format的“分类 - 子分类”展开格式（默认），
+            three-level 为convert_three_level的 分类 -> 子分类 -> 链接 三级格式
+    inline  是否把完整数据内嵌到页面中（只对带navigationManifest插槽的页面有效，默认false）
+
+带navigationManifest插槽的页面（index.html）同时写出页面旁边的data目录（分片、搜索索引、图标表），
+旧版页面只更新内嵌的navigationData。同一目录中只能有一个写data目录的页面。
+
+使用方法：python navigation.py build-all [--targets build_targets.json] [--workers 4]
+"""
+
+import contextlib
+import io
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from bookmark_tree import BookmarkTree
+from data_shards import DEFAULT_DATA_DIR
+from favicon_bundle import IconCache
+from html_splice import find_slots
+from instrumentation import Instrumentation, count, span
+import json_codec
+from link_checker import DEFAULT_CACHE_NAME as LINK_CACHE_NAME
+from update_static_data import (convert_three_level, navigation_data_from_tree, serialize_navigation_data,
+                                update_html_file, write_page)
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_TARGETS = os.path.join(ROOT_DIR, 'build_targets.json')
+
+SHAPE_FLAT = 'flat'
+SHAPE_THREE_LEVEL = 'three-level'
+SHAPES = (SHAPE_FLAT, SHAPE_THREE_LEVEL)
+
+
+class TargetError(Exception):
+    """
+    目标清单有误
+    """
+
+
+def load_targets(path):
+    """
+    读取并检查目标清单
+
+    参数:
+        path: 目标清单文件
+
+    返回:
+        list: [{"html": 绝对路径, "shape", "inline", "data_dir": 写出的data目录或None}]
+
+    异常:
+        TargetError: 清单格式错误、页面不存在或多个页面写同一个data目录
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            entries = json_codec.load(f)["targets"]
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        raise TargetError(f"读取目标清单失败: {e}")
+
+    base_dir = os.path.dirname(os.path.abspath(path))
+    targets = []
+    seen = {}
+    for entry in entries:
+        if not isinstance(entry, dict) or not entry.get('html'):
+            raise TargetError(f"目标缺少html: {entry!r}")
+        html_path = os.path.normpath(os.path.join(base_dir, entry['html']))
+        shape = entry.get('shape', SHAPE_FLAT)
+        if shape not in SHAPES:
+            raise TargetError(f"{entry['html']}: 未知的数据格式 {shape}（可选 {', '.join(SHAPES)}）")
+        if html_path in seen:
+            raise TargetError(f"页面重复: {entry['html']}")
+        try:
+            with open(html_path, 'r', encoding='utf-8') as f:
+                slots = find_slots(f.read())
+        except OSError as e:
+            raise TargetError(f"读取页面失败: {e}")
+
+        # 只有带分片清单插槽的页面使用data目录
+        data_dir = None
+        if 'navigationManifest' in slots:
+            data_dir = os.path.join(os.path.dirname(html_path), DEFAULT_DATA_DIR)
+            for other in targets:
+                if other['data_dir'] == data_dir:
+                    raise TargetError(f"{entry['html']} 与 {os.path.basename(other['html'])} 写入同一个data目录")
+        seen[html_path] = True
+        targets.append({"html": html_path, "shape": shape,
+                        "inline": bool(entry.get('inline', False)), "data_dir": data_dir})
+    if not targets:
+        raise TargetError("目标清单中没有页面")
+    return targets
+
+
+def render_target(target, js_data, cache_dir, quiet=False):
+    """
+    写出一个目标页面（在工作进程中运行）
+
+    参数:
+        target: load_targets返回的目标
+        js_data: 该目标数据格式的序列化结果
+        cache_dir: 图标缓存所在的目录（只读，不联网获取图标）
+        quiet: 安静模式
+
+    返回:
+        (是否成功, 耗时秒数, 输出文本)
+    """
+    output = io.StringIO()
+    started = time.perf_counter()
+    # 各进程的输出先收集起来，由主进程按目标依次输出，避免相互穿插
+    with contextlib.redirect_stdout(output), Instrumentation(quiet=quiet).activate():
+        try:
+            if target['data_dir']:
+                icon_cache = IconCache(os.path.join(cache_dir, '.icon_cache'))
+                ok = write_page(json_codec.loads(js_data), target['html'], icon_cache,
+                                target['inline'], js_data=js_data) is not None
+            else:
+                ok = update_html_file(target['html'], None, js_data)
+        except OSError as e:
+            print(f"❌ 写出失败: {e}")
+            ok = False
+    return ok, time.perf_counter() - started, output.getvalue()
+
+
+def build_shapes(tree, shapes, link_cache_path=None, dedupe=True):
+    """
+    按需生成各数据格式并序列化（每种格式只生成一次）
+
+    返回:
+        dict: {格式: 序列化结果}；展开格式的数据为空时返回None
+    """
+    results = {}
+    if SHAPE_FLAT in shapes:
+        navigation_data = navigation_data_from_tree(tree, link_cache_path, dedupe)
+        if navigation_data is None:
+            return None
+        with span('serialize'):
+            results[SHAPE_FLAT] = serialize_navigation_data(navigation_data)
+    if SHAPE_THREE_LEVEL in shapes:
+        with span('convert_three_level'):
+            navigation_data = convert_three_level(tree)
+        with span('serialize'):
+            results[SHAPE_THREE_LEVEL] = serialize_navigation_data(navigation_data)
+    return results
+
+
+def main(pintree_json_path, targets_path=DEFAULT_TARGETS, cache_dir=ROOT_DIR,
+         workers=None, dedupe=True, quiet=False):
+    """
+    读取一次书签，按目标清单更新全部页面
+
+    参数:
+        pintree_json_path: 书签文件
+        targets_path: 目标清单
+        cache_dir: 图标缓存和链接检查结果所在的目录
+        workers: 并行写出页面的进程数（默认为CPU核数，1表示在当前进程中依次写出）
+        dedupe: 是否合并展开格式中的重复链接
+        quiet: 安静模式（传给各工作进程）
+
+    返回:
+        int: 退出码（0 成功，1 失败）
+    """
+    try:
+        targets = load_targets(targets_path)
+    except TargetError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+
+    print(f"正在读取书签: {pintree_json_path}")
+    try:
+        with span('load'):
+            tree = BookmarkTree.load(pintree_json_path)
+    except Exception as e:
+        print(f"读取pintree.json文件失败: {e}")
+        return 1
+    count('nodes', len(tree))
+
+    shapes = build_shapes(tree, {target['shape'] for target in targets},
+                          os.path.join(cache_dir, LINK_CACHE_NAME), dedupe)
+    if shapes is None:
+        return 1
+    # 转换完成后不再需要书签树
+    del tree
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, len(targets)))
+    print(f"正在写出 {len(targets)} 个页面（{workers} 个进程）...")
+    with span('render'):
+        if workers == 1:
+            results = [render_target(target, shapes[target['shape']], cache_dir, quiet) for target in targets]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(render_target, target, shapes[target['shape']], cache_dir, quiet)
+                           for target in targets]
+                results = [future.result() for future in futures]
+
+    failed = 0
+    for target, (ok, elapsed, output) in zip(targets, results):
+        print(f"--- {os.path.relpath(target['html'])}（{target['shape']}，{elapsed * 1000:.0f} ms）")
+        sys.stdout.write(output)
+        if not ok:
+            failed += 1
+    if failed:
+        print(f"❌ {failed} 个页面更新失败")
+        return 1
+    print(f"✅ 已更新 {len(targets)} 个页面")
+    return 0
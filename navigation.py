@@ -0,0 +1,444 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+导航页面命令行工具
+
+功能：把生成页面、分析书签、提取数据和检查链接统一到一个非交互的命令中，
+所有路径都通过参数指定，执行结果通过退出码返回，便于在脚本和自动化流程中批量调用。
+各子命令用到的模块在执行时才导入，只查看帮助或运行轻量命令时不会加载其他模块。
+
+使用方法：
+    python navigation.py build [--input pintree.json] [--html index.html] [--dist [dist]] [--quiet] [--report report.json]
+    python navigation.py build-all [--input pintree.json] [--targets build_targets.json] [--workers 4]
+    python navigation.py analyze [pintree.json]
+    python navigation.py stats [--input pintree.json] [-o report.json | -o report.csv] [--top 20]
+    python navigation.py extract [pintree.json] [-o navigation.json | --html static_navigation.html]
+    python navigation.py check [--input pintree.json] [--fail-on-dead]
+    python navigation.py watch [--input pintree.json] [--html index.html] [--poll]
+    python navigation.py sync [--input pintree.json] [--db bookmarks.db]
+    python navigation.py query 关键词 [--domain github.com] [--since 2024-01-01] [--limit 20] [--json]
+    python navigation.py merge export.json [bookmarks.html ...] [--into pintree.json]
+    python navigation.py generate synthetic.json [--links 100000] [--depth 20]
+    python navigation.py bench [--links 10000 100000] [-o bench.json] [--compare old.json] [--json-backend json]
+
+退出码：0 成功，1 执行失败，2 参数错误或（check --fail-on-dead）发现失效链接
+"""
+
+import argparse
+import importlib.util
+import os
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+ARCH_DIR = os.path.join(ROOT_DIR, 'arch')
+
+# 退出码
+EXIT_OK = 0
+EXIT_FAILED = 1
+
+
+def _default_input():
+    """
+    默认的书签文件：脚本所在目录的pintree.json，其次是pintree.json.gz
+    """
+    path = os.path.join(ROOT_DIR, 'pintree.json')
+    if not os.path.exists(path) and os.path.exists(path + '.gz'):
+        path += '.gz'
+    return path
+
+
+def _load_arch_module(name):
+    """
+    按文件路径导入arch目录中的旧版脚本（arch不是Python包）
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.spec_from_file_location(name, os.path.join(ARCH_DIR, f'{name}.py'))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def _check_input(path):
+    if not os.path.exists(path):
+        print(f"❌ 文件不存在: {path}", file=sys.stderr)
+        return False
+    return True
+
+
+def cmd_build(args):
+    """
+    生成导航页面数据并更新页面
+    """
+    if not _check_input(args.input):
+        return EXIT_FAILED
+    import update_static_data
+    from instrumentation import Instrumentation
+    instrumentation = Instrumentation(quiet=args.quiet, trace_memory=args.trace_memory, profile_path=args.profile)
+    with instrumentation.activate(), instrumentation.span('build'):
+        status = update_static_data.main(
+            pintree_json_path=args.input,
+            html_file_path=args.html,
+            cache_dir=args.cache_dir,
+            use_cache=not args.no_cache,
+            inline=args.inline,
+            fetch_icons=args.fetch_icons,
+            dedupe=not args.keep_duplicates,
+        )
+        if status == EXIT_OK and args.dist:
+            import dist_build
+            with instrumentation.span('dist'):
+                status = dist_build.main(args.html, args.dist)
+
+    if args.report:
+        instrumentation.write_report(args.report)
+        print(f"性能报告已保存: {args.report}")
+    if args.timings:
+        print(instrumentation.summary())
+    if args.profile:
+        print(f"cProfile结果已保存: {args.profile}（可用 python -m pstats 查看）")
+    return status
+
+
+def cmd_build_all(args):
+    """
+    读取一次书签，按目标清单并行更新多个页面
+    """
+    if not _check_input(args.input):
+        return EXIT_FAILED
+    import multi_build
+    from instrumentation import Instrumentation
+    instrumentation = Instrumentation(quiet=args.quiet)
+    with instrumentation.activate(), instrumentation.span('build'):
+        status = multi_build.main(
+            args.input,
+            targets_path=args.targets,
+            cache_dir=args.cache_dir,
+            workers=args.workers,
+            dedupe=not args.keep_duplicates,
+            quiet=args.quiet,
+        )
+    if args.timings:
+        print(instrumentation.summary())
+    return status
+
+
+def cmd_analyze(args):
+    """
+    输出书签的层次结构和统计信息
+    """
+    if not _check_input(args.input):
+        return EXIT_FAILED
+    analyze_bookmarks = _load_arch_module('analyze_bookmarks')
+    return EXIT_OK if analyze_bookmarks.analyze_json_file(args.input) else EXIT_FAILED
+
+
+def cmd_stats(args):
+    """
+    统计每月新增、常见域名、文件夹大小和过期链接
+    """
+    if not _check_input(args.input):
+        return EXIT_FAILED
+    import bookmark_stats
+    return bookmark_stats.main(args.input, output=args.output, top=args.top,
+                               stale_days=args.stale_days, cache_dir=args.cache_dir)
+
+
+def cmd_extract(args):
+    """
+    按 分类 -> 子分类 -> 链接 三级结构提取导航数据
+    """
+    if not _check_input(args.input):
+        return EXIT_FAILED
+    extract_json = _load_arch_module('extract_json')
+    navigation_data = extract_json.extract_navigation_data(args.input)
+    if not navigation_data:
+        print("❌ 未找到有效数据", file=sys.stderr)
+        return EXIT_FAILED
+
+    if args.html:
+        js_data = extract_json.generate_js_data(navigation_data)
+        return EXIT_OK if extract_json.update_static_html(js_data, args.html) else EXIT_FAILED
+
+    import json_codec
+    text = json_codec.dumps(navigation_data, pretty=True)
+    if args.output and args.output != '-':
+        from html_splice import atomic_write
+        atomic_write(args.output, text + '\n')
+        print(f"已写入 {args.output}（{len(navigation_data)} 个分类）")
+    else:
+        sys.stdout.write(text + '\n')
+    return EXIT_OK
+
+
+def cmd_check(args):
+    """
+    检查书签中的链接是否仍然有效
+    """
+    if not _check_input(args.input):
+        return EXIT_FAILED
+    import link_checker
+    return link_checker.main(
+        pintree_path=args.input,
+        cache_path=os.path.join(args.cache_dir, link_checker.DEFAULT_CACHE_NAME),
+        concurrency=args.concurrency,
+        timeout=args.timeout,
+        ttl=args.ttl,
+        fail_on_dead=args.fail_on_dead,
+    )
+
+
+def cmd_watch(args):
+    """
+    监视书签文件，变化时增量重建
+    """
+    import watch_mode
+    from instrumentation import Instrumentation
+    with Instrumentation(quiet=args.quiet).activate():
+        return watch_mode.run_watch(
+            args.input,
+            args.html,
+            args.cache_dir,
+            inline=args.inline,
+            dedupe=not args.keep_duplicates,
+            poll=args.poll,
+            interval=args.interval,
+            debounce=args.debounce,
+        )
+
+
+def cmd_sync(args):
+    """
+    把书签增量同步到本地SQLite数据库
+    """
+    if not _check_input(args.input):
+        return EXIT_FAILED
+    import bookmark_store
+    return bookmark_store.main_sync(args.db, args.input, force=args.force)
+
+
+def cmd_query(args):
+    """
+    在本地书签数据库中查找链接
+    """
+    import bookmark_store
+    return bookmark_store.main_query(args.db, ' '.join(args.keywords), limit=args.limit,
+                                     domain=args.domain, since=args.since, as_json=args.json)
+
+
+def _parse_date(text):
+    """
+    解析 YYYY-MM-DD 格式的日期参数
+    """
+    from datetime import datetime
+    try:
+        return datetime.strptime(text, '%Y-%m-%d')
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"日期格式应为 YYYY-MM-DD: {text}")
+
+
+def cmd_merge(args):
+    """
+    把导出文件增量合并到主书签
+    """
+    for path in args.exports:
+        if not _check_input(path):
+            return EXIT_FAILED
+    import bookmark_merge
+    return bookmark_merge.main(args.into, args.exports, args.source)
+
+
+def cmd_generate(args):
+    """
+    生成合成书签文件
+    """
+    import synthetic_tree
+    counts = synthetic_tree.write_synthetic_tree(
+        args.output,
+        links=args.links,
+        width=args.width,
+        depth=args.depth,
+        cjk_ratio=args.cjk_ratio,
+        duplicate_rate=args.duplicate_rate,
+        seed=args.seed,
+    )
+    print(f"已生成 {args.output}（{counts['folders']} 个文件夹，{counts['links']} 个链接）")
+    return EXIT_OK
+
+
+def cmd_bench(args):
+    """
+    用合成书签测量转换流程各阶段的性能
+    """
+    import benchmark
+    return benchmark.main(
+        sizes=args.links,
+        output=args.output,
+        compare=args.compare,
+        json_backend=args.json_backend,
+        width=args.width,
+        depth=args.depth,
+        cjk_ratio=args.cjk_ratio,
+        duplicate_rate=args.duplicate_rate,
+        seed=args.seed,
+        repeat=args.repeat,
+        memory=not args.no_memory,
+    )
+
+
+def _add_synthetic_arguments(parser):
+    """
+    合成书签的参数（generate和bench共用，默认值与synthetic_tree中的一致）
+    """
+    parser.add_argument('--width', type=int, default=8, help='每个文件夹最多包含的子文件夹数')
+    parser.add_argument('--depth', type=int, default=4, help='文件夹的最大嵌套深度')
+    parser.add_argument('--cjk-ratio', type=float, default=0.5, help='中文标题的比例（0~1）')
+    parser.add_argument('--duplicate-rate', type=float, default=0.05, help='重复链接的比例（0~1）')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子，相同的参数和种子生成相同的文件')
+
+
+def build_parser():
+    """
+    构建命令行参数解析器（只用到标准库，不导入各子命令的模块）
+    """
+    parser = argparse.ArgumentParser(prog='navigation', description='静态导航页面工具')
+    subparsers = parser.add_subparsers(dest='command', metavar='<command>')
+    subparsers.required = True
+
+    build = subparsers.add_parser('build', help='生成数据并更新导航页面')
+    build.add_argument('-i', '--input', default=_default_input(),
+                       help='书签文件（pintree导出的.json/.json.gz，或浏览器导出的书签HTML）')
+    build.add_argument('--html', default=os.path.join(ROOT_DIR, 'index.html'),
+                       help='要更新的页面，数据写入页面旁边的data目录')
+    build.add_argument('--cache-dir', default=ROOT_DIR, help='构建缓存、图标缓存和链接检查结果所在的目录')
+    build.add_argument('--no-cache', action='store_true', help='忽略构建缓存，完整重新生成')
+    build.add_argument('--inline', action='store_true', help='把完整数据内嵌到页面中，不写分片')
+    build.add_argument('--fetch-icons', action='store_true', help='联网获取缺少的网站图标')
+    build.add_argument('--keep-duplicates', action='store_true', help='保留重复收藏的链接')
+    build.add_argument('--dist', nargs='?', const=os.path.join(ROOT_DIR, 'dist'), metavar='DIR',
+                       help='生成后再输出压缩、带内容哈希和gzip预压缩文件的发布目录（默认dist）')
+    build.add_argument('-q', '--quiet', action='store_true', help='安静模式，不输出调试信息')
+    build.add_argument('--timings', action='store_true', help='结束后输出各阶段的耗时')
+    build.add_argument('--report', metavar='FILE', help='把各阶段的耗时、内存峰值和计数保存为JSON报告')
+    build.add_argument('--trace-memory', action='store_true', help='用tracemalloc记录各阶段的内存峰值（构建会变慢）')
+    build.add_argument('--profile', metavar='FILE', help='用cProfile记录函数级耗时并保存到该文件')
+    build.set_defaults(handler=cmd_build)
+
+    build_all = subparsers.add_parser('build-all', help='读取一次书签，按目标清单并行更新多个页面')
+    build_all.add_argument('-i', '--input', default=_default_input(), help='书签文件')
+    build_all.add_argument('--targets', default=os.path.join(ROOT_DIR, 'build_targets.json'),
+                           help='目标清单：各页面的路径和数据格式（flat/three-level）')
+    build_all.add_argument('--cache-dir', default=ROOT_DIR, help='图标缓存和链接检查结果所在的目录')
+    build_all.add_argument('--workers', type=int, help='并行写出页面的进程数（默认为CPU核数）')
+    build_all.add_argument('--keep-duplicates', action='store_true', help='保留重复收藏的链接')
+    build_all.add_argument('-q', '--quiet', action='store_true', help='安静模式，不输出调试信息')
+    build_all.add_argument('--timings', action='store_true', help='结束后输出各阶段的耗时')
+    build_all.set_defaults(handler=cmd_build_all)
+
+    analyze = subparsers.add_parser('analyze', help='分析书签的层次结构')
+    analyze.add_argument('input', nargs='?', default=_default_input(), help='书签文件')
+    analyze.set_defaults(handler=cmd_analyze)
+
+    # 默认值与bookmark_stats中的一致，这里不导入该模块
+    stats = subparsers.add_parser('stats', help='统计每月新增、常见域名、文件夹大小和过期链接')
+    stats.add_argument('-i', '--input', default=_default_input(), help='书签文件')
+    stats.add_argument('-o', '--output', help='报告文件（.json或.csv，-表示向标准输出写JSON），不指定时在终端输出摘要')
+    stats.add_argument('--top', type=int, default=20, help='常见域名、最大文件夹等列表的长度')
+    stats.add_argument('--stale-days', type=int, default=3 * 365, help='添加时间早于这么多天的链接算作过期')
+    stats.add_argument('--cache-dir', default=ROOT_DIR, help='链接检查结果所在的目录（失效的链接也算作过期）')
+    stats.set_defaults(handler=cmd_stats)
+
+    extract = subparsers.add_parser('extract', help='按三级分类提取导航数据')
+    extract.add_argument('input', nargs='?', default=_default_input(), help='书签文件')
+    target = extract.add_mutually_exclusive_group()
+    target.add_argument('-o', '--output', help='输出JSON文件（默认输出到标准输出）')
+    target.add_argument('--html', help='把数据写入该页面的navigationData')
+    extract.set_defaults(handler=cmd_extract)
+
+    check = subparsers.add_parser('check', help='检查链接是否有效')
+    check.add_argument('-i', '--input', default=_default_input(), help='书签文件')
+    check.add_argument('--cache-dir', default=ROOT_DIR, help='检查结果缓存所在的目录（build读取同一位置）')
+    # 默认值与link_checker中的一致，这里不导入该模块
+    check.add_argument('--concurrency', type=int, default=32, help='最大并发连接数')
+    check.add_argument('--timeout', type=float, default=15, help='单次请求的超时时间（秒）')
+    check.add_argument('--ttl', type=int, default=24 * 3600, help='检查结果的有效期（秒）')
+    check.add_argument('--fail-on-dead', action='store_true', help='发现失效链接时以退出码2结束')
+    check.set_defaults(handler=cmd_check)
+
+    watch = subparsers.add_parser('watch', help='监视书签文件，变化时自动增量重建')
+    watch.add_argument('-i', '--input', default=_default_input(), help='书签文件')
+    watch.add_argument('--html', default=os.path.join(ROOT_DIR, 'index.html'),
+                       help='要更新的页面，数据写入页面旁边的data目录')
+    watch.add_argument('--cache-dir', default=ROOT_DIR, help='图标缓存和链接检查结果所在的目录')
+    watch.add_argument('--inline', action='store_true', help='把完整数据内嵌到页面中，不写分片')
+    watch.add_argument('--keep-duplicates', action='store_true', help='保留重复收藏的链接')
+    watch.add_argument('--poll', action='store_true', help='不使用inotify，定时检查文件')
+    watch.add_argument('-q', '--quiet', action='store_true', help='安静模式，不输出调试信息')
+    # 默认值与watch_mode中的一致，这里不导入该模块
+    watch.add_argument('--interval', type=float, default=0.25, help='轮询间隔（秒）')
+    watch.add_argument('--debounce', type=float, default=0.1, help='最后一次写入后等待多久再重建（秒）')
+    watch.set_defaults(handler=cmd_watch)
+
+    # 默认值与bookmark_store中的一致，这里不导入该模块
+    sync = subparsers.add_parser('sync', help='把书签增量同步到本地SQLite数据库，供query查询')
+    sync.add_argument('-i', '--input', default=_default_input(), help='书签文件')
+    sync.add_argument('--db', default=os.path.join(ROOT_DIR, 'bookmarks.db'), help='数据库文件')
+    sync.add_argument('--force', action='store_true', help='书签文件未变化时也重新比较同步')
+    sync.set_defaults(handler=cmd_sync)
+
+    query = subparsers.add_parser('query', help='按关键词查找链接收藏在哪个文件夹')
+    query.add_argument('keywords', nargs='*', help='关键词（为空时按添加时间列出）')
+    query.add_argument('--db', default=os.path.join(ROOT_DIR, 'bookmarks.db'), help='数据库文件')
+    query.add_argument('--domain', help='只列出该域名的链接')
+    query.add_argument('--since', type=_parse_date, help='只列出该日期之后添加的链接（YYYY-MM-DD）')
+    query.add_argument('-n', '--limit', type=int, default=20, help='最多列出的结果数')
+    query.add_argument('--json', action='store_true', help='以JSON格式输出')
+    query.set_defaults(handler=cmd_query)
+
+    merge = subparsers.add_parser('merge', help='把其他电脑的书签导出增量合并到主书签')
+    merge.add_argument('exports', nargs='+', help='导出文件（pintree JSON或浏览器书签HTML）')
+    merge.add_argument('--into', default=os.path.join(ROOT_DIR, 'pintree.json'), help='主书签文件（不存在时新建）')
+    merge.add_argument('--source', help='来源名称，用于记录各自的合并水位线（默认使用导出文件名）')
+    merge.set_defaults(handler=cmd_merge)
+
+    generate = subparsers.add_parser('generate', help='生成用于测试的合成书签文件')
+    generate.add_argument('output', help='输出文件（.json，以.gz结尾时压缩）')
+    generate.add_argument('--links', type=int, default=10000, help='链接数量')
+    _add_synthetic_arguments(generate)
+    generate.set_defaults(handler=cmd_generate)
+
+    bench = subparsers.add_parser('bench', help='用合成书签测量转换流程各阶段的耗时和内存')
+    bench.add_argument('--links', type=int, nargs='+', default=[10000, 100000], help='要测量的链接数量（可以多个）')
+    _add_synthetic_arguments(bench)
+    bench.add_argument('--repeat', type=int, default=1, help='每个阶段计时运行的次数（取最短时间）')
+    bench.add_argument('--no-memory', action='store_true', help='不测量峰值内存（省去额外的一次运行）')
+    bench.add_argument('-o', '--output', help='保存结果的JSON文件')
+    bench.add_argument('--compare', help='与之前保存的结果对比')
+    bench.add_argument('--json-backend', choices=['orjson', 'json'],
+                       help='使用的JSON后端（默认有orjson时使用orjson），用于比较两者的读写耗时')
+    bench.set_defaults(handler=cmd_bench)
+
+    return parser
+
+
+def main(argv=None):
+    """
+    主函数
+
+    参数:
+        argv: 命令行参数（默认使用sys.argv）
+
+    返回:
+        int: 退出码
+    """
+    args = build_parser().parse_args(argv)
+    try:
+        return args.handler(args)
+    except KeyboardInterrupt:
+        print("已中断", file=sys.stderr)
+        return 130
+
+
+if __name__ == '__main__':
+    sys.exit(main())
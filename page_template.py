@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+页面模板模块
+
+功能：把带插槽标记的页面（见html_splice）编译为模板：固定内容切分为若干段，插槽之间按名称填入数据。
+编译结果按文件缓存，同一页面反复生成时（watch模式、多页面构建、基准测试）只在页面被外部修改后才重新编译。
+
+渲染时依次把固定内容和各插槽的值写入临时文件再重命名，不拼接整个页面的字符串；
+插槽的值可以是字符串，也可以是逐段产生字符串的迭代器（例如json的iterencode），数据边序列化边写出。
+"""
+
+import contextlib
+import os
+
+from html_splice import SpliceError, add_legacy_slots, find_slots
+
+# 编译结果缓存：文件绝对路径 -> (文件状态, PageTemplate)
+_cache = {}
+
+
+class PageTemplate:
+    """
+    编译后的页面模板
+
+    参数:
+        content: 带插槽标记的页面内容
+    """
+
+    def __init__(self, content):
+        slots = find_slots(content)
+        # 保持页面原有的换行风格
+        self.newline = '\r\n' if '\r\n' in content[:4096] else '\n'
+        # 固定内容：literals[i]之后是第i个插槽（共len(literals) - 1个插槽）
+        self.literals = []
+        # 插槽名称和模板中的原有内容（渲染时未提供值的插槽保持原样）
+        self.slots = []
+        self.defaults = {}
+        pos = 0
+        for name, (start, end) in sorted(slots.items(), key=lambda item: item[1]):
+            self.literals.append(content[pos:start])
+            self.slots.append(name)
+            self.defaults[name] = content[start:end]
+            pos = end
+        self.literals.append(content[pos:])
+
+    def __contains__(self, name):
+        return name in self.defaults
+
+    def _chunks(self, value):
+        """
+        把插槽的值转换为逐段写出的字符串（按页面的换行风格）
+        """
+        chunks = (value,) if isinstance(value, str) else value
+        if self.newline == '\n':
+            return chunks
+        return (chunk.replace('\n', self.newline) for chunk in chunks)
+
+    def render(self, fp, values):
+        """
+        把页面写入文本文件对象
+
+        参数:
+            fp: 以newline=''打开的文本文件对象
+            values: 插槽名称 -> 新内容（字符串或字符串迭代器），未列出的插槽保持模板中的内容
+
+        返回:
+            dict: 本次写出的各插槽的内容（只包含字符串的值，迭代器的值写出后不保留）
+        """
+        missing = [name for name in values if name not in self.defaults]
+        if missing:
+            raise SpliceError(f"页面中缺少插槽: {', '.join(missing)}")
+
+        written = {}
+        write = fp.write
+        for literal, name in zip(self.literals, self.slots):
+            write(literal)
+            if name not in values:
+                # 模板中的原有内容已经是页面的换行风格
+                write(self.defaults[name])
+                continue
+            value = values[name]
+            for chunk in self._chunks(value):
+                write(chunk)
+            if isinstance(value, str):
+                written[name] = value
+        write(self.literals[-1])
+        return written
+
+    def render_file(self, path, values):
+        """
+        渲染到文件：先写入同目录下的临时文件再重命名
+
+        写出后更新编译缓存，下次渲染同一文件时不需要重新读取和编译。
+        """
+        tmp_path = f'{path}.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+                written = self.render(f, values)
+        except BaseException:
+            # 渲染中途失败时不留下不完整的临时文件，原页面保持不变；
+            # 临时文件可能未能创建，此时不能让删除失败掩盖原来的异常
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(tmp_path)
+            raise
+        os.replace(tmp_path, path)
+
+        # 新文件的固定内容与模板相同；以迭代器写出的插槽内容未保留，之后必须提供新值
+        rendered = PageTemplate.__new__(PageTemplate)
+        rendered.newline = self.newline
+        rendered.literals = self.literals
+        rendered.slots = self.slots
+        rendered.defaults = dict(self.defaults)
+        for name in values:
+            rendered.defaults[name] = (written[name].replace('\n', self.newline)
+                                       if name in written else None)
+        _cache[os.path.abspath(path)] = (_file_state(path), rendered)
+
+    def complete(self, values):
+        """
+        values是否能与模板合成完整页面（没有原有内容未知的插槽被遗漏）
+        """
+        return all(name in values for name, default in self.defaults.items() if default is None)
+
+
+def _file_state(path):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def load_template(path, legacy_slots=False):
+    """
+    读取并编译页面模板（文件未变化时使用缓存的编译结果）
+
+    参数:
+        path: 页面文件
+        legacy_slots: 页面中没有navigationData插槽时，是否按旧版页面的格式补上插槽（见html_splice）
+
+    返回:
+        PageTemplate
+    """
+    key = os.path.abspath(path)
+    state = _file_state(path)
+    cached = _cache.get(key)
+    if cached and cached[0] == state:
+        return cached[1]
+
+    # 保留原有换行符
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        content = f.read()
+    template = PageTemplate(content)
+    if legacy_slots and 'navigationData' not in template:
+        template = PageTemplate(add_legacy_slots(content))
+    _cache[key] = (state, template)
+    return template
+
+
+def render_page(path, values, legacy_slots=False):
+    """
+    用页面自身作为模板，填入插槽的值后写回
+
+    参数:
+        path: 页面文件
+        values: 插槽名称 -> 新内容（字符串或字符串迭代器）
+        legacy_slots: 同load_template
+    """
+    template = load_template(path, legacy_slots)
+    if not template.complete(values):
+        # 缓存的模板中有以迭代器写出、内容未知的插槽，而这次没有提供新值：从文件重新编译
+        _cache.pop(os.path.abspath(path), None)
+        template = load_template(path, legacy_slots)
+    template.render_file(path, values)
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+首屏预渲染模块
+
+功能：在构建时生成默认分类（第一个分类及其第一个子分类）的页面标记，写入页面的prerender插槽，
+浏览器不执行脚本也能直接显示首屏的分类标签和链接卡片；脚本启动后沿用这些标记，只绑定事件。
+
+生成的标记与页面脚本中renderContent/createLinkCard生成的结构一致，
+标题、URL等内容都经过HTML转义。
+"""
+
+import html
+
+import json_codec
+from search_index import link_hostname
+
+# 页面中没有数据时prerender插槽的默认内容（与index.html中的初始标记相同）
+EMPTY_MARKUP = '<div class="category-tabs"></div><div class="category-content"></div>'
+
+
+def escape(text):
+    """
+    HTML转义；同时转义“/*”，避免标题中的内容被误认为插槽标记（见html_splice）
+    """
+    return html.escape(text).replace('/*', '/&#42;')
+
+
+def load_icon_table(path):
+    """
+    读取图标表（见favicon_bundle），文件不存在或格式错误时返回空表
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            table = json_codec.load(f)
+        return {"icons": table["icons"], "hosts": table["hosts"]}
+    except (OSError, ValueError, KeyError, TypeError):
+        return {"icons": [], "hosts": {}}
+
+
+def _display_domain(url, host):
+    """
+    卡片上显示的域名：无法解析主机名时显示URL的前30个字符
+    """
+    if host:
+        return host
+    return url[:30] + '...' if len(url) > 30 else url
+
+
+def render_link_card(link, icon_table):
+    """
+    生成一张链接卡片的标记
+
+    参数:
+        link: 链接数据 {"title", "url", "host", "icon", "status", "redirect"}
+        icon_table: 图标表 {"icons": [...], "hosts": {主机名: 图标序号}}
+
+    返回:
+        str: 卡片的HTML
+    """
+    url = link.get('url') or ''
+    host = link_hostname(link)
+    domain = _display_domain(url, host)
+
+    # 使用构建时打包的图标，未打包的网站使用转换时解析的emoji图标，不请求任何远程地址
+    position = icon_table["hosts"].get(host) if host else None
+    if position is not None:
+        icon = (f'<img src="{escape(icon_table["icons"][position])}" alt="{escape(domain)}" loading="lazy" '
+                f'onerror="this.onerror=null; this.src=\'\';">')
+    else:
+        icon = escape(link.get('icon') or '🔗')
+
+    classes = 'link-card link-dead' if link.get('status') == 'dead' else 'link-card'
+    attrs = ''
+    if link.get('status') == 'dead':
+        attrs = ' title="该链接已失效"'
+    elif link.get('redirect'):
+        attrs = f' title="已跳转至 {escape(link["redirect"])}"'
+
+    return (f'<div class="{classes}" data-url="{escape(url)}"{attrs}>'
+            f'<div class="link-card-header"><div class="link-icon">{icon}</div>'
+            f'<div class="link-title">{escape(link.get("title") or "")}</div></div>'
+            f'<div class="link-url">{escape(url)}</div></div>')
+
+
+def render_first_category(navigation_data, icon_table):
+    """
+    生成prerender插槽的内容：全部分类标签，以及第一个分类的子分类导航和第一个子分类的链接卡片
+
+    参数:
+        navigation_data: 转换后的导航数据（分类顺序与分片清单一致）
+        icon_table: 图标表
+
+    返回:
+        str: 插槽内容的HTML
+    """
+    if not navigation_data:
+        return EMPTY_MARKUP
+
+    categories = list(navigation_data)
+    parts = ['<div class="category-tabs">']
+    for i, category in enumerate(categories):
+        active = ' active' if i == 0 else ''
+        parts.append(f'<a href="#" class="category-tab{active}">{escape(category)}</a>')
+    parts.append('</div>')
+
+    subcategories = navigation_data[categories[0]]
+    parts.append('<div class="content-wrapper"><div class="subcategory-nav">')
+    for i, subcategory in enumerate(subcategories):
+        active = ' active' if i == 0 else ''
+        parts.append(f'<div class="subcategory-tab{active}">{escape(subcategory)}</div>')
+    parts.append('</div><div class="category-content">')
+    if subcategories:
+        subcategory, links = next(iter(subcategories.items()))
+        parts.append(f'<h3 class="subcategory-title">{escape(subcategory)}</h3><div class="links-grid">')
+        parts.extend(render_link_card(link, icon_table) for link in links)
+        parts.append('</div>')
+    parts.append('</div></div>')
+    return ''.join(parts)
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+搜索索引生成模块
+
+功能：在构建时为所有链接的标题、域名和所属分类路径生成倒排索引，
+页面搜索时只需二分查找词表并合并整数链接编号，无需遍历全部导航数据。
+
+分词规则（页面中的tokenize函数与此保持一致）：
+    - 文本先做NFKC规范化并转为小写
+    - 连续的拉丁字母/数字作为一个词
+    - 连续的中日韩文字切成二元组（bigram），并额外收录最后一个字，
+      使单字前缀查询也能命中所有位置
+
+索引格式：
+    categories  顶级分类名称列表
+    docs        [标题, URL, 分类序号, 子分类, 图标] 列表，下标即链接编号；图标是转换时解析的emoji，
+                搜索结果中没有打包图标的网站显示它
+    terms       按码点排序的词表，支持前缀查找
+    postings    与terms对应的链接编号列表（差分编码）
+    prefixes         能展开为超过PREFIX_TABLE_MIN_TERMS个词的前缀（按码点排序）
+    prefix_postings  与prefixes对应的合并后的链接编号列表（差分编码）
+
+前缀查询：单个字母、常见的首字等短前缀可能匹配成千上万个词，逐个展开太慢。
+这些前缀的结果在构建时合并好，页面直接使用；其余前缀展开的词数都不超过PREFIX_TABLE_MIN_TERMS，
+页面逐个展开，结果总是完整的。
+"""
+
+import os
+import re
+import unicodedata
+from urllib.parse import urlsplit
+
+from data_shards import write_if_changed
+import json_codec
+
+INDEX_VERSION = 3
+INDEX_NAME = 'search-index.json'
+
+# 前缀展开的词数超过该值时，在构建时预先合并该前缀的链接编号
+PREFIX_TABLE_MIN_TERMS = 64
+
+# 只包含基本多文种平面内的字符，保证Python与JavaScript的字符串排序一致
+_TOKEN = re.compile(
+    r'[a-z0-9]+|[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af]+'
+)
+
+
+def tokenize(text, index_mode=False):
+    """
+    把文本切分为检索词
+
+    参数:
+        text: 待切分的文本
+        index_mode: 是否为建索引切分（额外收录中日韩文字段的最后一个字）
+
+    返回:
+        list: 检索词列表
+    """
+    tokens = []
+    if not text:
+        return tokens
+    for run in _TOKEN.findall(unicodedata.normalize('NFKC', text).lower()):
+        if run[0] < '\u0080' or len(run) == 1:
+            tokens.append(run)
+            continue
+        tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        if index_mode:
+            tokens.append(run[-1])
+    return tokens
+
+
+def url_hostname(url):
+    """
+    提取URL中的主机名，缺少协议前缀时按https处理
+    """
+    if not url:
+        return ''
+    if '://' not in url:
+        url = 'https://' + url
+    try:
+        return urlsplit(url).hostname or ''
+    except ValueError:
+        return ''
+
+
+def link_hostname(link):
+    """
+    链接的主机名：优先使用转换时写入的host字段，没有时从URL提取
+    """
+    host = link.get('host')
+    return url_hostname(link.get('url')) if host is None else host
+
+
+def _delta_encode(ids):
+    # 链接编号按添加顺序递增，差分后数字更短
+    return [ids[0]] + [current - previous for previous, current in zip(ids, ids[1:])]
+
+
+def build_prefix_table(terms, postings, min_terms=PREFIX_TABLE_MIN_TERMS):
+    """
+    找出展开后超过min_terms个词的前缀，并合并它们的链接编号
+
+    前缀越长匹配的词越少：某一长度下没有前缀超过上限时，更长的前缀也不会超过，到此为止。
+
+    参数:
+        terms: 有序词表
+        postings: {词: 有序的链接编号列表}
+        min_terms: 需要预先合并的最少词数
+
+    返回:
+        dict: {前缀: 有序的链接编号列表}
+    """
+    table = {}
+    # 词表有序，同一前缀的词相邻；只在上一长度超限的区间里继续找更长的前缀
+    ranges = [(0, len(terms))]
+    length = 1
+    while ranges:
+        heavy_ranges = []
+        for start, end in ranges:
+            i = start
+            while i < end:
+                if len(terms[i]) < length:
+                    i += 1
+                    continue
+                prefix = terms[i][:length]
+                j = i + 1
+                while j < end and terms[j].startswith(prefix):
+                    j += 1
+                if j - i > min_terms:
+                    ids = set()
+                    for term in terms[i:j]:
+                        ids.update(postings[term])
+                    table[prefix] = sorted(ids)
+                    heavy_ranges.append((i, j))
+                i = j
+        ranges = heavy_ranges
+        length += 1
+    return table
+
+
+def build_search_index(navigation_data, memo=None):
+    """
+    生成导航数据的倒排索引
+
+    参数:
+        navigation_data: 转换后的导航数据
+        memo: 可选的缓存字典 {(标题, 网址): 词元组}，多次生成索引时传入同一个字典可跳过未变链接的分词
+
+    返回:
+        dict: 索引数据（格式见模块说明）
+    """
+    if memo is None:
+        memo = {}
+    categories = list(navigation_data)
+    docs = []
+    postings = {}
+
+    for category_index, (category, subcategories) in enumerate(navigation_data.items()):
+        for subcategory, links in subcategories.items():
+            path_tokens = set(tokenize(category, True)) | set(tokenize(subcategory, True))
+            for link in links:
+                link_id = len(docs)
+                title = link.get('title') or ''
+                url = link.get('url') or ''
+                docs.append([title, url, category_index, subcategory, link.get('icon') or ''])
+
+                link_terms = memo.get((title, url))
+                if link_terms is None:
+                    link_terms = set(tokenize(title, True))
+                    link_terms.update(tokenize(link_hostname(link), True))
+                    link_terms = memo[title, url] = tuple(link_terms)
+                terms = path_tokens.union(link_terms)
+                for term in terms:
+                    postings.setdefault(term, []).append(link_id)
+
+    terms = sorted(postings)
+    prefix_table = build_prefix_table(terms, postings)
+    prefixes = sorted(prefix_table)
+
+    return {
+        "version": INDEX_VERSION,
+        "categories": categories,
+        "docs": docs,
+        "terms": terms,
+        "postings": [_delta_encode(postings[term]) for term in terms],
+        "prefixes": prefixes,
+        "prefix_postings": [_delta_encode(prefix_table[prefix]) for prefix in prefixes],
+    }
+
+
+def write_search_index(navigation_data, data_dir, memo=None):
+    """
+    生成索引并写入data目录，内容未变化时不改写文件
+
+    参数:
+        memo: 传给build_search_index的分词缓存
+
+    返回:
+        (path, written): 索引文件路径，以及是否写入了文件
+    """
+    os.makedirs(data_dir, exist_ok=True)
+    index = build_search_index(navigation_data, memo)
+    path = os.path.join(data_dir, INDEX_NAME)
+    text = json_codec.dumps(index)
+    return path, write_if_changed(path, text)
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Service worker生成模块
+
+功能：发布构建（见dist_build）时生成sw.js，页面作为新标签页反复打开时直接从缓存加载：
+    - 带内容哈希的资源（样式、脚本、数据分片、图标表、搜索索引）写入预缓存清单，安装时缓存，
+      之后直接从缓存读取；重新构建后只下载缓存中没有的文件（内容变化的分片），未变化的文件名不变，不会重新下载
+    - 入口页面（index.html）使用stale-while-revalidate：先返回缓存的页面，同时在后台获取新页面更新缓存
+    - 新版本在所有旧页面关闭后才接管，此时删除新清单中不再引用的资源，旧页面按需加载的分片不会被提前删除
+
+预缓存清单和版本号写在sw.js中，任何资源或入口页面变化时sw.js的内容随之变化，浏览器据此安装新版本。
+"""
+
+import hashlib
+
+from html_splice import splice_slots
+import json_codec
+
+SERVICE_WORKER_NAME = 'sw.js'
+
+# 页面脚本末尾追加的注册代码（只加到发布版本中，开发时打开的页面不注册）
+REGISTRATION_SCRIPT = '''
+// 注册service worker，再次打开页面时直接使用缓存的页面和资源
+if ('serviceWorker' in navigator) {
+    window.addEventListener('load', () => {
+        navigator.serviceWorker.register('sw.js', { updateViaCache: 'none' }).catch(() => {});
+    });
+}
+'''
+
+SERVICE_WORKER_SOURCE = '''// 导航页面的service worker（发布构建时由service_worker.py生成，不要手动修改）
+const VERSION = /* slot:version */'dev'/* /slot:version */;
+// 预缓存清单：带内容哈希的资源，相对于service worker所在目录
+const PRECACHE = /* slot:precache */[]/* /slot:precache */;
+
+// 资源文件名带哈希，内容不会变化，各版本共用一个缓存
+const ASSET_CACHE = 'navigation-assets';
+const PAGE_CACHE = 'navigation-pages';
+const ENTRY = new URL('./', self.registration.scope).href;
+const precacheUrls = new Set(PRECACHE.map(path => new URL(path, self.registration.scope).href));
+
+self.addEventListener('install', event => {
+    event.waitUntil((async () => {
+        // 只下载缓存中还没有的资源（重新构建后内容变化的文件）
+        const cache = await caches.open(ASSET_CACHE);
+        const missing = [];
+        for (const url of precacheUrls) {
+            if (!(await cache.match(url))) {
+                missing.push(url);
+            }
+        }
+        await cache.addAll(missing);
+
+        // 入口页面不带哈希，每个版本都重新获取
+        const response = await fetch(ENTRY, { cache: 'reload' });
+        if (response.ok) {
+            await (await caches.open(PAGE_CACHE)).put(ENTRY, response);
+        }
+    })());
+});
+
+self.addEventListener('activate', event => {
+    // 旧页面都已关闭，删除当前版本不再引用的资源
+    event.waitUntil((async () => {
+        const cache = await caches.open(ASSET_CACHE);
+        for (const request of await cache.keys()) {
+            if (!precacheUrls.has(request.url)) {
+                await cache.delete(request);
+            }
+        }
+    })());
+});
+
+// 先返回缓存的页面，同时在后台获取新页面更新缓存（下次打开时生效）
+async function staleWhileRevalidate(event) {
+    const cache = await caches.open(PAGE_CACHE);
+    const cached = await cache.match(ENTRY);
+    const network = fetch(event.request).then(async response => {
+        if (response.ok && !response.redirected) {
+            await cache.put(ENTRY, response.clone());
+        }
+        return response;
+    });
+    if (cached) {
+        event.waitUntil(network.catch(() => {}));
+        return cached;
+    }
+    return network;
+}
+
+async function cacheFirst(request) {
+    const cache = await caches.open(ASSET_CACHE);
+    const cached = await cache.match(request);
+    if (cached) {
+        return cached;
+    }
+    const response = await fetch(request);
+    if (response.ok) {
+        await cache.put(request, response.clone());
+    }
+    return response;
+}
+
+self.addEventListener('fetch', event => {
+    const request = event.request;
+    if (request.method !== 'GET') {
+        return;
+    }
+    // 第三方图标服务等其他来源的请求直接走网络
+    const url = new URL(request.url);
+    if (url.origin !== self.location.origin) {
+        return;
+    }
+    url.search = '';
+    url.hash = '';
+    if (precacheUrls.has(url.href)) {
+        event.respondWith(cacheFirst(request));
+    } else if (request.mode === 'navigate' && (url.href === ENTRY || url.href === ENTRY + 'index.html')) {
+        event.respondWith(staleWhileRevalidate(event));
+    }
+});
+'''
+
+
+def service_worker_version(precache, entry_data):
+    """
+    计算service worker的版本号：预缓存清单和入口页面内容的哈希
+
+    参数:
+        precache: 预缓存的资源路径列表
+        entry_data: 入口页面的内容（bytes）
+    """
+    digest = hashlib.sha256(json_codec.dumps(precache).encode('utf-8'))
+    digest.update(hashlib.sha256(entry_data).digest())
+    return digest.hexdigest()[:10]
+
+
+def render_service_worker(precache, version):
+    """
+    生成sw.js的内容
+
+    参数:
+        precache: 预缓存的资源路径列表（相对于sw.js所在目录）
+        version: 版本号（见service_worker_version）
+
+    返回:
+        str: sw.js的源代码（未压缩）
+    """
+    return splice_slots(SERVICE_WORKER_SOURCE, {
+        'version': json_codec.dumps(version),
+        'precache': json_codec.dumps(sorted(precache), pretty=True),
+    })
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+合成书签生成模块
+
+功能：按参数生成与pintree导出格式相同的合成书签文件，用于测试和性能基准（见benchmark.py）。
+相同的参数和随机种子总是生成完全相同的文件。
+
+生成方式：
+    - 顶层是一个“其他书签”文件夹，与真实导出的结构相同
+    - 先生成一条嵌套到最大深度的文件夹链，保证达到指定深度，
+      其余文件夹随机挂到深度未满、子文件夹未满的文件夹下
+    - 链接随机分布到各个文件夹中，标题按比例混合中文和英文，
+      一部分链接重复使用已生成的地址（部分带有跟踪参数），用于测试重复链接合并
+
+生成结果以节点事件流（见bookmark_stream）产出，写文件时逐个序列化，不会在内存中保存整棵树。
+"""
+
+import gzip
+import io
+import random
+
+from bookmark_stream import END, FOLDER, LINK
+import json_codec
+
+# 默认参数
+DEFAULT_LINKS = 10000
+DEFAULT_WIDTH = 8
+DEFAULT_DEPTH = 4
+DEFAULT_CJK_RATIO = 0.5
+DEFAULT_DUPLICATE_RATE = 0.05
+# 平均每个文件夹中的链接数量，决定文件夹的总数
+LINKS_PER_FOLDER = 20
+# 带有远程图标地址的链接比例（与真实导出相近）
+REMOTE_ICON_RATE = 0.3
+
+ROOT_TITLE = '其他书签'
+# 第一个链接的添加时间（毫秒），之后的链接依次递增
+START_DATE = 1600000000000
+
+_CJK_CHARS = ('的一是在不了有和人这中大为上个国我以要他时来用们生到作地于出就分对成会可主发年动同工也能下过子说产种面而'
+              '方后多定行学法所民得经十三之进着等部度家电力里如水化高自二理起小物现实加量都两体制机当使点从业本去把性好'
+              '应开它合还因由其些然前外天政四日那社义事平形相全表间样与关各重新线内数正心反你明看原又么利比或但质气第向'
+              '道命此变条只没结解问意建月公无系军很情者最立代想已通并提直题党程展五果料象员革位入常文总次品式活设及管特件'
+              '长求老头基资边流路级少图山统接知较将组见计别她手角期根论运农指几九区强放决西被干做必战先回则任取据处队南给'
+              '色光门即保治北造百规热领七海口东导器压志世金增争济阶油思术极交受联什认六共权收证改清己美再采转更单风切打白'
+              '教速花带安场身车例真务具万每目至达走积示议声报斗完类八离华名确才科张信马节话米整空元况今集温传土许步群广石'
+              '记需段研界拉林律叫且究观越织装影算低持音众书布复容儿须际商非验连断深难近矿千周委素技备半办青省列习响约支般'
+              '史感劳便团往酸历市克何除消构府称太准精值号率族维划选标写存候毛亲快效斯院查江型眼王按格养易置派层片始却专状'
+              '育厂京识适属圆包火住调满县局照参红细引听该铁价严')
+_LATIN_WORDS = ('open', 'source', 'cloud', 'data', 'search', 'tools', 'guide', 'docs', 'design', 'studio',
+                'learn', 'code', 'news', 'media', 'video', 'music', 'photo', 'map', 'book', 'paper',
+                'python', 'web', 'api', 'dev', 'online', 'free', 'home', 'lab', 'hub', 'project',
+                'market', 'finance', 'health', 'travel', 'game', 'science', 'math', 'history', 'art', 'font')
+_TLDS = ('com', 'cn', 'net', 'org', 'io', 'com.cn', 'edu.cn', 'gov.cn', 'dev', 'co')
+_TRACKING = ('utm_source=weibo', 'utm_medium=social&utm_campaign=share', 'spm=a2c4g.11186623', 'from=timeline')
+
+
+class _Generator:
+    """
+    合成书签的随机内容生成器（所有随机数都来自同一个带种子的Random）
+    """
+
+    def __init__(self, rng, cjk_ratio, duplicate_rate):
+        self.rng = rng
+        self.cjk_ratio = cjk_ratio
+        self.duplicate_rate = duplicate_rate
+        self.urls = []
+        self.date = START_DATE
+
+    def title(self, words_min=2, words_max=6):
+        rng = self.rng
+        if rng.random() < self.cjk_ratio:
+            return ''.join(rng.choices(_CJK_CHARS, k=rng.randint(words_min * 2, words_max * 3)))
+        return ' '.join(rng.choices(_LATIN_WORDS, k=rng.randint(words_min, words_max))).capitalize()
+
+    def url(self):
+        rng = self.rng
+        if self.urls and rng.random() < self.duplicate_rate:
+            url = rng.choice(self.urls)
+            # 一半的重复链接带有跟踪参数，只有规范化后才能识别为重复
+            if rng.random() < 0.5:
+                url += ('&' if '?' in url else '?') + rng.choice(_TRACKING)
+            return url
+        host = f'{rng.choice(_LATIN_WORDS)}{rng.randint(0, 9999)}.{rng.choice(_TLDS)}'
+        if rng.random() < 0.3:
+            host = 'www.' + host
+        path = '/'.join(rng.choices(_LATIN_WORDS, k=rng.randint(0, 3)))
+        url = f'https://{host}/{path}'
+        if rng.random() < 0.2:
+            url += f'?id={rng.randint(1, 10 ** 6)}'
+        self.urls.append(url)
+        return url
+
+    def add_date(self):
+        self.date += self.rng.randint(1000, 10 ** 7)
+        return self.date
+
+    def link(self):
+        url = self.url()
+        item = {"type": "link", "addDate": self.add_date(), "title": self.title(), "url": url}
+        if self.rng.random() < REMOTE_ICON_RATE:
+            item["icon"] = f"https://{url.split('/')[2]}/favicon.ico"
+        return item
+
+    def folder(self):
+        return {"type": "folder", "addDate": self.add_date(), "title": self.title(1, 3)}
+
+
+def _build_folders(rng, folder_count, width, depth):
+    """
+    随机生成文件夹结构
+
+    返回:
+        list: 每个文件夹的子文件夹序号列表，0号为顶层的“其他书签”
+    """
+    children = [[]]
+    depths = [0]
+    # 可以继续添加子文件夹的文件夹
+    open_folders = [0]
+
+    def add(parent):
+        folder = len(children)
+        children.append([])
+        depths.append(depths[parent] + 1)
+        children[parent].append(folder)
+        if depths[folder] < depth:
+            open_folders.append(folder)
+        return folder
+
+    # 先生成达到最大深度的一条链
+    parent = 0
+    for _ in range(depth):
+        parent = add(parent)
+    open_folders[:] = [folder for folder in open_folders if len(children[folder]) < width]
+
+    while len(children) <= folder_count and open_folders:
+        index = rng.randrange(len(open_folders))
+        parent = open_folders[index]
+        add(parent)
+        if len(children[parent]) >= width:
+            # 子文件夹已满，与末尾交换后移除
+            open_folders[index] = open_folders[-1]
+            open_folders.pop()
+    return children
+
+
+def iter_synthetic_nodes(links=DEFAULT_LINKS, width=DEFAULT_WIDTH, depth=DEFAULT_DEPTH,
+                         cjk_ratio=DEFAULT_CJK_RATIO, duplicate_rate=DEFAULT_DUPLICATE_RATE, seed=0):
+    """
+    生成合成书签的节点事件流
+
+    参数:
+        links: 链接总数
+        width: 每个文件夹最多包含的子文件夹数
+        depth: 文件夹的最大嵌套深度（不含顶层的“其他书签”）
+        cjk_ratio: 中文标题所占的比例（0~1）
+        duplicate_rate: 重复使用已有地址的链接比例（0~1）
+        seed: 随机种子
+
+    返回:
+        节点事件生成器（FOLDER/LINK/END）
+    """
+    rng = random.Random(seed)
+    generator = _Generator(rng, cjk_ratio, duplicate_rate)
+    folder_count = max(depth, links // LINKS_PER_FOLDER)
+    children = _build_folders(rng, folder_count, max(width, 1), depth)
+
+    # 链接随机分布到“其他书签”以外的文件夹（没有文件夹时直接放在顶层文件夹中）
+    link_counts = [0] * len(children)
+    targets = range(1, len(children)) if len(children) > 1 else range(1)
+    for folder in rng.choices(targets, k=links):
+        link_counts[folder] += 1
+
+    yield FOLDER, {"type": "folder", "addDate": START_DATE, "title": ROOT_TITLE}
+    stack = [iter(children[0])]
+    while stack:
+        folder = next(stack[-1], None)
+        if folder is None:
+            stack.pop()
+            yield END, None
+            continue
+        yield FOLDER, generator.folder()
+        for _ in range(link_counts[folder]):
+            yield LINK, generator.link()
+        stack.append(iter(children[folder]))
+
+
+def write_nodes_json(nodes, fp):
+    """
+    把节点事件流序列化为pintree格式的JSON（紧凑格式，逐个节点写出）
+
+    参数:
+        nodes: 节点事件流
+        fp: 文本文件对象
+    """
+    fp.write('[')
+    # 每一层是否还没有写过节点（决定是否需要逗号）
+    first = [True]
+    for event, item in nodes:
+        if event == END:
+            fp.write(']}')
+            first.pop()
+            continue
+        if not first[-1]:
+            fp.write(',')
+        first[-1] = False
+        text = json_codec.dumps(item)
+        if event == FOLDER:
+            fp.write(text[:-1] + ',"children":[')
+            first.append(True)
+        else:
+            fp.write(text)
+    fp.write(']')
+
+
+def write_synthetic_tree(path, **params):
+    """
+    生成合成书签并写入文件（文件名以.gz结尾时使用gzip压缩）
+
+    参数:
+        path: 输出文件路径
+        params: 传给iter_synthetic_nodes的参数
+
+    返回:
+        dict: {"folders", "links"} 生成的文件夹和链接数量（含顶层文件夹）
+    """
+    counts = {"folders": 0, "links": 0}
+
+    def counted(nodes):
+        for event, item in nodes:
+            if event == FOLDER:
+                counts["folders"] += 1
+            elif event == LINK:
+                counts["links"] += 1
+            yield event, item
+
+    if str(path).endswith('.gz'):
+        # 压缩文件头中的时间固定为0，相同参数生成的文件完全相同
+        f = io.TextIOWrapper(gzip.GzipFile(path, 'wb', compresslevel=6, mtime=0), encoding='utf-8')
+    else:
+        f = open(path, 'w', encoding='utf-8')
+    with f:
+        write_nodes_json(counted(iter_synthetic_nodes(**params)), f)
+    return counts
@@ -0,0 +1,9 @@
+# -*- coding: utf-8 -*-
+"""
+测试公共配置：各模块都在仓库根目录下，测试时从根目录导入
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
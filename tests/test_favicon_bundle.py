@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+网站图标打包测试：用本地HTTP服务器代替真实的图标服务
+"""
+
+import base64
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from favicon_bundle import IconCache, UrlFetcher, bundle_icons
+from prerender import render_link_card
+
+# 只需要文件头能被识别为图片
+PNG_ICON = b'\x89PNG\r\n\x1a\n' + b'\x00' * 24
+GIF_ICON = b'GIF89a' + b'\x01' * 16
+
+# 主机名 -> 服务器返回的内容（None表示404）
+ICONS = {
+    'a.test': PNG_ICON,
+    'b.test': PNG_ICON,
+    'c.test': GIF_ICON,
+    'missing.test': None,
+    'html.test': b'<!doctype html><title>Not an icon</title>',
+}
+
+
+class _IconHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        host = self.path.strip('/').removesuffix('.ico')
+        self.server.requests.append(host)
+        body = ICONS.get(host)
+        if body is None:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def icon_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _IconHandler)
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def _navigation_data(hosts):
+    links = [{"type": "link", "title": host, "url": f"https://{host}/page", "icon": "🔗"} for host in hosts]
+    return {"分类": {"子分类": links}}
+
+
+def test_bundle_from_stand_in_server(tmp_path, icon_server):
+    fetcher = UrlFetcher(f'http://127.0.0.1:{icon_server.server_port}/{{host}}.ico', timeout=5)
+    cache = IconCache(str(tmp_path / 'icons'))
+    navigation_data = _navigation_data(list(ICONS) + ['a.test'])
+
+    table = bundle_icons(navigation_data, cache, fetcher)
+
+    # 相同的图标只保存一份，主机名按内容指向同一项
+    assert len(table["icons"]) == 2
+    assert set(table["hosts"]) == {'a.test', 'b.test', 'c.test'}
+    assert table["hosts"]['a.test'] == table["hosts"]['b.test'] != table["hosts"]['c.test']
+    png = table["icons"][table["hosts"]['a.test']]
+    gif = table["icons"][table["hosts"]['c.test']]
+    assert png == 'data:image/png;base64,' + base64.b64encode(PNG_ICON).decode('ascii')
+    assert gif == 'data:image/gif;base64,' + base64.b64encode(GIF_ICON).decode('ascii')
+    # 每个主机名只请求一次，重复出现的链接不会重复请求
+    assert sorted(icon_server.requests) == sorted(ICONS)
+
+    # 再次打包只使用磁盘缓存（包括确认没有图标的主机名），不再发出请求
+    icon_server.requests.clear()
+    again = bundle_icons(navigation_data, IconCache(str(tmp_path / 'icons')), fetcher)
+    assert again == table
+    assert icon_server.requests == []
+
+
+def test_unbundled_hosts_use_emoji():
+    table = {"icons": ['data:image/png;base64,AAAA'], "hosts": {'a.test': 0}}
+    bundled = render_link_card({"title": "A", "url": "https://a.test/", "icon": "🔧"}, table)
+    unbundled = render_link_card({"title": "B", "url": "https://b.test/", "icon": "🔧"}, table)
+    assert 'src="data:image/png;base64,AAAA"' in bundled
+    assert '<img' not in unbundled and '🔧' in unbundled
+    assert 'http' not in unbundled.replace('https://b.test/', '')
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+JSON编解码测试：orjson和标准库两种后端的输出逐字节相同，iterdumps逐段产出的内容与dumps相同
+"""
+
+import io
+import os
+
+import pytest
+
+import json_codec
+from search_index import build_search_index
+from synthetic_tree import iter_synthetic_nodes, write_nodes_json
+from update_static_data import convert_json_format
+
+PINTREE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'pintree.json')
+
+
+@pytest.fixture
+def restore_backend():
+    previous = json_codec.backend()
+    yield
+    json_codec.use_backend(previous)
+
+
+def _samples():
+    with open(PINTREE_PATH, encoding='utf-8') as f:
+        yield 'pintree.json', json_codec.load(f)
+    for seed, links in ((1, 300), (2, 3000)):
+        buffer = io.StringIO()
+        write_nodes_json(iter_synthetic_nodes(links=links, seed=seed), buffer)
+        tree = json_codec.loads(buffer.getvalue())
+        navigation_data = convert_json_format(iter_synthetic_nodes(links=links, seed=seed))
+        yield f'synthetic-{seed}', tree
+        yield f'navigation-{seed}', navigation_data
+        yield f'index-{seed}', build_search_index(navigation_data)
+    # orjson写法不同或不支持、需要改用标准库的内容
+    yield 'fallbacks', {
+        "floats": [0.5, 1e16, 1.5e-07, 6.9e-05, -0.0, 123456.789],
+        "big": 2 ** 70,
+        "keys": {1: "int", 2: [], 3: {"empty": {}, "list": [[], [{}]]}},
+        "text": "</script> null 0.00001 1e5   \"quoted\" \\",
+        "tuple": (1, (2, 3)),
+    }
+
+
+def _encode_all(backend):
+    json_codec.use_backend(backend)
+    result = {}
+    for name, obj in _samples():
+        for pretty in (False, True):
+            for sort_keys in (False, True):
+                result[name, pretty, sort_keys] = json_codec.dumps(obj, pretty, sort_keys)
+            assert ''.join(json_codec.iterdumps(obj, pretty)) == result[name, pretty, False], (backend, name, pretty)
+    return result
+
+
+def test_iterdumps_matches_dumps(restore_backend):
+    """
+    标准库后端：iterdumps按成员分段编码，拼接结果与dumps完全相同
+    """
+    _encode_all(json_codec.BACKEND_STDLIB)
+
+
+def test_backends_produce_identical_output(restore_backend):
+    """
+    orjson与标准库的dumps（紧凑、缩进、按键排序）和iterdumps输出逐字节相同
+    """
+    pytest.importorskip('orjson')
+    expected = _encode_all(json_codec.BACKEND_STDLIB)
+    actual = _encode_all(json_codec.BACKEND_ORJSON)
+    assert actual.keys() == expected.keys()
+    for key, text in expected.items():
+        assert actual[key] == text, key
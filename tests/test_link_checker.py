@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""
+链接检查测试：用本地HTTP服务器模拟各种响应
+"""
+
+import asyncio
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from link_checker import (STATE_DEAD, STATE_ERROR, STATE_OK, STATE_REDIRECT, ConnectionPool,
+                          LinkStatusCache, check_links_async, probe_link)
+
+ETAG = '"v1"'
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def _reply(self, status, headers=(), body=b''):
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
+        if status != 304:
+            self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if self.command != 'HEAD' and status != 304:
+            self.wfile.write(body)
+
+    def _handle(self):
+        server = self.server
+        server.requests.append((self.command, self.path))
+        if self.path == '/ok':
+            self._reply(200, body=b'ok')
+        elif self.path == '/moved':
+            self._reply(301, [('Location', '/ok')])
+        elif self.path == '/found':
+            self._reply(302, [('Location', '/ok')])
+        elif self.path == '/no-head':
+            self._reply(405 if self.command == 'HEAD' else 200, body=b'ok')
+        elif self.path == '/gone':
+            self._reply(404, body=b'not found')
+        elif self.path == '/etag':
+            if self.headers.get('If-None-Match') == ETAG:
+                self._reply(304, [('ETag', ETAG)])
+            else:
+                self._reply(200, [('ETag', ETAG)], b'ok')
+        elif self.path.startswith('/slow'):
+            with server.lock:
+                server.active += 1
+                server.max_active = max(server.max_active, server.active)
+            time.sleep(0.1)
+            with server.lock:
+                server.active -= 1
+            self._reply(200, body=b'ok')
+        else:
+            self._reply(500)
+
+    do_HEAD = do_GET = _handle
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _StubHandler)
+    server.requests = []
+    server.lock = threading.Lock()
+    server.active = server.max_active = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server, f'http://127.0.0.1:{server.server_port}'
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def _probe(url, cached=None, **pool_args):
+    async def run():
+        pool = ConnectionPool(timeout=5, **pool_args)
+        try:
+            return await probe_link(pool, url, cached), pool
+        finally:
+            pool.close()
+    return asyncio.run(run())
+
+
+def test_ok(stub_server):
+    server, base = stub_server
+    result, _ = _probe(base + '/ok')
+    assert (result['state'], result['status']) == (STATE_OK, 200)
+    assert server.requests == [('HEAD', '/ok')]
+
+
+def test_permanent_redirect_is_annotated(stub_server):
+    server, base = stub_server
+    result, pool = _probe(base + '/moved')
+    assert result['state'] == STATE_REDIRECT
+    assert result['final_url'] == base + '/ok'
+    # 跳转在同一个keep-alive连接上完成
+    assert (pool.opened, pool.reused) == (1, 1)
+
+
+def test_temporary_redirect_is_ok(stub_server):
+    _, base = stub_server
+    result, _ = _probe(base + '/found')
+    assert result['state'] == STATE_OK
+    assert result['final_url'] == base + '/ok'
+
+
+def test_head_not_allowed_falls_back_to_get(stub_server):
+    server, base = stub_server
+    result, _ = _probe(base + '/no-head')
+    assert (result['state'], result['status']) == (STATE_OK, 200)
+    assert server.requests == [('HEAD', '/no-head'), ('GET', '/no-head')]
+
+
+def test_not_found_is_dead(stub_server):
+    server, base = stub_server
+    result, _ = _probe(base + '/gone')
+    assert (result['state'], result['status']) == (STATE_DEAD, 404)
+    # HEAD返回404后用GET确认
+    assert server.requests == [('HEAD', '/gone'), ('GET', '/gone')]
+
+
+def test_not_modified_reuses_cached_result(stub_server):
+    server, base = stub_server
+    first, _ = _probe(base + '/etag')
+    assert (first['state'], first['etag']) == (STATE_OK, ETAG)
+
+    server.requests.clear()
+    cached = dict(first, checked=0)
+    second, _ = _probe(base + '/etag', cached)
+    assert second['state'] == STATE_OK and second['checked'] > 0
+    # 只发出一次条件请求
+    assert server.requests == [('HEAD', '/etag')]
+
+
+def test_connection_refused_is_not_dead():
+    # 先占用一个端口再关闭，得到一个没有服务在监听的端口
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    result, _ = _probe(f'http://127.0.0.1:{port}/')
+    assert result['state'] == STATE_ERROR
+
+
+def test_per_host_limit(stub_server, tmp_path):
+    server, base = stub_server
+    urls = [f'{base}/slow/{i}' for i in range(8)]
+    cache = LinkStatusCache(str(tmp_path / 'links.json'))
+
+    async def run():
+        pool = ConnectionPool(concurrency=8, per_host=2, timeout=5)
+        try:
+            return await check_links_async(urls, cache, pool=pool), pool
+        finally:
+            pool.close()
+
+    checked, pool = asyncio.run(run())
+    assert checked == len(urls)
+    assert all(cache.results[url]['state'] == STATE_OK for url in urls)
+    assert server.max_active == 2
+    # 同一主机最多同时打开两个连接，其余请求复用这两个连接
+    assert pool.opened == 2 and pool.reused == len(urls) - 2
+
+    # 结果未过期时不再请求
+    server.requests.clear()
+    assert asyncio.run(check_links_async(urls, cache)) == 0
+    assert server.requests == []
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+搜索索引测试：前缀查询按页面的查找方式（预先合并的前缀表，否则逐个展开）得到完整的结果
+"""
+
+from bisect import bisect_left
+
+from search_index import PREFIX_TABLE_MIN_TERMS, build_search_index, link_hostname, tokenize, url_hostname
+from synthetic_tree import iter_synthetic_nodes
+from update_static_data import convert_json_format
+
+
+def _decode(deltas):
+    ids = []
+    total = 0
+    for delta in deltas:
+        total += delta
+        ids.append(total)
+    return ids
+
+
+def _prefix_ids(index, token):
+    """
+    与页面中searchLinks对最后一个词的处理相同
+    """
+    position = bisect_left(index['prefixes'], token)
+    if position < len(index['prefixes']) and index['prefixes'][position] == token:
+        return _decode(index['prefix_postings'][position]), 0
+    terms = index['terms']
+    position = bisect_left(terms, token)
+    ids = set()
+    expanded = 0
+    while position < len(terms) and terms[position].startswith(token):
+        ids.update(_decode(index['postings'][position]))
+        position += 1
+        expanded += 1
+    return sorted(ids), expanded
+
+
+def _link_terms(navigation_data):
+    """
+    按链接编号列出每个链接被索引的全部词
+    """
+    result = []
+    for category, subcategories in navigation_data.items():
+        for subcategory, links in subcategories.items():
+            path_terms = tokenize(category, True) + tokenize(subcategory, True)
+            for link in links:
+                result.append(set(tokenize(link.get('title'), True)
+                                  + tokenize(url_hostname(link.get('url')), True) + path_terms))
+    return result
+
+
+def test_short_prefixes_return_every_match():
+    navigation_data = convert_json_format(iter_synthetic_nodes(links=3000, seed=5))
+    index = build_search_index(navigation_data)
+    assert index['prefixes'], '合成数据中应当有需要预先合并的短前缀'
+
+    link_terms = _link_terms(navigation_data)
+
+    # 全部预先合并的前缀，以及一部分需要展开的一到三个字的前缀
+    queries = set(index['prefixes'])
+    queries.update(term[:length] for term in index['terms'][::50] for length in (1, 2, 3))
+    for token in sorted(queries):
+        ids, expanded = _prefix_ids(index, token)
+        assert expanded <= PREFIX_TABLE_MIN_TERMS, token
+        expected = [link_id for link_id, terms in enumerate(link_terms)
+                    if any(term.startswith(token) for term in terms)]
+        assert ids == expected, token
+
+
+def test_converted_links_carry_hostname():
+    """
+    转换时写入的host字段与从URL提取的结果相同，页面和输出阶段不必再解析URL
+    """
+    navigation_data = convert_json_format(iter_synthetic_nodes(links=500, seed=11))
+    links = [link for subcategories in navigation_data.values()
+             for links in subcategories.values() for link in links]
+    assert links
+    for link in links:
+        assert link['host'] == url_hostname(link['url'])
+        assert link_hostname(link) == link['host']
+    assert link_hostname({'url': 'example.org/path'}) == 'example.org'
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""
+流式转换的内存测试：load_navigation_data的峰值内存只随转换结果增长，与导出文件的大小无关
+
+用tracemalloc统计Python分配的内存（比进程RSS稳定，且可以只统计一次调用），
+“额外内存”指调用过程中的峰值减去调用结束后仍被转换结果占用的内存。
+"""
+
+import gc
+import tracemalloc
+
+from bookmark_stream import LINK
+from instrumentation import Instrumentation
+from synthetic_tree import iter_synthetic_nodes, write_nodes_json, write_synthetic_tree
+from update_static_data import load_navigation_data
+
+# 读取块、单个节点等与导出文件大小无关的开销上限
+MAX_OVERHEAD_BYTES = 1024 * 1024
+
+
+def _measure(path, dedupe):
+    """
+    返回 (峰值内存, 转换结果占用的内存)
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        with Instrumentation(quiet=True).activate():
+            navigation_data = load_navigation_data(str(path), None, dedupe)
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert navigation_data
+    return peak, retained
+
+
+def test_overhead_is_flat_across_tree_sizes(tmp_path):
+    overheads = []
+    for links in (1000, 4000, 16000):
+        path = tmp_path / f'synthetic-{links}.json'
+        write_synthetic_tree(path, links=links)
+        peak, retained = _measure(path, dedupe=False)
+        overheads.append(peak - retained)
+    # 不构建书签树、不载入整个文件：额外内存不随链接数增长
+    assert max(overheads) < MAX_OVERHEAD_BYTES, overheads
+
+
+def test_peak_does_not_grow_with_dropped_fields(tmp_path):
+    # 导出文件中的远程图标地址在转换时被丢弃，文件变大后峰值内存应保持不变
+    def with_icons(size):
+        for event, item in iter_synthetic_nodes(links=4000):
+            if event == LINK:
+                item = dict(item, icon='https://icons.example.com/' + 'x' * size)
+            yield event, item
+
+    peaks = []
+    for size in (0, 4096):
+        path = tmp_path / f'icons-{size}.json'
+        with open(path, 'w', encoding='utf-8') as f:
+            write_nodes_json(with_icons(size), f)
+        peaks.append(_measure(path, dedupe=True)[0])
+    assert peaks[1] < peaks[0] + MAX_OVERHEAD_BYTES, peaks
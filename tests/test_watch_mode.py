@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""
+监视模式的增量重建测试：只重新转换变化的分类，结果与完整转换相同
+"""
+
+import copy
+import os
+import shutil
+
+import pytest
+
+from bookmark_tree import BookmarkTree
+from data_shards import shard_name
+from instrumentation import Instrumentation
+import json_codec
+from link_checker import STATE_DEAD, LinkStatusCache
+from search_index import INDEX_NAME
+from update_static_data import navigation_data_from_tree
+from watch_mode import IncrementalBuilder
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _link(title, url, icon=None):
+    link = {"type": "link", "addDate": 1, "title": title, "url": url}
+    if icon:
+        link["icon"] = icon
+    return link
+
+
+def _folder(title, children):
+    return {"type": "folder", "addDate": 1, "title": title, "children": children}
+
+
+BOOKMARKS = [_folder('其他书签', [
+    _folder('A', [_link('a1', 'https://a.test/1'), _folder('sub', [_link('a2', 'https://a.test/2')])]),
+    _folder('B', [_link('b1', 'https://b.test/1', '📘'), _link('shared', 'https://shared.test/')]),
+    _link('loose', 'https://loose.test/'),
+    _folder('C', [_link('c1', 'https://c.test/1'), _link('shared again', 'https://shared.test/?utm_source=x')]),
+])]
+
+
+@pytest.fixture
+def site(tmp_path):
+    shutil.copy(os.path.join(ROOT, 'index.html'), tmp_path / 'index.html')
+    bookmarks = copy.deepcopy(BOOKMARKS)
+    path = tmp_path / 'pintree.json'
+
+    def save():
+        with open(path, 'w', encoding='utf-8') as f:
+            json_codec.dump(bookmarks, f)
+
+    save()
+    builder = IncrementalBuilder(str(path), str(tmp_path / 'index.html'), str(tmp_path))
+    with Instrumentation(quiet=True).activate():
+        yield bookmarks, save, builder, tmp_path
+
+
+def _full(path):
+    return navigation_data_from_tree(BookmarkTree.load(path))
+
+
+def _stamp(path):
+    st = os.stat(path)
+    return st.st_ino, st.st_mtime_ns
+
+
+def test_only_changed_categories_are_reconverted(site):
+    bookmarks, save, builder, tmp_path = site
+    assert builder.build()
+    assert builder.reconverted == ['A', 'B', '默认分类', 'C']
+    data_dir = tmp_path / 'data'
+    shards = {category: data_dir / shard_name(category) for category in builder.navigation_data}
+    before = {category: _stamp(path) for category, path in shards.items()}
+
+    # 修改B中一个链接的标题：只重新转换和重写B
+    bookmarks[0]['children'][1]['children'][0]['title'] = 'b1 renamed'
+    save()
+    assert builder.build()
+    assert builder.reconverted == ['B']
+    assert builder.navigation_data == _full(builder.pintree_json_path)
+    after = {category: _stamp(path) for category, path in shards.items()}
+    assert [category for category in shards if before[category] != after[category]] == ['B']
+
+
+def test_added_time_changes_do_not_reconvert(site):
+    bookmarks, save, builder, _ = site
+    assert builder.build()
+    bookmarks[0]['children'][0]['children'][0]['addDate'] = 99
+    save()
+    assert builder.build()
+    assert builder.reconverted == []
+
+
+def test_duplicates_across_categories_match_full_build(site):
+    bookmarks, save, builder, _ = site
+    assert builder.build()
+    # C中的重复链接被B中的合并
+    assert [link['title'] for link in builder.navigation_data['C']['默认分类']] == ['c1']
+
+    # 删除B中的链接后，C中原本重复的链接保留下来
+    del bookmarks[0]['children'][1]['children'][1]
+    save()
+    assert builder.build()
+    assert builder.reconverted == ['B']
+    assert builder.navigation_data == _full(builder.pintree_json_path)
+    assert [link['title'] for link in builder.navigation_data['C']['默认分类']] == ['c1', 'shared again']
+
+    # A中新增同一个链接后，B之后的分类中不再出现
+    bookmarks[0]['children'][0]['children'].append(_link('shared first', 'https://shared.test/'))
+    save()
+    assert builder.build()
+    assert builder.reconverted == ['A']
+    assert builder.navigation_data == _full(builder.pintree_json_path)
+
+
+def test_search_index_follows_icons_but_not_link_status(site):
+    bookmarks, save, builder, tmp_path = site
+    assert builder.build()
+    index_path = tmp_path / 'data' / INDEX_NAME
+    before = _stamp(index_path)
+
+    # 链接检查结果不在索引中，只重写分片
+    cache = LinkStatusCache(builder.link_cache_path)
+    cache.results['https://b.test/1'] = {'state': STATE_DEAD, 'status': 404, 'checked': 1}
+    cache.save()
+    assert builder.build()
+    assert builder.navigation_data['B']['默认分类'][0]['status'] == STATE_DEAD
+    assert _stamp(index_path) == before
+
+    # 搜索结果显示索引中的图标，图标变化时重写索引
+    bookmarks[0]['children'][1]['children'][0]['icon'] = '📗'
+    save()
+    assert builder.build()
+    assert builder.reconverted == ['B']
+    assert builder.navigation_data['B']['默认分类'][0]['icon'] == '📗'
+    with open(index_path, encoding='utf-8') as f:
+        docs = json_codec.load(f)['docs']
+    assert [doc[4] for doc in docs if doc[1] == 'https://b.test/1'] == ['📗']
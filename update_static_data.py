@@ -4,282 +4,290 @@
 静态导航页面数据更新脚本
 
 功能：从pintree.json文件读取数据，转换格式后更新到静态HTML文件中
-使用方法：直接运行此脚本即可自动更新static_navigation_standalone.html文件
+使用方法：直接运行此脚本即可自动更新index.html，
+需要指定输入/输出路径时使用 python navigation.py build
 """
 
-import json
 import os
-import re
+import sys
 from datetime import datetime
 
+from bookmark_stream import END, FOLDER, LINK, iter_tree_nodes
+from bookmark_tree import OTHER_BOOKMARKS_TITLES, BookmarkTree, iter_bookmark_file
+from build_cache import BuildCache, hash_bytes
+from data_shards import DEFAULT_DATA_DIR, MANIFEST_NAME, write_shards
+from favicon_bundle import IconCache, UrlFetcher, write_icon_bundle
+from html_splice import SpliceError
+from icon_resolver import is_remote_icon, site_icons
+from instrumentation import count, debug, is_quiet, span
+import json_codec
+from link_checker import DEFAULT_CACHE_NAME as LINK_CACHE_NAME, annotate_links, load_link_statuses
+from page_template import load_template, render_page
+from prerender import load_icon_table, render_first_category
+from search_index import url_hostname, write_search_index
+from url_canon import collapse_duplicates
+
+
+# 参与解析和转换的模块，修改后需要重新转换
+CONVERT_STAGE_SOURCES = ('update_static_data.py', 'bookmark_stream.py', 'bookmark_html.py', 'bookmark_tree.py',
+                         'icon_resolver.py', 'json_codec.py', 'link_checker.py', 'search_index.py', 'url_canon.py')
+
+# 生成分片、索引等输出文件的模块，修改后需要重新写出
+OUTPUT_STAGE_SOURCES = ('data_shards.py', 'search_index.py', 'favicon_bundle.py', 'json_codec.py', 'prerender.py')
+
+# “其他书签”中直接存放的链接所在的分类和子分类
+DEFAULT_CATEGORY = "默认分类"
+
+
+def _make_link(item):
+    """
+    构建导航页面使用的链接对象
+    
+    远程图标地址（页面实际显示的是打包的网站图标）换成按网站解析的emoji，作为图标加载失败时的备用；
+    主机名在这里提取一次写入host字段，页面显示域名和查找打包图标时不必再解析URL
+    """
+    icon = item.get("icon")
+    if not icon or is_remote_icon(icon):
+        icon = site_icons.resolve(item.get("url"))
+    url = item.get("url")
+    return {
+        "type": "link",
+        "title": item.get("title"),
+        "url": url,
+        "host": url_hostname(url),
+        "icon": icon
+    }
+
 
 def convert_json_format(pintree_data):
     """
     将pintree.json格式转换为导航页面所需的格式
     
     参数:
-        pintree_data: 从pintree.json读取的原始数据
+        pintree_data: 从pintree.json读取的原始数据（列表）、BookmarkTree，
+                      或bookmark_stream产出的节点事件流
         
     返回:
         转换后的嵌套对象格式数据
     """
     navigation_data = {}
+    # 未找到'Other bookmarks'文件夹时使用的顶级分类
+    fallback_data = {}
+    other_bookmarks_found = False
+    # 安静模式下逐个文件夹的调试信息完全跳过，连字符串也不格式化
+    verbose = not is_quiet()
+    
+    if isinstance(pintree_data, (list, dict)):
+        debug(f"输入数据类型: {type(pintree_data)}, 长度: {len(pintree_data) if isinstance(pintree_data, list) else 'N/A'}")
+        nodes = iter_tree_nodes(pintree_data)
+    elif isinstance(pintree_data, BookmarkTree):
+        nodes = pintree_data.iter_nodes()
+    else:
+        nodes = pintree_data
     
-    print(f"调试信息: 输入数据类型: {type(pintree_data)}, 长度: {len(pintree_data) if isinstance(pintree_data, list) else 'N/A'}")
+    # 当前打开的文件夹栈，每项为 (角色, 目标字典, 分类前缀)
+    # 角色: other - 被忽略的一级目录; category - 需要收集链接的文件夹; skip - 跳过
+    stack = []
     
-    # 定义一个辅助函数，用于递归处理文件夹内容
-    def process_items(items, target_dict, category_prefix=""):
+    def process_items(event, item):
         """
-        递归处理项目列表，将链接添加到目标字典中
+        处理单个节点事件，将链接添加到所属分类的目标字典中
         
         参数:
-            items: 要处理的项目列表
-            target_dict: 存储结果的字典
-            category_prefix: 当前分类前缀
-            
-        返回:
-            处理的链接数量
+            event: 节点事件类型（FOLDER/LINK/END）
+            item: 节点属性
         """
-        link_count = 0
-        for item in items:
-            if item.get('type') == 'link':
-                # 确保分类存在
-                category = category_prefix if category_prefix else "默认分类"
-                if category not in target_dict:
-                    target_dict[category] = []
-                
-                # 添加链接
-                target_dict[category].append({
-                    "type": "link",
-                    "title": item.get("title"),
-                    "url": item.get("url"),
-                    "icon": item.get("icon") or "🔗"
-                })
-                link_count += 1
-            elif item.get('type') == 'folder':
-                folder_title = item.get("title", "未命名文件夹")
-                children = item.get("children", [])
-                
+        nonlocal other_bookmarks_found
+        parent = stack[-1] if stack else None
+        
+        if event == LINK:
+            if parent is None or parent[0] == 'skip':
+                return
+            if parent[0] == 'other':
+                # 处理直接链接，放入默认分类
+                target_dict = navigation_data.setdefault(DEFAULT_CATEGORY, {})
+                target_dict.setdefault(DEFAULT_CATEGORY, []).append(_make_link(item))
+                return
+            # 确保分类存在
+            _, target_dict, category_prefix = parent
+            category = category_prefix if category_prefix else DEFAULT_CATEGORY
+            if category not in target_dict:
+                target_dict[category] = []
+            target_dict[category].append(_make_link(item))
+        
+        elif event == FOLDER:
+            folder_title = item.get('title', '未命名文件夹')
+            if parent is None:
+                # 检查是否是'Other bookmarks'或'其他书签'
+                if other_bookmarks_found:
+                    stack.append(('skip', None, ""))
+                elif folder_title in OTHER_BOOKMARKS_TITLES:
+                    other_bookmarks_found = True
+                    debug(f"找到目标文件夹: {folder_title}")
+                    debug("按照用户要求，忽略该一级目录，直接处理其子内容")
+                    stack.append(('other', None, ""))
+                else:
+                    fallback_data[folder_title] = {}
+                    stack.append(('category', fallback_data[folder_title], ""))
+            elif parent[0] == 'other':
+                # 将子文件夹作为顶级分类处理，不添加前缀
+                if verbose:
+                    debug(f"将子文件夹 '{folder_title}' 作为顶级分类处理")
+                navigation_data[folder_title] = {}
+                stack.append(('category', navigation_data[folder_title], ""))
+            elif parent[0] == 'category':
                 # 构建新的分类路径
+                _, target_dict, category_prefix = parent
                 new_category = folder_title if not category_prefix else f"{category_prefix} - {folder_title}"
-                
-                # 递归处理子项目
-                link_count += process_items(children, target_dict, new_category)
-                
-                # 记录添加的子分类
-                if new_category in target_dict:
-                    print(f"调试信息: 添加子分类: {new_category}, 链接数量: {len(target_dict[new_category])}")
-        
-        return link_count
-    
-    # 查找'Other bookmarks'文件夹
-    other_bookmarks_folder = None
-    for item in pintree_data:
-        if item.get('type') == 'folder':
-            title = item.get('title', '')
-            # 检查是否是'Other bookmarks'或'其他书签'
-            if title == 'Other bookmarks' or title == '其他书签':
-                other_bookmarks_folder = item
-                print(f"调试信息: 找到目标文件夹: {title}")
-                print("调试信息: 按照用户要求，忽略该一级目录，直接处理其子内容")
-                break
-    
-    # 处理逻辑
-    if other_bookmarks_folder:
-        # 获取子内容
-        children = other_bookmarks_folder.get('children', [])
-        print(f"调试信息: 子内容数量: {len(children)}")
+                stack.append(('category', target_dict, new_category))
+            else:
+                stack.append(parent)
         
-        # 直接将子文件夹作为顶级分类处理
-        for child in children:
-            if child.get('type') == 'folder':
-                # 获取子文件夹名称作为主分类
-                main_category_name = child.get('title', '未命名文件夹')
-                print(f"调试信息: 将子文件夹 '{main_category_name}' 作为顶级分类处理")
-                
-                # 为该分类创建存储结构
-                navigation_data[main_category_name] = {}
-                
-                # 处理子文件夹内容，不添加前缀
-                process_items(child.get('children', []), navigation_data[main_category_name], "")
-            elif child.get('type') == 'link':
-                # 处理直接链接，放入默认分类
-                default_category = "默认分类"
-                if default_category not in navigation_data:
-                    navigation_data[default_category] = {}
-                if default_category not in navigation_data[default_category]:
-                    navigation_data[default_category][default_category] = []
-                
-                navigation_data[default_category][default_category].append({
-                    "type": "link",
-                    "title": child.get("title"),
-                    "url": child.get("url"),
-                    "icon": child.get("icon") or "🔗"
-                })
-    else:
+        elif event == END:
+            role, target_dict, new_category = stack.pop()
+            # 记录添加的子分类
+            if verbose and role == 'category' and new_category and new_category in target_dict:
+                debug(f"添加子分类: {new_category}, 链接数量: {len(target_dict[new_category])}")
+    
+    folder_count = link_count = 0
+    for event, item in nodes:
+        if event == LINK:
+            link_count += 1
+        elif event == FOLDER:
+            folder_count += 1
+        process_items(event, item)
+    count('folders', folder_count)
+    count('links', link_count)
+    
+    if not other_bookmarks_found:
         # 如果未找到目标文件夹，使用默认处理方式
         print("警告: 未找到'Other bookmarks'或'其他书签'文件夹，使用默认处理方式")
-        for item in pintree_data:
-            if item.get('type') == 'folder':
-                folder_title = item.get('title', '未命名文件夹')
-                navigation_data[folder_title] = {}
-                process_items(item.get('children', []), navigation_data[folder_title], "")
+        navigation_data = fallback_data
     
     # 最后验证一下，确保没有'Other bookmarks'或'其他书签'作为顶级分类
     for category in list(navigation_data.keys()):
-        if category == 'Other bookmarks' or category == '其他书签':
+        if category in OTHER_BOOKMARKS_TITLES:
             print(f"警告: 发现顶级分类包含目标文件夹名称: {category}")
     
+    count('categories', len(navigation_data))
+    count('subcategories', sum(len(subcategories) for subcategories in navigation_data.values()))
+    debug(f"转换完成，最终导航数据包含 {len(navigation_data)} 个主分类")
     return navigation_data
+
+
+def convert_three_level(tree):
+    """
+    将书签树转换为三级结构的导航数据（static_navigation.v1.html使用的格式）
     
-    # 如果没有从Other bookmarks找到数据，尝试处理其他文件夹
-    if not navigation_data:
-        print("警告: 未从Other bookmarks找到数据，尝试处理其他文件夹...")
-        for top_item in pintree_data:
-            if top_item.get('type') == 'folder' and top_item.get('title') != 'Other bookmarks':
-                folder_title = top_item.get('title', '未命名文件夹')
-                print(f"调试信息: 正在处理非Other bookmarks文件夹: {folder_title}")
-                navigation_data[folder_title] = {}
-                process_folder(top_item, navigation_data[folder_title])
-                
-                if navigation_data[folder_title]:
-                    print(f"调试信息: 添加主分类: {folder_title}, 子分类数量: {len(navigation_data[folder_title])}")
+    与convert_json_format不同，不按路径展开子文件夹：每个一级目录下的文件夹作为分类，
+    分类下的文件夹作为子分类，只收集子分类中直接包含的链接，更深的文件夹被忽略。
     
-    # 再次检查是否有未处理的深层嵌套数据
-    if not navigation_data:
-        print("警告: 未找到数据，尝试更全面的扫描...")
+    参数:
+        tree: BookmarkTree
         
-        # 尝试直接从根目录递归扫描所有文件夹
-        def deep_scan(items, parent_name="根目录"):
-            if not isinstance(items, list):
-                return
-                
-            temp_data = {}
-            links = []
-            subfolders = []
-            
-            for item in items:
-                if item.get('type') == 'link':
+    返回:
+        dict: {分类: {子分类: [链接]}}
+    """
+    navigation_data = {}
+    for item in tree.children():
+        if not tree.is_folder(item):
+            continue
+        for subfolder in tree.children(item):
+            if not tree.is_folder(subfolder):
+                continue
+            category = navigation_data[tree.title(subfolder)] = {}
+            for child_item in tree.children(subfolder):
+                if not tree.is_folder(child_item):
+                    continue
+                links = category[tree.title(child_item)] = []
+                for link_item in tree.children(child_item):
+                    if not tree.is_link(link_item):
+                        continue
+                    # 远程图标地址换成按网站解析的emoji
+                    icon = tree.icon(link_item)
+                    if not icon or is_remote_icon(icon):
+                        icon = site_icons.resolve(tree.url(link_item))
                     links.append({
                         'type': 'link',
-                        'title': item.get('title', '未知标题'),
-                        'url': item.get('url', '#'),
-                        'icon': item.get('icon', '🔗')
+                        'title': tree.title(link_item, '无标题'),
+                        'icon': icon,
+                        'url': tree.url(link_item, '#')
                     })
-                elif item.get('type') == 'folder':
-                    subfolder_title = item.get('title', '未命名文件夹')
-                    subfolders.append((subfolder_title, item))
-            
-            # 如果当前层级有链接，创建一个"直接链接"分类
-            if links:
-                temp_data[f"{parent_name}_直接链接"] = links
-                print(f"调试信息: 深层扫描 - 在{parent_name}找到{len(links)}个直接链接")
-            
-            # 递归处理子文件夹
-            for subfolder_title, subfolder in subfolders:
-                if 'children' in subfolder:
-                    child_data = deep_scan(subfolder['children'], subfolder_title)
-                    if child_data:
-                        temp_data[subfolder_title] = child_data
-            
-            return temp_data
-        
-        # 对顶级数据进行深层扫描
-        deep_data = deep_scan(pintree_data)
-        if deep_data:
-            navigation_data["深层扫描结果"] = deep_data
-            print(f"调试信息: 深层扫描找到数据，添加到'深层扫描结果'分类")
-    
-    print(f"调试信息: 转换完成，最终导航数据包含 {len(navigation_data)} 个主分类")
     return navigation_data
 
 
-def update_html_file(html_file_path, navigation_data):
+def serialize_navigation_data(navigation_data):
+    """
+    将导航数据转换为嵌入页面的JavaScript字符串（紧凑格式，见json_codec）
+    
+    "</"和"/*"会被转义，避免标题或URL中的内容提前结束脚本或被误认为插槽标记
+    """
+    return _escape_script_json(json_codec.dumps(navigation_data))
+
+
+def _escape_script_json(js_data):
+    return js_data.replace('</', '<\\/').replace('/*', '\\/*')
+
+
+def iter_navigation_data(navigation_data):
+    """
+    逐段产生与serialize_navigation_data相同的字符串，页面渲染时边序列化边写出
+    
+    iterdumps只在字符串之外分段，"</"和"/*"只会出现在字符串内部，可以逐段转义
+    """
+    for chunk in json_codec.iterdumps(navigation_data):
+        yield _escape_script_json(chunk)
+
+
+def update_html_file(html_file_path, navigation_data, js_data=None, manifest=None, prerender=None):
     """
-    更新HTML文件中的导航数据
+    更新HTML文件中的导航数据和版本信息
+    
+    页面编译为模板（见page_template），数据和版本时间戳按插槽名称填入，
+    边序列化边写入临时文件，再以重命名的方式一次替换。没有插槽标记的旧版页面会先自动补上标记。
     
     参数:
         html_file_path: HTML文件路径
         navigation_data: 转换后的导航数据
+        js_data: 已序列化的导航数据（来自构建缓存时可省去重复序列化）
+        manifest: 分片清单（见data_shards），为None时页面使用内嵌的完整数据
+        prerender: 预渲染的首屏标记（见prerender），为None时不改动页面中的标记
         
     返回:
         bool: 更新是否成功
     """
     try:
-        # 读取HTML文件
-        with open(html_file_path, 'r', encoding='utf-8') as f:
-            html_content = f.read()
-        
-        # 将导航数据转换为JavaScript字符串
-        js_data = json.dumps(navigation_data, ensure_ascii=False, indent=2)
+        # 编译页面模板（页面未被外部修改时使用缓存的编译结果）
+        template = load_template(html_file_path, legacy_slots=True)
         
-        # 使用正则表达式查找多行的navigationData定义
-        import re
+        # 导航数据边序列化边写出，不生成完整的数据字符串
+        if js_data is None:
+            js_data = iter_navigation_data(navigation_data)
+        values = {'navigationData': js_data}
         
-        # 尝试多种可能的模式
-        patterns = [
-            # 模式1: 单行const定义
-            r'(const\s+navigationData\s*=\s*)\{[^}]*\};',
-            # 模式2: 多行const定义
-            r'(const\s+navigationData\s*=\s*)\{[\s\S]*?\};',
-            # 模式3: 也支持let和var声明
-            r'(let|var)\s+navigationData\s*=\s*\{[\s\S]*?\};'
-        ]
+        # 分片清单：页面按清单加载各分类的数据
+        if 'navigationManifest' in template:
+            values['navigationManifest'] = _escape_script_json(
+                json_codec.dumps(manifest or [], pretty=True))
+        elif manifest is not None:
+            raise SpliceError("页面中缺少插槽: navigationManifest")
         
-        found_pattern = False
-        for pattern in patterns:
-            match = re.search(pattern, html_content, re.DOTALL)
-            if match:
-                # 构建替换字符串
-                if match.group(1).strip().lower() in ['let', 'var']:
-                    # 如果是let或var，保持原来的声明方式
-                    replace_pattern = f"{match.group(1)} navigationData = {js_data};"
-                else:
-                    # 默认使用const
-                    replace_pattern = f"{match.group(1)}{js_data};"
-                
-                # 替换匹配的内容
-                new_html_content = re.sub(pattern, replace_pattern, html_content, flags=re.DOTALL)
-                
-                # 写入更新后的内容
-                with open(html_file_path, 'w', encoding='utf-8') as f:
-                    f.write(new_html_content)
-                
-                print("✅ HTML文件更新成功")
-                found_pattern = True
-                break
-        
-        if not found_pattern:
-            # 如果没找到匹配的模式，尝试查找注释后的定义区域
-            start_comment = "// 导航数据 - 直接嵌入在HTML中"
-            end_marker = ";"
-            
-            if start_comment in html_content:
-                start_idx = html_content.find("const navigationData", html_content.find(start_comment))
-                if start_idx != -1:
-                    end_idx = html_content.find(end_marker, start_idx)
-                    if end_idx != -1:
-                        # 替换整个navigationData定义
-                        new_content = html_content[:start_idx] + f"const navigationData = {js_data};" + html_content[end_idx+1:]
-                        
-                        with open(html_file_path, 'w', encoding='utf-8') as f:
-                            f.write(new_content)
-                        
-                        print("✅ HTML文件更新成功（备用方法）")
-                        found_pattern = True
-            
-            if not found_pattern:
-                print("❌ 未找到需要替换的navigationData变量")
-                # 打印一些调试信息以帮助定位问题
-                if "navigationData" in html_content:
-                    print("⚠️ HTML文件中存在navigationData，但格式与预期不符")
-                return False
+        # 预渲染的首屏标记（旧版页面没有该插槽时跳过）
+        if prerender is not None and 'prerender' in template:
+            values['prerender'] = prerender
         
-        # 更新版本信息（如果有）
-        update_version_info(html_file_path)
+        # 同时更新版本信息（如果有）
+        if 'version' in template:
+            current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            values['version'] = f'v1.0 (更新时间: {current_time})'
         
+        render_page(html_file_path, values, legacy_slots=True)
+        print("✅ HTML文件更新成功")
         return True
-            
+    
+    except SpliceError as e:
+        print(f"❌ {e}")
+        return False
     except Exception as e:
         print(f"❌ 更新HTML文件时出错: {str(e)}")
         import traceback
@@ -287,89 +295,266 @@ def update_html_file(html_file_path, navigation_data):
         return False
 
 
-def update_version_info(html_file_path):
+def apply_link_statuses(navigation_data, link_cache_path):
     """
-    更新HTML文件中的版本信息时间戳
+    根据link_checker.py的检查结果标注失效和跳转的链接（原地修改）
+    
+    参数:
+        navigation_data: 转换后的导航数据
+        link_cache_path: 检查结果缓存的路径，文件不存在时不标注
     """
-    try:
-        with open(html_file_path, 'r', encoding='utf-8') as f:
-            html_content = f.read()
-        
-        # 获取当前时间
-        current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        
-        # 替换版本信息中的时间戳
-        pattern = r'静态导航页面 v[\d.]+(.*?)\|'
-        replacement = f'静态导航页面 v1.0 (更新时间: {current_time}) |'
+    with span('annotate'):
+        dead, redirected = annotate_links(navigation_data, load_link_statuses(link_cache_path))
+    count('dead_links', dead)
+    count('redirected_links', redirected)
+    if dead or redirected:
+        print(f"链接检查: {dead} 个失效, {redirected} 个已跳转")
+
+
+def dedupe_links(navigation_data, memo=None):
+    """
+    合并重复链接（原地修改），并报告哪些文件夹收藏了同一个链接
+
+    参数:
+        navigation_data: 转换后的导航数据
+        memo: 传给collapse_duplicates的URL解析结果缓存
+    """
+    with span('dedupe'):
+        duplicates = collapse_duplicates(navigation_data, memo)
+    if duplicates:
+        removed = sum(item['count'] - 1 for item in duplicates)
+        count('duplicates_removed', removed)
+        print(f"重复链接: {len(duplicates)} 个链接重复收藏，已合并 {removed} 项")
+        if not is_quiet():
+            for item in duplicates:
+                print(f"  - {item['url']} ({item['count']} 次): {', '.join(item['folders'])}")
+
+
+def navigation_data_from_tree(tree, link_cache_path=None, dedupe=True):
+    """
+    把书签树或节点事件流转换为页面使用的导航数据
+    
+    转换为页面格式后，标注链接检查发现的失效/跳转链接，并合并重复链接。
+    
+    参数:
+        tree: BookmarkTree，或节点事件流（见bookmark_stream）
+        link_cache_path: link_checker.py的检查结果缓存（None表示不标注）
+        dedupe: 是否合并指向同一目标的重复链接
         
-        updated_content = re.sub(pattern, replacement, html_content)
+    返回:
+        dict: 导航数据；数据为空时返回None
+    """
+    with span('convert'):
+        navigation_data = convert_json_format(tree)
+    
+    # 检查转换后的数据是否为空
+    if not navigation_data:
+        print("警告: 转换后的数据为空，请检查pintree.json文件格式")
+        return None
+    
+    if link_cache_path:
+        apply_link_statuses(navigation_data, link_cache_path)
+    if dedupe:
+        dedupe_links(navigation_data)
+    return navigation_data
+
+
+def load_navigation_data(pintree_json_path, link_cache_path=None, dedupe=True):
+    """
+    读取书签文件并生成页面使用的导航数据
+    
+    书签文件边读取边转换：节点事件逐个交给转换函数，不构建书签树，也不把整个文件载入内存，
+    峰值内存只取决于转换结果的大小，与导出文件中的图标地址、添加时间等字段无关。
+    
+    参数:
+        pintree_json_path: 书签文件路径（pintree导出的.json/.json.gz，或浏览器导出的书签HTML）
+        link_cache_path: link_checker.py的检查结果缓存（None表示不标注）
+        dedupe: 是否合并指向同一目标的重复链接
         
-        with open(html_file_path, 'w', encoding='utf-8') as f:
-            f.write(updated_content)
-            
+    返回:
+        dict: 导航数据；读取失败或数据为空时返回None
+    """
+    try:
+        return navigation_data_from_tree(iter_bookmark_file(pintree_json_path), link_cache_path, dedupe)
     except Exception as e:
-        print(f"更新版本信息失败: {e}")
+        print(f"读取pintree.json文件失败: {e}")
+        return None
 
 
-def main():
+def write_page(navigation_data, html_file_path, icon_cache, inline=False, fetcher=None, js_data=None):
+    """
+    写出页面及其data目录中的数据：搜索索引、图标表、分类分片（内嵌模式下没有分片），并更新页面
+    
+    参数:
+        navigation_data: 导航数据
+        html_file_path: 要更新的页面，数据写入页面旁边的data目录
+        icon_cache: 网站图标缓存（IconCache）
+        inline: 是否把完整数据内嵌到页面中
+        fetcher: 获取缺失图标的函数（见favicon_bundle），None表示只使用本地缓存
+        js_data: 已序列化的导航数据（内嵌模式下使用，None时重新序列化）
+        
+    返回:
+        list: 写出的全部文件路径；更新页面失败时返回None
+    """
+    html_dir = os.path.dirname(os.path.abspath(html_file_path))
+    data_dir = os.path.join(html_dir, DEFAULT_DATA_DIR)
+    
+    # 生成搜索用的倒排索引
+    with span('search_index'):
+        index_path, index_written = write_search_index(navigation_data, data_dir)
+    if index_written:
+        print(f"已更新搜索索引: {index_path}")
+    
+    # 打包网站图标，页面不再逐个请求第三方图标服务
+    with span('icons'):
+        icons_path, icons_written, icon_count = write_icon_bundle(navigation_data, data_dir, icon_cache, fetcher)
+    if icons_written:
+        print(f"已更新图标表: {icons_path}（{icon_count} 个网站）")
+    
+    # 预渲染第一个分类，首屏不需要等待脚本执行
+    with span('prerender'):
+        prerender = render_first_category(navigation_data, load_icon_table(icons_path))
+    
+    manifest = None
+    output_paths = [html_file_path, index_path, icons_path]
+    if not inline:
+        # 按顶级分类写出分片，页面中只保留分类清单
+        with span('shards'):
+            manifest, written = write_shards(navigation_data, data_dir)
+        print(f"已更新 {len(written)} 个分片文件: {data_dir}")
+        output_paths += [os.path.join(html_dir, entry['file']) for entry in manifest]
+        output_paths.append(os.path.join(data_dir, MANIFEST_NAME))
+        js_data = '{}'
+    
+    # 更新HTML文件
+    print("正在更新HTML文件...")
+    with span('update_html'):
+        updated = update_html_file(html_file_path, navigation_data if js_data is None else None,
+                                   js_data, manifest, prerender)
+    return output_paths if updated else None
+
+
+def main(pintree_json_path=None, html_file_path=None, cache_dir=None,
+         use_cache=True, inline=False, fetch_icons=False, dedupe=True):
     """
     主函数
+    
+    参数:
+        pintree_json_path: 书签文件路径（默认使用脚本所在目录的pintree.json，其次是pintree.json.gz）
+        html_file_path: 要更新的页面（默认使用脚本所在目录的index.html），
+                        分片、索引和图标表写入页面旁边的data目录
+        cache_dir: 构建缓存、图标缓存和链接检查结果所在的目录（默认为脚本所在目录）
+        use_cache: 是否使用构建缓存（输入未变化时跳过转换和写入）
+        inline: 是否把完整数据内嵌到页面中（默认按分类写成data目录下的分片）
+        fetch_icons: 是否联网获取本地图标缓存中缺少的网站图标
+        dedupe: 是否合并指向同一目标的重复链接
+    
+    返回:
+        int: 退出码（0 成功，1 失败）
     """
-    # 文件路径
+    # 文件路径（优先使用pintree.json，其次是压缩的pintree.json.gz）
     current_dir = os.path.dirname(os.path.abspath(__file__))
-    pintree_json_path = os.path.join(current_dir, 'pintree.json')
-    html_file_path = os.path.join(current_dir, 'index.html')
+    if pintree_json_path is None:
+        pintree_json_path = os.path.join(current_dir, 'pintree.json')
+        if not os.path.exists(pintree_json_path):
+            pintree_json_path += '.gz'
+    if html_file_path is None:
+        html_file_path = os.path.join(current_dir, 'index.html')
+    if cache_dir is None:
+        cache_dir = current_dir
     
     # 检查文件是否存在
     if not os.path.exists(pintree_json_path):
-        print(f"错误: 找不到pintree.json文件")
-        return
+        print(f"错误: 找不到书签文件: {pintree_json_path}")
+        return 1
     
     if not os.path.exists(html_file_path):
-        print(f"错误: 找不到HTML文件")
-        return
+        print(f"错误: 找不到HTML文件: {html_file_path}")
+        return 1
     
-    # 读取pintree.json文件
-    try:
-        with open(pintree_json_path, 'r', encoding='utf-8') as f:
-            pintree_data = json.load(f)
-    except Exception as e:
-        print(f"读取pintree.json文件失败: {e}")
-        return
+    # 解析和转换阶段的缓存键：输入文件内容 + 链接检查结果 + 转换代码本身
+    cache = BuildCache(os.path.join(cache_dir, '.build_cache'))
+    icon_cache = IconCache(os.path.join(cache_dir, '.icon_cache'))
+    link_cache_path = os.path.join(cache_dir, LINK_CACHE_NAME)
+    convert_key = hash_bytes(
+        cache.file_hash(pintree_json_path),
+        cache.file_hash(link_cache_path),
+        'dedupe' if dedupe else 'keep-duplicates',
+        *(cache.file_hash(os.path.join(current_dir, name)) for name in CONVERT_STAGE_SOURCES)
+    )
+    convert_entry = cache.lookup('convert', convert_key) if use_cache else None
+    if convert_entry and not cache.has_blob(convert_entry['blob']):
+        convert_entry = None
+    navigation_data = None
     
-    # 转换数据格式
-    print("正在转换数据格式...")
-    navigation_data = convert_json_format(pintree_data)
+    if convert_entry:
+        print("输入未变化，使用缓存的转换结果")
+        data_hash = convert_entry['blob']
+        category_count = convert_entry['categories']
+        total_links = convert_entry['links']
+    else:
+        print("正在转换数据格式...")
+        navigation_data = load_navigation_data(pintree_json_path, link_cache_path, dedupe)
+        if navigation_data is None:
+            return 1
+        
+        # 统计数据
+        category_count = len(navigation_data)
+        total_links = 0
+        for category, subcategories in navigation_data.items():
+            for subcategory, links in subcategories.items():
+                total_links += len(links)
+        
+        # 序列化阶段：边序列化边写入缓存，以序列化结果的哈希作为后续阶段的键
+        with span('serialize'):
+            data_hash = cache.write_blob(iter_navigation_data(navigation_data))
+        cache.store('convert', convert_key, blob=data_hash,
+                    categories=category_count, links=total_links)
     
-    # 检查转换后的数据是否为空
-    if not navigation_data:
-        print("警告: 转换后的数据为空，请检查pintree.json文件格式")
-        return
+    print(f"数据统计: {category_count} 个分类, {total_links} 个链接")
     
-    # 打印数据统计信息
-    category_count = len(navigation_data)
-    total_links = 0
-    for category, subcategories in navigation_data.items():
-        subcategory_count = len(subcategories)
-        for subcategory, links in subcategories.items():
-            total_links += len(links)
+    # 写入阶段：数据未变且页面和分片仍是上次写入的内容时，不改动任何文件
+    def splice_key():
+        return hash_bytes(
+            data_hash, 'inline' if inline else 'shards',
+            cache.file_hash(icon_cache.index_path),
+            *(cache.file_hash(os.path.join(current_dir, name)) for name in OUTPUT_STAGE_SOURCES)
+        )
     
-    print(f"数据统计: {category_count} 个分类, {total_links} 个链接")
+    # 需要联网补充图标时总是重新打包
+    splice_entry = cache.lookup('splice', splice_key()) if use_cache and not fetch_icons else None
+    if splice_entry and all(cache.file_hash(path) == digest
+                            for path, digest in splice_entry['outputs'].items()):
+        print(f"✅ 数据未变化，{html_file_path} 无需更新")
+        cache.save()
+        return 0
     
-    # 更新HTML文件
-    print("正在更新HTML文件...")
-    if update_html_file(html_file_path, navigation_data):
-        print(f"✅ 成功更新 {html_file_path}")
-        print(f"更新时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    else:
+    if navigation_data is None:
+        navigation_data = cache.load_blob(data_hash)
+    if navigation_data is None:
+        # 缓存的转换结果已损坏，重新读取书签文件
+        navigation_data = load_navigation_data(pintree_json_path, link_cache_path, dedupe)
+        if navigation_data is None:
+            return 1
+    
+    output_paths = write_page(navigation_data, html_file_path, icon_cache, inline,
+                              UrlFetcher() if fetch_icons else None)
+    if output_paths is None:
         print("❌ 更新HTML文件失败")
+        cache.save()
+        return 1
+    cache.store('splice', splice_key(),
+                outputs={path: cache.file_hash(path) for path in output_paths})
+    cache.save()
+    print(f"✅ 成功更新 {html_file_path}")
+    print(f"更新时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    return 0
 
 
 if __name__ == '__main__':
     print("=" * 60)
     print("静态导航页面数据更新工具")
     print("=" * 60)
-    main()
+    exit_code = main()
     print("=" * 60)
-    print("按任意键退出...")
-    input()
+    sys.exit(exit_code)
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+URL规范化与重复链接索引模块
+
+功能：去掉常见的跟踪参数，统一协议、主机名和末尾斜杠，得到链接的规范形式；
+再把规范URL哈希成索引键，在一次遍历中合并导航数据里指向同一目标的重复链接，
+并报告哪些文件夹收藏了同一个链接。
+"""
+
+import hashlib
+from urllib.parse import urlsplit, urlunsplit
+
+# 常见的跟踪参数（不影响页面内容，只用于来源统计）
+TRACKING_PARAMS = frozenset({
+    'spm', 'spm_id_from', 'vd_source', 'bd_vid',
+    'share_source', 'share_medium', 'share_plat', 'share_from',
+    'fbclid', 'gclid', 'msclkid', 'yclid', 'igshid', 'mc_cid', 'mc_eid',
+    '_hsenc', '_hsmi',
+})
+TRACKING_PREFIXES = ('utm_',)
+
+# 只在特定网站上是跟踪参数的名称（在其他网站上可能是页面的实际参数，例如汇率换算的from=USD）
+# 主机名 -> 参数名集合，同时适用于其子域名
+SITE_TRACKING_PARAMS = {
+    'icourse163.org': frozenset({'from', 'outvendor'}),
+}
+
+_DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def _site_tracking_params(host):
+    """
+    主机名对应网站的专用跟踪参数
+    """
+    host = (host or '').lower().rstrip('.')
+    while host:
+        params = SITE_TRACKING_PARAMS.get(host)
+        if params is not None:
+            return params
+        host = host.partition('.')[2]
+    return frozenset()
+
+
+def is_tracking_param(name, host=None):
+    """
+    判断查询参数是否是跟踪参数（不区分大小写）
+
+    参数:
+        name: 参数名
+        host: URL的主机名，用于判断只在特定网站上是跟踪参数的名称
+    """
+    name = name.lower()
+    return (name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIXES)
+            or name in _site_tracking_params(host))
+
+
+def _split_query(query):
+    """
+    按原始文本拆分查询参数，不做百分号解码，避免非UTF-8编码的参数值被改写
+    """
+    return [pair for pair in query.split('&') if pair]
+
+
+def _strip_pairs(pairs, host):
+    """
+    去掉跟踪参数，保留其余参数的原始文本
+    """
+    return [pair for pair in pairs if not is_tracking_param(pair.partition('=')[0], host)]
+
+
+def strip_tracking_params(url):
+    """
+    去掉URL中的跟踪参数，其余部分保持原样
+
+    参数:
+        url: 原始URL
+
+    返回:
+        str: 去掉跟踪参数后的URL（没有跟踪参数时原样返回）
+    """
+    if not url or '?' not in url:
+        return url
+    try:
+        parts = urlsplit(url)
+    except ValueError:
+        return url
+    pairs = _split_query(parts.query)
+    kept = _strip_pairs(pairs, parts.hostname)
+    if len(kept) == len(pairs):
+        return url
+    return urlunsplit(parts._replace(query='&'.join(kept)))
+
+
+def canonicalize_url(url):
+    """
+    计算URL的规范形式，用于判断两个链接是否指向同一目标
+
+    规则：http与https视为相同，主机名转小写并去掉默认端口，
+    去掉跟踪参数并按名称排序其余参数，去掉路径末尾的斜杠，
+    片段只保留前端路由形式（#/ 或 #!）。
+
+    参数:
+        url: 原始URL
+
+    返回:
+        str: 规范化后的URL
+    """
+    if not url:
+        return ''
+    url = url.strip()
+    if '://' not in url:
+        url = 'https://' + url
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return url
+
+    scheme = parts.scheme.lower()
+    if scheme == 'http':
+        scheme = 'https'
+    host = (parts.hostname or '').rstrip('.')
+    if port and port != _DEFAULT_PORTS.get(parts.scheme.lower()):
+        host = f'{host}:{port}'
+
+    path = parts.path.rstrip('/') or '/'
+    query = '&'.join(sorted(_strip_pairs(_split_query(parts.query), parts.hostname)))
+    fragment = parts.fragment if parts.fragment.startswith(('/', '!')) else ''
+    return urlunsplit((scheme, host, path, query, fragment))
+
+
+def url_key(url):
+    """
+    规范URL的64位哈希，作为重复链接索引的键
+    """
+    canonical = canonicalize_url(url).encode('utf-8')
+    return int.from_bytes(hashlib.blake2b(canonical, digest_size=8).digest(), 'big')
+
+
+def collapse_duplicates(navigation_data, memo=None):
+    """
+    合并导航数据中的重复链接（原地修改）
+
+    每个链接只保留第一次出现的位置，后续重复的链接被删除，删空的子分类和分类也一并删除；
+    保留下来的链接同时去掉URL中的跟踪参数。没有URL的链接无法判断是否重复，全部保留。
+
+    参数:
+        navigation_data: 转换后的导航数据
+        memo: URL -> (索引键, 去掉跟踪参数的URL) 的缓存字典，反复合并相同的数据时（监视模式）
+              可以传入同一个字典，避免重复解析URL
+
+    返回:
+        list: 重复链接报告，每项为
+              {"url": 保留的URL, "count": 出现次数, "folders": [出现的 "分类 / 子分类", ...]}
+    """
+    if memo is None:
+        memo = {}
+    first_seen = {}
+    folders = {}
+    counts = {}
+
+    for category, subcategories in navigation_data.items():
+        for subcategory, links in subcategories.items():
+            folder = f"{category} / {subcategory}"
+            kept = []
+            for link in links:
+                if not link.get('url'):
+                    kept.append(link)
+                    continue
+                url = link['url']
+                entry = memo.get(url)
+                if entry is None:
+                    entry = memo[url] = (url_key(url), strip_tracking_params(url))
+                key = entry[0]
+                if key in first_seen:
+                    counts[key] += 1
+                    if folder not in folders[key]:
+                        folders[key].append(folder)
+                    continue
+                link['url'] = entry[1]
+                first_seen[key] = link
+                folders[key] = [folder]
+                counts[key] = 1
+                kept.append(link)
+            links[:] = kept
+
+    for category in list(navigation_data):
+        subcategories = navigation_data[category]
+        for subcategory in [name for name, links in subcategories.items() if not links]:
+            del subcategories[subcategory]
+        if not subcategories:
+            del navigation_data[category]
+
+    return [
+        {"url": first_seen[key]['url'], "count": counts[key], "folders": folders[key]}
+        for key in first_seen if counts[key] > 1
+    ]
@@ -0,0 +1,463 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+监视模式模块
+
+功能：持续监视书签文件，文件变化时自动重新生成页面数据。
+Linux下通过inotify（ctypes调用）接收文件事件，其他平台或inotify不可用时改为定时检查文件状态。
+一次保存通常会触发多个写入事件，收到事件后等待文件平静一段时间（防抖）再重建。
+
+重建是增量的：
+    - 新的书签树先按分类与上一次比较（比较每个分类所在子树的指纹），只重新转换变化的分类，
+      其余分类沿用上一次的转换结果
+    - 只重写输出内容变化的分类分片；标题、地址或分类结构没有变化时不重建搜索索引，
+      网站列表和图标缓存都没有变化时不重新打包图标
+    - 分类清单或预渲染的首屏标记变化时才改写页面
+
+使用方法：python navigation.py watch
+"""
+
+import ctypes
+import ctypes.util
+import hashlib
+import os
+import select
+import struct
+import sys
+import time
+
+from itertools import chain
+
+from bookmark_stream import END, FOLDER
+from bookmark_tree import OTHER_BOOKMARKS_TITLES, BookmarkTree
+from data_shards import DEFAULT_DATA_DIR, write_shards
+from favicon_bundle import IconCache, collect_hosts, write_icon_bundle
+from instrumentation import span
+from link_checker import DEFAULT_CACHE_NAME as LINK_CACHE_NAME
+from prerender import load_icon_table, render_first_category
+from search_index import write_search_index
+from update_static_data import (DEFAULT_CATEGORY, apply_link_statuses, convert_json_format, dedupe_links,
+                                navigation_data_from_tree, update_html_file)
+
+# 防抖时间（秒）：最后一个事件之后文件保持不变这么久才开始重建
+DEFAULT_DEBOUNCE = 0.1
+# 轮询模式下检查文件状态的间隔（秒）
+DEFAULT_POLL_INTERVAL = 0.25
+
+# inotify常量（见 <sys/inotify.h>）
+_IN_MODIFY = 0x00000002
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_EVENT_HEADER = struct.Struct('iIII')
+
+
+class InotifyWatcher:
+    """
+    基于inotify的文件监视器
+
+    监视文件所在的目录而不是文件本身，编辑器以“写临时文件再重命名”方式保存时也能收到事件。
+
+    参数:
+        path: 要监视的文件路径
+    """
+
+    def __init__(self, path):
+        if not sys.platform.startswith('linux'):
+            raise OSError('inotify仅在Linux下可用')
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        if not hasattr(libc, 'inotify_init1'):
+            raise OSError('libc不支持inotify')
+        self.name = os.fsencode(os.path.basename(path))
+        self.fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1失败')
+        mask = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+        directory = os.fsencode(os.path.dirname(os.path.abspath(path)))
+        if libc.inotify_add_watch(self.fd, directory, mask) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, 'inotify_add_watch失败')
+
+    def wait(self, timeout=None):
+        """
+        等待被监视文件的事件
+
+        参数:
+            timeout: 最长等待时间（秒），None表示一直等待
+
+        返回:
+            bool: 超时前是否发生了与该文件有关的事件
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else max(0, deadline - time.monotonic())
+            if not select.select([self.fd], [], [], remaining)[0]:
+                return False
+            if self._read_events():
+                return True
+
+    def _read_events(self):
+        """
+        读出当前排队的全部事件，返回其中是否有被监视文件的事件
+        """
+        matched = False
+        while True:
+            try:
+                buf = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return matched
+            offset = 0
+            while offset < len(buf):
+                _, _, _, length = _EVENT_HEADER.unpack_from(buf, offset)
+                offset += _EVENT_HEADER.size
+                name = buf[offset:offset + length].rstrip(b'\0')
+                offset += length
+                if name == self.name:
+                    matched = True
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """
+    定时检查文件状态（修改时间、大小、inode）的文件监视器
+
+    参数:
+        path: 要监视的文件路径
+        interval: 检查间隔（秒）
+    """
+
+    def __init__(self, path, interval=DEFAULT_POLL_INTERVAL):
+        self.path = path
+        self.interval = interval
+        self.signature = self._signature()
+
+    def _signature(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size, st.st_ino
+
+    def wait(self, timeout=None):
+        """
+        等待文件状态发生变化，参数和返回值与InotifyWatcher.wait相同
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            signature = self._signature()
+            if signature != self.signature:
+                self.signature = signature
+                return True
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                time.sleep(min(self.interval, remaining))
+            else:
+                time.sleep(self.interval)
+
+    def close(self):
+        pass
+
+
+def create_watcher(path, poll=False, interval=DEFAULT_POLL_INTERVAL):
+    """
+    创建文件监视器，优先使用inotify，不可用时改为轮询
+
+    参数:
+        path: 要监视的文件路径
+        poll: 是否强制使用轮询
+        interval: 轮询间隔（秒）
+    """
+    if not poll:
+        try:
+            return InotifyWatcher(path)
+        except (OSError, AttributeError) as e:
+            print(f"inotify不可用（{e}），改为每 {interval} 秒检查一次文件")
+    return PollingWatcher(path, interval)
+
+
+def wait_for_change(watcher, debounce=DEFAULT_DEBOUNCE):
+    """
+    等待文件变化，并在连续的写入事件结束后才返回
+
+    参数:
+        watcher: InotifyWatcher或PollingWatcher
+        debounce: 最后一个事件之后需要保持平静的时间（秒）
+    """
+    watcher.wait()
+    while watcher.wait(debounce):
+        pass
+
+
+def _file_stamp(path):
+    """
+    文件的大小和修改时间，文件不存在时返回None
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+def category_sources(tree):
+    """
+    按convert_json_format的规则找出每个分类来自书签树中的哪些子树
+
+    “其他书签”下的每个文件夹是一个分类，直接存放的链接属于默认分类；同名的文件夹属于同一个分类。
+
+    参数:
+        tree: BookmarkTree
+
+    返回:
+        (其他书签文件夹的id, {分类名称: [子树根节点id, ...]})，分类按首次出现的顺序排列；
+        没有“其他书签”文件夹时返回(None, None)
+    """
+    for node in tree.children():
+        if tree.is_folder(node) and tree.title(node, '未命名文件夹') in OTHER_BOOKMARKS_TITLES:
+            sources = {}
+            for child in tree.children(node):
+                category = tree.title(child, '未命名文件夹') if tree.is_folder(child) else DEFAULT_CATEGORY
+                sources.setdefault(category, []).append(child)
+            return node, sources
+    return None, None
+
+
+def subtree_fingerprint(tree, roots):
+    """
+    计算若干子树的指纹：标题、地址、图标或结构变化时指纹改变（添加时间不影响转换结果，不参与计算）
+    """
+    digest = hashlib.sha1()
+    for root in roots:
+        digest.update(repr((tree.kinds[root], tree.title(root), tree.url(root), tree.icon(root))).encode('utf-8'))
+        for node in range(root + 1, tree.ends[root]):
+            # 父节点按相对于子树根节点的位置记录，子树整体移动时指纹不变
+            item = (tree.kinds[node], tree.parents[node] - root, tree.title(node), tree.url(node), tree.icon(node))
+            digest.update(repr(item).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _link_count(navigation_data):
+    return sum(len(links) for subcategories in navigation_data.values() for links in subcategories.values())
+
+
+def _index_terms(subcategories):
+    """
+    分类中影响搜索索引的内容：子分类名称和各链接的标题、地址、图标
+    """
+    return [(subcategory, [(link.get('title'), link.get('url'), link.get('icon')) for link in links])
+            for subcategory, links in subcategories.items()]
+
+
+class IncrementalBuilder:
+    """
+    增量重建页面数据
+
+    保存上一次的书签树指纹、各分类的转换结果和生成的导航数据。重建时先按分类比较书签树，
+    只重新转换变化的分类；再逐个分类比较输出，只重写变化的分类分片，
+    并且只在输入变化时重建搜索索引、图标表和预渲染标记。
+
+    参数:
+        pintree_json_path: 书签文件路径
+        html_file_path: 要更新的页面，数据写入页面旁边的data目录
+        cache_dir: 图标缓存和链接检查结果所在的目录
+        inline: 是否把完整数据内嵌到页面中
+        dedupe: 是否合并重复链接
+    """
+
+    def __init__(self, pintree_json_path, html_file_path, cache_dir, inline=False, dedupe=True):
+        self.pintree_json_path = pintree_json_path
+        self.html_file_path = html_file_path
+        self.data_dir = os.path.join(os.path.dirname(os.path.abspath(html_file_path)), DEFAULT_DATA_DIR)
+        self.link_cache_path = os.path.join(cache_dir, LINK_CACHE_NAME)
+        self.icon_cache = IconCache(os.path.join(cache_dir, '.icon_cache'))
+        self.inline = inline
+        self.dedupe = dedupe
+        self.navigation_data = None
+        self.manifest = None
+        self.prerender = None
+        # 各分类的子树指纹和转换结果（合并重复链接之前）
+        self.fingerprints = {}
+        self.converted = {}
+        # 合并重复链接时解析过的网址，两次重建之间大部分链接不变，不必重复解析
+        self.url_memo = {}
+        # 搜索索引里每个链接的分词结果
+        self.term_memo = {}
+        # 上一次转换时链接检查结果文件的状态，变化后全部分类都要重新标注
+        self.link_stamp = None
+        # 图标表的输入：各分类的网站列表和图标缓存索引的状态
+        self.category_hosts = {}
+        self.hosts = None
+        self.icon_stamp = None
+        self.icons_path = None
+        # 最近一次重建重新转换的分类（全部重新转换时为None）
+        self.reconverted = None
+
+    def changed_categories(self, navigation_data):
+        """
+        与上一次生成的数据比较，返回内容有变化（含新增）的分类名称列表
+        """
+        previous = self.navigation_data or {}
+        return [category for category, subcategories in navigation_data.items()
+                if previous.get(category) != subcategories]
+
+    def _convert(self, tree):
+        """
+        转换书签树，只重新转换子树指纹变化的分类
+
+        返回:
+            dict: 导航数据；数据为空时返回None
+        """
+        other, sources = category_sources(tree)
+        link_stamp = _file_stamp(self.link_cache_path)
+        if sources is None or link_stamp != self.link_stamp:
+            # 没有“其他书签”文件夹时按convert_json_format的默认方式整体转换；
+            # 链接检查结果变化时全部分类都要重新标注
+            self.fingerprints = {}
+            self.converted = {}
+        self.link_stamp = link_stamp
+        if sources is None:
+            self.reconverted = None
+            return navigation_data_from_tree(tree, self.link_cache_path, self.dedupe)
+
+        fingerprints = {}
+        converted = {}
+        reconverted = {}
+        other_attrs = tree.attrs(other)
+        for category, roots in sources.items():
+            fingerprint = subtree_fingerprint(tree, roots)
+            fingerprints[category] = fingerprint
+            if self.fingerprints.get(category) == fingerprint:
+                converted[category] = self.converted[category]
+                continue
+            # 只把该分类的子树放在“其他书签”文件夹中交给转换函数，结果与整体转换时相同
+            nodes = chain([(FOLDER, other_attrs)], *(tree.iter_nodes(root) for root in roots), [(END, None)])
+            with span('convert'):
+                converted[category] = reconverted[category] = convert_json_format(nodes)[category]
+        if reconverted:
+            apply_link_statuses(reconverted, self.link_cache_path)
+        self.fingerprints = fingerprints
+        self.converted = converted
+        self.reconverted = list(reconverted)
+
+        if not converted:
+            print("警告: 转换后的数据为空，请检查pintree.json文件格式")
+            return None
+        # 合并重复链接会修改分类和链接列表，只复制容器，链接对象沿用转换结果
+        navigation_data = {category: {subcategory: list(links) for subcategory, links in subcategories.items()}
+                           for category, subcategories in converted.items()}
+        if self.dedupe:
+            if len(self.url_memo) > 4 * _link_count(navigation_data):
+                # 删掉的链接会一直留在缓存里，积累太多时清空
+                self.url_memo = {}
+            dedupe_links(navigation_data, self.url_memo)
+        return navigation_data
+
+    def build(self):
+        """
+        重新读取书签文件并增量更新输出
+
+        返回:
+            bool: 是否成功（读取失败时保留上一次的输出）
+        """
+        started = time.perf_counter()
+        try:
+            with span('load'):
+                tree = BookmarkTree.load(self.pintree_json_path)
+        except Exception as e:
+            print(f"读取pintree.json文件失败: {e}")
+            return False
+        navigation_data = self._convert(tree)
+        del tree
+        if navigation_data is None:
+            return False
+
+        previous = self.navigation_data
+        changed = self.changed_categories(navigation_data)
+        order_changed = previous is None or list(navigation_data) != list(previous)
+        if not changed and not order_changed:
+            print("书签内容未变化，无需重建")
+            return True
+
+        # 搜索索引：只有标题、地址、图标或分类结构变化时才重建（链接编号按分类顺序分配）
+        if order_changed or any(category not in previous
+                                or _index_terms(navigation_data[category]) != _index_terms(previous[category])
+                                for category in changed):
+            if len(self.term_memo) > 4 * _link_count(navigation_data):
+                self.term_memo = {}
+            with span('search_index'):
+                write_search_index(navigation_data, self.data_dir, self.term_memo)
+
+        # 图标表：网站列表或图标缓存变化时才重新打包（只重新收集变化的分类中的网站）
+        self.category_hosts = {
+            category: (set(collect_hosts({category: subcategories})) if category in changed
+                       else self.category_hosts[category])
+            for category, subcategories in navigation_data.items()
+        }
+        hosts = set().union(*self.category_hosts.values())
+        icon_stamp = _file_stamp(self.icon_cache.index_path)
+        icons_changed = False
+        if hosts != self.hosts or icon_stamp != self.icon_stamp:
+            with span('icons'):
+                self.icons_path, icons_changed, _ = write_icon_bundle(navigation_data, self.data_dir, self.icon_cache)
+            self.hosts = hosts
+            self.icon_stamp = icon_stamp
+
+        # 预渲染标记只取决于分类名称、第一个分类的内容和图标表
+        prerender = self.prerender
+        first = next(iter(navigation_data))
+        if order_changed or first in changed or icons_changed:
+            with span('prerender'):
+                prerender = render_first_category(navigation_data, load_icon_table(self.icons_path))
+
+        if self.inline:
+            if not update_html_file(self.html_file_path, navigation_data, prerender=prerender):
+                return False
+        else:
+            with span('shards'):
+                manifest, _ = write_shards(navigation_data, self.data_dir, categories=changed)
+            if manifest != self.manifest or prerender != self.prerender:
+                if not update_html_file(self.html_file_path, None, '{}', manifest, prerender):
+                    return False
+                self.manifest = manifest
+        self.prerender = prerender
+
+        self.navigation_data = navigation_data
+        elapsed = (time.perf_counter() - started) * 1000
+        converted = '全部分类' if self.reconverted is None else f'{len(self.reconverted)} 个分类'
+        print(f"✅ 已重建 {len(changed)} 个分类（{', '.join(changed) or '仅顺序变化'}；"
+              f"重新转换 {converted}），用时 {elapsed:.0f} ms")
+        return True
+
+
+def run_watch(pintree_json_path, html_file_path, cache_dir, inline=False, dedupe=True,
+              poll=False, interval=DEFAULT_POLL_INTERVAL, debounce=DEFAULT_DEBOUNCE):
+    """
+    先完整生成一次，然后持续监视书签文件并增量重建，直到按Ctrl+C
+
+    返回:
+        int: 退出码（0 正常结束，1 首次生成失败）
+    """
+    builder = IncrementalBuilder(pintree_json_path, html_file_path, cache_dir, inline, dedupe)
+    watcher = create_watcher(pintree_json_path, poll, interval)
+    try:
+        if not builder.build():
+            return 1
+        print(f"正在监视 {pintree_json_path}（按Ctrl+C结束）")
+        while True:
+            wait_for_change(watcher, debounce)
+            print(f"检测到书签文件变化: {time.strftime('%H:%M:%S')}")
+            builder.build()
+    except KeyboardInterrupt:
+        print("已停止监视")
+        return 0
+    finally:
+        watcher.close()